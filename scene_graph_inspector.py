@@ -1,14 +1,32 @@
-import copy
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from bisect import bisect_left, bisect_right
+from functools import partial
+from itertools import groupby
 import glob
+import hashlib
 import json
 import math
+import mmap
+import multiprocessing
+import operator
 import os
+import random
+import re
+import shlex
+import sqlite3
+import tempfile
+import textwrap
 import threading
+import time
+import traceback
 import queue
 import yaml
 import sys
 import tkinter as tk
+import tkinter.font as tkfont
 from tkinter import ttk
 from tkinter import filedialog, messagebox
 from tkinter.ttk import *
@@ -16,15 +34,2677 @@ from ttkthemes import ThemedTk
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 
 
+PREDICATES = [
+    "to the left of",
+    "to the right of",
+    "above",
+    "below",
+    "in front of",
+    "behind",
+    "inside",
+    "located in",
+    "holding",
+    "carrying",
+    "riding",
+]
+
+# 디코딩된 이미지 캐시가 사용할 최대 메모리 (bytes)
+FRAME_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# 현재 이미지 기준 앞/뒤로 미리 읽어둘 이미지 개수
+PREFETCH_COUNT = 3
+# 창 크기 변경이 멈춘 뒤 고화질로 다시 그리기까지 기다리는 시간 (ms)
+RESIZE_SETTLE_MS = 150
+# 디스크 미리보기 캐시 폴더 이름과 저장할 이미지 너비 단계
+# 폴더 이름이 "."으로 시작하므로 이미지 검색(glob)에는 포함되지 않음
+PREVIEW_CACHE_DIR_NAME = ".preview_cache"
+PREVIEW_LEVELS = (256, 1280, 1920)
+# triple 수정 기록(저널) 파일 이름. 확장자가 .json이 아니므로 스냅샷 검색에 포함되지 않음
+JOURNAL_FILE_NAME = "edits.journal.jsonl"
+# 자동 저장 주기: 마지막 저장 이후 수정 횟수 또는 경과 시간 (ms)
+AUTOSAVE_EVERY_EDITS = 50
+AUTOSAVE_INTERVAL_MS = 5 * 60 * 1000
+# 이 크기 이상의 JSON 파일은 한 번에 읽지 않고 레코드 위치만 색인한 뒤 필요한 레코드만 파싱
+LAZY_LOAD_MIN_BYTES = 256 * 1024 * 1024
+# 파싱된 레코드를 보관할 최대 개수
+LAZY_RECORD_CACHE_SIZE = 1024
+# Dataset 폴더에 이 파일이 있으면 JSON 대신 SQLite DB에서 장면 그래프를 읽고 씀
+SQLITE_FILE_NAME = "scene_graph.sqlite"
+# Dataset/json 안의 이미지별 분할 저장 폴더. index.json에 레코드 순서(이미지 이름 목록)를 저장
+SHARD_DIR_NAME = "shards"
+SHARD_INDEX_FILE_NAME = "index.json"
+# Dataset 폴더의 이미지 목록과 레코드 색인을 저장해 두는 파일 (미리보기 캐시 폴더 안에 저장)
+# 숨김 폴더 안에 있으므로 manifest를 저장해도 Dataset 폴더의 수정 시간은 바뀌지 않음
+MANIFEST_FILE_NAME = "manifest.json"
+# triple 수정/추가 Dialog의 미리보기 캔버스 크기
+DIALOG_PREVIEW_SIZE = (1280, 720)
+# 닫은 뒤에도 파괴하지 않고 숨겨 두었다가 재사용할 triple Dialog 개수
+DIALOG_POOL_SIZE = 4
+# 폴더 검사, 파일 읽기/쓰기, 내보내기 등 오래 걸리는 백그라운드 작업을 실행할 스레드 개수
+TASK_WORKERS = min(4, os.cpu_count() or 1)
+# 화면에 표시할 이미지 디코딩처럼 바로 끝나야 하는 작업용 스레드 개수
+# 오래 걸리는 작업이 스레드를 모두 차지해도 이미지 표시가 늦어지지 않도록 따로 둠
+INTERACTIVE_TASK_WORKERS = 2
+# 작업 완료를 Tk 스레드에 알리는 가상 이벤트
+TASK_DONE_EVENT = "<<TaskDone>>"
+# 스레드를 지원하지 않는 Tcl에서 완료된 작업을 확인하는 주기 (ms)
+TASK_POLL_MS = 100
+# 데이터 검사 시 바운딩 박스가 [0, 1] 범위를 벗어났다고 판단하지 않을 오차
+BBOX_TOLERANCE = 1e-6
+# 데이터 검사 시 프로세스 하나에 한 번에 넘길 레코드 개수
+VALIDATE_CHUNK_SIZE = 2000
+# 1로 설정하면 렌더링 시간 등 성능 측정 결과를 콘솔에 출력
+PROFILE = os.environ.get("SCENE_GRAPH_INSPECTOR_PROFILE") == "1"
+
+
+class PreviewCache:
+    # Dataset/.preview_cache 아래에 원본 이미지를 몇 단계 너비로 줄여 저장하는 디스크 캐시
+    # 파일 이름은 원본 경로, 크기, 수정 시간으로 만들어지므로 원본이 바뀌면 자동으로 무효화됨
+    def __init__(self, cache_dir, levels=PREVIEW_LEVELS):
+        self.cache_dir = cache_dir
+        self.levels = tuple(sorted(levels))
+
+    def level_for(self, width):
+        # width 이상인 가장 작은 단계. 모든 단계보다 크면 None
+        for level in self.levels:
+            if level >= width:
+                return level
+        return None
+
+    @staticmethod
+    def source_key(source_path):
+        stat = os.stat(source_path)
+        return hashlib.sha1(
+            f"{os.path.abspath(source_path)}|{stat.st_size}|{stat.st_mtime_ns}".encode()
+        ).hexdigest()
+
+    def preview_path(self, key, level):
+        return os.path.join(self.cache_dir, str(level), key[:2], f"{key}.jpg")
+
+    def open_image(self, source_path, width):
+        # width 이상인 가장 작은 단계의 미리보기를 반환. 없으면 만들어서 저장
+        level = self.level_for(width)
+        if level is None:
+            return Image.open(source_path)
+
+        key = self.source_key(source_path)
+        try:
+            return Image.open(self.preview_path(key, level))
+        except FileNotFoundError:
+            pass
+
+        image = Image.open(source_path)
+        if image.width <= level:
+            return image
+        image.draft(image.mode, (level, level * image.height // image.width))
+        try:
+            return self.save_preview(image, key, level)
+        except OSError:
+            # 캐시 폴더에 쓸 수 없는 경우 원본 이미지를 그대로 사용
+            return Image.open(source_path)
+
+    def build(self, source_path):
+        # 원본을 한 번만 디코딩하여 아직 없는 모든 단계의 미리보기를 생성
+        key = self.source_key(source_path)
+        image = Image.open(source_path)
+        levels = [
+            level
+            for level in self.levels
+            if level < image.width and not os.path.exists(self.preview_path(key, level))
+        ]
+        if not levels:
+            return 0
+
+        largest = max(levels)
+        image.draft(image.mode, (largest, largest * image.height // image.width))
+        for level in sorted(levels, reverse=True):
+            self.save_preview(image, key, level)
+        return len(levels)
+
+    def save_preview(self, image, key, level):
+        size = (level, max(1, round(level * image.height / image.width)))
+        preview = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        if preview.mode not in ("RGB", "L"):
+            preview = preview.convert("RGB")
+
+        # 다른 스레드/프로세스가 같은 파일을 쓰는 중이어도 깨지지 않도록 임시 파일에 쓴 뒤 교체
+        path = self.preview_path(key, level)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as file:
+                preview.save(file, "JPEG", quality=95)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return preview
+
+    def prune(self, source_paths):
+        # 현재 원본 이미지에 해당하지 않는 (원본이 바뀌었거나 삭제된) 미리보기 파일 삭제
+        valid_keys = set()
+        for source_path in source_paths:
+            try:
+                valid_keys.add(self.source_key(source_path))
+            except OSError:
+                pass
+
+        removed = 0
+        for path in glob.glob(os.path.join(self.cache_dir, "*", "*", "*.jpg")):
+            if os.path.splitext(os.path.basename(path))[0] not in valid_keys:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+def build_previews(cache_dir, source_path):
+    # 프로세스 풀에서 실행되는 미리보기 생성 작업
+    try:
+        return PreviewCache(cache_dir).build(source_path)
+    except OSError as e:
+        print(f"\n{source_path}: {e}")
+        return 0
+
+
+def prewarm_preview_cache(folder_path, workers=None):
+    # 폴더 안의 모든 이미지에 대해 미리보기 캐시를 미리 채움
+    image_files = list_image_files(folder_path)
+    cache_dir = os.path.join(folder_path, PREVIEW_CACHE_DIR_NAME)
+
+    built = 0
+    with multiprocessing.Pool(workers) as pool:
+        for done, count in enumerate(
+            pool.imap_unordered(
+                partial(build_previews, cache_dir), image_files, chunksize=16
+            ),
+            1,
+        ):
+            built += count
+            if done % 100 == 0 or done == len(image_files):
+                print(
+                    f"\r{done}/{len(image_files)} images, {built} previews created",
+                    end="",
+                    flush=True,
+                )
+    print()
+
+    removed = PreviewCache(cache_dir).prune(image_files)
+    print(f"{removed} stale previews removed")
+
+
+def load_resized_image(path, width, preview_cache=None):
+    # 원본 비율을 유지하며 너비가 width인 이미지로 디코딩 + 리사이즈
+    if preview_cache is not None:
+        image = preview_cache.open_image(path, width)
+    else:
+        image = Image.open(path)
+    aspect_ratio = image.height / image.width
+    size = (width, int(width * aspect_ratio))
+    image.draft(image.mode, size)
+    # draft가 적용되지 않은 형식은 reducing_gap으로 정수배 축소를 먼저 수행
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def find_json_files(folder_path):
+    # Dataset/json 폴더의 JSON 파일들을 수정 시간 순서로 반환 (마지막이 가장 최근 파일)
+    json_dir = os.path.join(folder_path, "json")
+    if not os.path.isdir(json_dir):
+        return []
+    with os.scandir(json_dir) as entries:
+        json_files = [
+            (entry.stat().st_mtime_ns, entry.path)
+            for entry in entries
+            if entry.name.endswith(".json") and entry.is_file()
+        ]
+    json_files.sort()
+    return [path for _, path in json_files]
+
+
+def find_latest_json(folder_path):
+    json_path_list = find_json_files(folder_path)
+    return json_path_list[-1] if json_path_list else None
+
+
+class DatasetManifest:
+    # Dataset 폴더의 디렉터리별 이미지 목록(크기, 수정 시간)과 큰 JSON 파일의 레코드 색인을 저장해 두는 캐시
+    # 디렉터리의 수정 시간은 그 안의 항목이 추가/삭제/이름 변경될 때만 바뀌므로,
+    # 디렉터리마다 stat 한 번으로 변경 여부를 확인하고 바뀐 디렉터리만 scandir로 다시 읽음
+    # (glob("**")와 같이 "."으로 시작하는 디렉터리는 건너뜀)
+    VERSION = 1
+
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.path = os.path.join(folder_path, PREVIEW_CACHE_DIR_NAME, MANIFEST_FILE_NAME)
+        # 상대 경로 -> [수정 시간, 하위 디렉터리 이름 목록, {이미지 파일 이름: [크기, 수정 시간]}]
+        self.dirs = {}
+        # LazyVQAData 색인: {"path", "size", "mtime_ns", "names", "offsets"}
+        self.records = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        # 저장된 manifest를 읽음. 없거나 읽을 수 없으면 False
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != self.VERSION:
+            return False
+        self.dirs = data["dirs"]
+        self.records = data.get("records")
+        return True
+
+    def save(self):
+        with self.lock:
+            data = {"version": self.VERSION, "dirs": self.dirs, "records": self.records}
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                write_file_atomic(
+                    self.path,
+                    lambda file: json.dump(data, file, ensure_ascii=False, separators=(",", ":")),
+                )
+            except OSError as e:
+                # 읽기 전용 폴더 등에서는 manifest 없이 사용
+                print(f"Failed to save {self.path}: {e}")
+
+    def scan_dir(self, relative_dir):
+        subdirs = []
+        images = {}
+        with os.scandir(os.path.join(self.folder_path, relative_dir)) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif entry.name.endswith(".jpg"):
+                    stat = entry.stat()
+                    images[entry.name] = [stat.st_size, stat.st_mtime_ns]
+        return subdirs, images
+
+    def refresh(self):
+        # 바뀐 디렉터리만 다시 읽어서 목록을 갱신. 바뀐 것이 있으면 True 반환
+        changed = False
+        dirs = {}
+        pending = [""]
+        while pending:
+            relative_dir = pending.pop()
+            try:
+                # 읽기 전에 수정 시간을 먼저 얻어서, 읽는 도중 바뀐 경우 다음 확인 때 다시 읽도록 함
+                mtime = os.stat(os.path.join(self.folder_path, relative_dir)).st_mtime_ns
+            except OSError:
+                continue
+            cached = self.dirs.get(relative_dir)
+            if cached is None or cached[0] != mtime:
+                try:
+                    cached = [mtime, *self.scan_dir(relative_dir)]
+                except OSError:
+                    continue
+                changed = True
+            dirs[relative_dir] = cached
+            pending.extend(os.path.join(relative_dir, name) for name in cached[1])
+        if dirs.keys() != self.dirs.keys():
+            changed = True
+        self.dirs = dirs
+        return changed
+
+    def image_files(self):
+        # 모든 이미지의 절대 경로를 정렬하여 반환
+        return sorted(
+            os.path.join(self.folder_path, relative_dir, name)
+            for relative_dir, (_, _, images) in self.dirs.items()
+            for name in images
+        )
+
+    def get_record_index(self, json_path):
+        # json_path의 크기와 수정 시간이 저장할 때와 같으면 (이미지 이름 목록, 레코드 위치 목록) 반환
+        records = self.records
+        if records is None or records["path"] != os.path.relpath(json_path, self.folder_path):
+            return None
+        stat = os.stat(json_path)
+        if (records["size"], records["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return records["names"], records["offsets"]
+
+    def set_record_index(self, json_path, names, offsets):
+        stat = os.stat(json_path)
+        self.records = {
+            "path": os.path.relpath(json_path, self.folder_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "names": names,
+            "offsets": offsets,
+        }
+
+
+def list_image_files(folder_path):
+    # manifest로 폴더의 이미지 목록을 구함 (바뀐 디렉터리만 다시 읽고 manifest 갱신)
+    manifest = DatasetManifest(folder_path)
+    manifest.load()
+    if manifest.refresh():
+        manifest.save()
+    return manifest.image_files()
+
+
+def load_class_names(folder_path):
+    # data.yaml의 클래스 이름 목록. 파일이 없으면 빈 리스트
+    yaml_path = os.path.join(folder_path, "data.yaml")
+    if not os.path.exists(yaml_path):
+        return []
+    with open(yaml_path, "r") as file:
+        return yaml.safe_load(file).get("names", [])
+
+
+def random_color(rng=random):
+    r = lambda: rng.randint(0, 255)
+    return f"#{r():02x}{r():02x}{r():02x}"
+
+
+def triple_key_of(triple):
+    return (triple["subject_id"], triple["predicate"], triple["object_id"])
+
+
+def triple_matches(triple, triple_key):
+    return (
+        triple["subject_id"] == triple_key[0]
+        and triple["predicate"] == triple_key[1]
+        and triple["object_id"] == triple_key[2]
+    )
+
+
+# triple 목록은 직접 수정하지 않고 항상 새 리스트로 교체함 (copy-on-write)
+# 백그라운드 저장 스레드가 이전 리스트를 읽는 중이어도 안전하도록 하기 위함
+def make_triple(triple_key):
+    return {
+        "subject_id": triple_key[0],
+        "predicate": triple_key[1],
+        "object_id": triple_key[2],
+    }
+
+
+# triple_keys는 레코드의 triple key 집합이며 함께 갱신됨
+# 이 집합으로 중복을 막기 때문에 triple 목록에는 중복이 저장되지 않고, 저장 시 중복 제거가 필요 없음
+# 세 함수 모두 레코드가 바뀌었으면 True 반환
+def append_triple(item, triple_key, triple_keys):
+    # 이미 있는 triple이면 추가하지 않음
+    if triple_key in triple_keys:
+        return False
+    triple_keys.add(triple_key)
+    item["scene_graph"]["triples"] = item["scene_graph"]["triples"] + [
+        make_triple(triple_key)
+    ]
+    return True
+
+
+def replace_triple(item, triple_key, new_triple_key, triple_keys):
+    # 수정 전 triple이 이미 없으면(다른 창에서 먼저 수정/삭제된 경우) 아무것도 바꾸지 않음
+    if triple_key == new_triple_key or triple_key not in triple_keys:
+        return False
+    if new_triple_key in triple_keys:
+        # 수정 결과가 이미 있는 triple이면 수정 전 triple만 삭제
+        return remove_triple(item, triple_key, triple_keys)
+    triple_keys.discard(triple_key)
+    triple_keys.add(new_triple_key)
+    item["scene_graph"]["triples"] = [
+        make_triple(new_triple_key) if triple_matches(triple, triple_key) else triple
+        for triple in item["scene_graph"]["triples"]
+    ]
+    return True
+
+
+def remove_triple(item, triple_key, triple_keys):
+    if triple_key not in triple_keys:
+        return False
+    triple_keys.discard(triple_key)
+    item["scene_graph"]["triples"] = [
+        triple
+        for triple in item["scene_graph"]["triples"]
+        if not triple_matches(triple, triple_key)
+    ]
+    return True
+
+
+def dedup_triples(item):
+    # 불러온 레코드의 중복 triple을 순서를 유지하며 제거. 제거한 triple key 목록을 반환 (없으면 빈 리스트)
+    triple_keys = set()
+    triples = []
+    removed = []
+    for triple in item["scene_graph"]["triples"]:
+        triple_key = triple_key_of(triple)
+        if triple_key not in triple_keys:
+            triple_keys.add(triple_key)
+            triples.append(triple)
+        else:
+            removed.append(triple_key)
+    if removed:
+        item["scene_graph"]["triples"] = triples
+    return removed
+
+
+def apply_journal_entry(item, entry, triple_keys=None):
+    # 저널에 기록된 수정 하나를 레코드에 적용. 대상 triple이 없는 기록은 무시하고 False 반환
+    if triple_keys is None:
+        triple_keys = {triple_key_of(triple) for triple in item["scene_graph"]["triples"]}
+    triple_key = tuple(entry["triple"])
+    if entry["op"] == "add":
+        return append_triple(item, triple_key, triple_keys)
+    elif entry["op"] == "edit":
+        return replace_triple(item, triple_key, tuple(entry["new_triple"]), triple_keys)
+    elif entry["op"] == "delete":
+        return remove_triple(item, triple_key, triple_keys)
+    return False
+
+
+class EditJournal:
+    # 가장 최근 JSON 스냅샷 위에 적용할 triple 단위 수정 기록
+    # 한 줄에 JSON 하나씩 추가만 하며, 매 기록마다 fsync하여 프로그램이 종료되어도 유실되지 않음
+    # 첫 줄에는 어떤 스냅샷을 기준으로 한 기록인지 저장
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.entry_count = 0
+
+    def read(self):
+        # (기준 스냅샷 이름, 수정 기록 리스트) 반환
+        if not os.path.exists(self.path):
+            return None, []
+
+        snapshot_name = None
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 기록 도중 종료되어 깨진 줄은 무시
+                    continue
+                if entry["op"] == "base":
+                    snapshot_name = entry["snapshot"]
+                else:
+                    entries.append(entry)
+        return snapshot_name, entries
+
+    def start(self, snapshot_name):
+        # snapshot_name을 기준으로 하는 빈 저널을 새로 만듦 (기존 기록은 삭제)
+        self.close()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_file_atomic(
+            self.path,
+            lambda file: file.write(
+                json.dumps({"op": "base", "snapshot": snapshot_name}) + "\n"
+            ),
+        )
+        self.entry_count = 0
+
+    def rebase(self, snapshot_name, applied_count):
+        # 새 스냅샷에 반영된 앞쪽 applied_count개의 기록을 지우고 나머지 기록만 남김
+        _, entries = self.read()
+        remaining = entries[applied_count:]
+        self.close()
+        write_file_atomic(
+            self.path,
+            lambda file: file.writelines(
+                json.dumps(entry, ensure_ascii=False) + "\n"
+                for entry in [{"op": "base", "snapshot": snapshot_name}] + remaining
+            ),
+        )
+        self.open(len(remaining))
+
+    def open(self, entry_count=0):
+        # 마지막 줄이 기록 도중 끊긴 경우 다음 기록이 같은 줄에 붙지 않도록 줄바꿈 추가
+        needs_newline = False
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as file:
+                file.seek(-1, os.SEEK_END)
+                needs_newline = file.read(1) != b"\n"
+
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.entry_count = entry_count
+        if needs_newline:
+            self.file.write("\n")
+            self.file.flush()
+
+    def append(self, op, image_name, triple_key, new_triple_key=None):
+        entry = {"op": op, "image": image_name, "triple": list(triple_key)}
+        if new_triple_key is not None:
+            entry["new_triple"] = list(new_triple_key)
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.entry_count += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def serialize_record(item, triples, compact=False):
+    # json.dump(vqa_data, indent=4)로 저장했을 때의 레코드 한 개 부분과 같은 문자열
+    # compact=True이면 들여쓰기 없이 한 줄로 직렬화 (파일 크기와 저장 시간이 크게 줄어듦)
+    # triple 목록은 추가/수정 시 중복을 막으므로 순서를 그대로 유지하여 씀
+    record = {**item, "scene_graph": {**item["scene_graph"], "triples": triples}}
+    if compact:
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+    return textwrap.indent(json.dumps(record, ensure_ascii=False, indent=4), "    ")
+
+
+def write_json_array(file, texts):
+    # 직렬화된 레코드들을 한 줄씩 나누어 JSON 배열로 씀
+    count = 0
+    file.write("[")
+    for text in texts:
+        file.write(",\n" if count > 0 else "\n")
+        file.write(text)
+        count += 1
+    file.write("\n]" if count > 0 else "]")
+
+
+class AutoSaver:
+    # JSON 스냅샷을 백그라운드 스레드에서 저장
+    # 레코드별 직렬화 결과를 캐시해 두고, 변경된 레코드만 다시 직렬화한 뒤 이어 붙여서 씀
+    # 작업(job)에는 저장 시점의 레코드와 triple 리스트 참조가 담기며,
+    # triple 리스트는 copy-on-write로 교체되므로 저장 도중 UI에서 수정해도 영향이 없음
+    def __init__(self, on_finished):
+        # on_finished(result)는 작업 스레드에서 호출됨
+        self.on_finished = on_finished
+        self.record_cache = {}
+        # record_cache에 저장된 문자열의 형식 (compact 여부)
+        self.cache_compact = False
+        self.busy = False
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+    def reset(self):
+        # 새 폴더를 열었을 때 캐시 초기화 (진행 중인 작업이 끝난 뒤 실행됨)
+        self.jobs.put(None)
+
+    def submit(self, job):
+        self.busy = True
+        self.jobs.put(job)
+
+    def wait(self):
+        self.jobs.join()
+
+    def worker(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    self.record_cache = {}
+                else:
+                    self.on_finished(self.run(job))
+            finally:
+                self.jobs.task_done()
+
+    def run(self, job):
+        # job["raw_text"]가 주어지면 캐시에 없는 (수정되지 않은) 레코드는 원본 파일의 내용을 그대로 씀
+        result = {
+            key: value
+            for key, value in job.items()
+            if key not in ("records", "raw_text")
+        }
+        try:
+            if job.get("sharded"):
+                # 분할 저장은 변경된 레코드의 파일만 다시 씀
+                write_shards(job["path"], job["records"].values())
+                result["error"] = None
+                return result
+
+            # 형식이 바뀌면 이전 형식으로 직렬화된 캐시는 사용하지 않음
+            # (형식을 바꾸면 모든 레코드가 작업에 포함됨)
+            compact = job.get("compact", False)
+            if compact != self.cache_compact:
+                self.record_cache = {}
+                self.cache_compact = compact
+            for position, (item, triples) in job["records"].items():
+                self.record_cache[position] = serialize_record(item, triples, compact)
+
+            raw_text = job.get("raw_text")
+
+            def texts():
+                for position in range(job["count"]):
+                    text = self.record_cache.get(position)
+                    if text is None:
+                        text = raw_text(position)
+                        if not compact:
+                            text = "    " + text
+                        elif "\n" in text:
+                            # 원본 파일이 들여쓰기 형식이면 한 줄로 다시 직렬화
+                            text = json.dumps(
+                                json.loads(text),
+                                ensure_ascii=False,
+                                separators=(",", ":"),
+                            )
+                    yield text
+
+            write_file_atomic(job["path"], lambda file: write_json_array(file, texts()))
+            result["error"] = None
+        except Exception as e:
+            result["error"] = e
+        return result
+
+
+class LazyVQAData:
+    # 큰 JSON 파일을 한 번에 읽지 않고, 최상위 배열의 각 레코드 위치(byte offset)만 백그라운드에서 색인
+    # 레코드는 실제로 접근할 때 해당 부분만 파싱하며, 파싱된 레코드는 크기가 제한된 LRU 캐시에 보관
+    # 수정된 레코드는 캐시에서 제거되어 변경 사항이 사라지지 않도록 고정(pin)함
+    TOKEN_PATTERN = re.compile(rb'"(?:[^"\\]|\\.)*"|[\[\]{}]')
+    IMAGE_NAME_PATTERN = re.compile(rb'"image_name"\s*:\s*("(?:[^"\\]|\\.)*")')
+    NOTIFY_EVERY = 1000
+
+    def __init__(
+        self,
+        path,
+        cache_size=LAZY_RECORD_CACHE_SIZE,
+        on_materialize=None,
+        record_index=None,
+    ):
+        # on_materialize(position, item)가 True를 반환하면 해당 레코드를 고정
+        # record_index: manifest에 저장된 (이미지 이름 목록, 레코드 위치 목록). 주어지면 다시 색인하지 않음
+        self.path = path
+        self.cache_size = cache_size
+        self.on_materialize = on_materialize
+
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.condition = threading.Condition()
+        self.cache = OrderedDict()
+        self.pinned = {}
+        # 아직 색인되지 않은 이미지 이름별로, 색인되면 호출할 콜백 (when_indexed 참고)
+        self.waiters = {}
+
+        if record_index is not None:
+            names, offsets = record_index
+            self.names = list(names)
+            self.offsets = [tuple(offset) for offset in offsets]
+            self.index = {name: position for position, name in enumerate(self.names)}
+            self.complete = True
+            self.thread = None
+        else:
+            self.names = []
+            self.offsets = []
+            self.index = {}
+            self.complete = False
+            self.thread = threading.Thread(target=self.scan, daemon=True)
+        # 색인 도중 발생한 예외. 있으면 색인은 중단되고 일부 레코드만 색인된 상태임
+        self.error = None
+        if self.thread is not None:
+            self.thread.start()
+
+    def scan(self):
+        # 문자열 토큰은 통째로 건너뛰고 괄호의 깊이만 추적하여 최상위 배열의 원소 범위를 찾음
+        # 잘못된 레코드가 있으면 색인을 중단하고 self.error에 기록 (기다리는 쪽이 멈추지 않도록 항상 완료 처리)
+        try:
+            depth = 0
+            start = None
+            for match in self.TOKEN_PATTERN.finditer(self.data):
+                token = match.group()[0]
+                if token == ord('"'):
+                    continue
+                if token in b"[{":
+                    if depth == 1:
+                        start = match.start()
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 1 and start is not None:
+                        self.add_record(start, match.end())
+                        start = None
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.condition:
+                self.complete = True
+                self.condition.notify_all()
+                waiters, self.waiters = self.waiters, {}
+            # 파일에 없는 이름을 기다리던 콜백도 호출
+            for callbacks in waiters.values():
+                for callback in callbacks:
+                    callback()
+
+    def add_record(self, start, end):
+        match = self.IMAGE_NAME_PATTERN.search(self.data, start, end)
+        if match is not None:
+            image_name = json.loads(match.group(1))
+        else:
+            image_name = json.loads(self.data[start:end])["image"]["image_name"]
+
+        self.offsets.append((start, end))
+        self.names.append(image_name)
+        self.index[image_name] = len(self.offsets) - 1
+
+        if self.waiters:
+            with self.condition:
+                callbacks = self.waiters.pop(image_name, ())
+            for callback in callbacks:
+                callback()
+
+        if len(self.offsets) % self.NOTIFY_EVERY == 0:
+            with self.condition:
+                self.condition.notify_all()
+
+    def find(self, image_name):
+        # 이미지 이름의 레코드 위치. 아직 색인되지 않았다면 색인될 때까지 기다림
+        with self.condition:
+            while image_name not in self.index and not self.complete:
+                self.condition.wait()
+        return self.index.get(image_name)
+
+    def when_indexed(self, image_name, callback):
+        # find()가 기다려야 하는 경우 True를 반환하고, 이름이 색인되면(또는 색인이 끝나면) 색인 스레드에서 callback() 호출
+        # 기다릴 필요가 없으면 callback을 등록하지 않고 False를 반환
+        with self.condition:
+            if image_name in self.index or self.complete:
+                return False
+            self.waiters.setdefault(image_name, []).append(callback)
+            return True
+
+    def wait(self):
+        with self.condition:
+            while not self.complete:
+                self.condition.wait()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, position):
+        item = self.pinned.get(position)
+        if item is not None:
+            return item
+        item = self.cache.get(position)
+        if item is not None:
+            self.cache.move_to_end(position)
+            return item
+
+        item = json.loads(self.raw_text(position))
+        if self.on_materialize is not None and self.on_materialize(position, item):
+            self.pinned[position] = item
+            return item
+
+        self.cache[position] = item
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return item
+
+    def pin(self, position):
+        if position not in self.pinned:
+            self.pinned[position] = self[position]
+            self.cache.pop(position, None)
+
+    def raw_text(self, position):
+        start, end = self.offsets[position]
+        return self.data[start:end].decode("utf-8")
+
+
+class SQLiteSceneGraphStore:
+    # 이미지, 객체, triple을 SQLite DB에 나누어 저장하는 저장소
+    # triple 추가/수정/삭제는 각각 하나의 트랜잭션으로 바로 반영됨
+    # images.record에는 objects, triples를 제외한 레코드의 나머지 필드를 JSON으로 저장
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS images (
+            id INTEGER PRIMARY KEY,
+            image_name TEXT NOT NULL UNIQUE,
+            record TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS objects (
+            image_id INTEGER NOT NULL REFERENCES images(id),
+            seq INTEGER NOT NULL,
+            object_id INTEGER NOT NULL,
+            class TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (image_id, seq)
+        );
+        CREATE INDEX IF NOT EXISTS objects_object_id ON objects(image_id, object_id);
+        CREATE INDEX IF NOT EXISTS objects_class ON objects(class);
+        CREATE TABLE IF NOT EXISTS triples (
+            id INTEGER PRIMARY KEY,
+            image_id INTEGER NOT NULL REFERENCES images(id),
+            subject_id INTEGER NOT NULL,
+            predicate TEXT NOT NULL,
+            object_id INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS triples_key
+            ON triples(image_id, subject_id, predicate, object_id);
+        CREATE INDEX IF NOT EXISTS triples_predicate ON triples(predicate);
+        CREATE INDEX IF NOT EXISTS triples_object_id ON triples(image_id, object_id);
+    """
+
+    def __init__(self, path, cache_size=LAZY_RECORD_CACHE_SIZE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(self.SCHEMA)
+        # 조회한 레코드를 보관하는 LRU 캐시 (수정 사항은 DB에 바로 반영되므로 제거되어도 안전)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+    def close(self):
+        self.connection.close()
+
+    def image_positions(self):
+        # 이미지 이름 -> 레코드 순서 (0부터 시작)
+        return {
+            image_name: image_id - 1
+            for image_id, image_name in self.connection.execute(
+                "SELECT id, image_name FROM images"
+            )
+        }
+
+    def image_id(self, image_name):
+        row = self.connection.execute(
+            "SELECT id FROM images WHERE image_name = ?", (image_name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def build_record(record_json, object_rows, triple_rows):
+        record = json.loads(record_json)
+        record["scene_graph"]["objects"] = [json.loads(data) for data in object_rows]
+        record["scene_graph"]["triples"] = [
+            make_triple(triple_key) for triple_key in triple_rows
+        ]
+        return record
+
+    def get_record(self, image_name):
+        record = self.cache.get(image_name)
+        if record is not None:
+            self.cache.move_to_end(image_name)
+            return record
+
+        row = self.connection.execute(
+            "SELECT id, record FROM images WHERE image_name = ?", (image_name,)
+        ).fetchone()
+        if row is None:
+            return None
+        image_id, record_json = row
+        record = self.build_record(
+            record_json,
+            [
+                data
+                for (data,) in self.connection.execute(
+                    "SELECT data FROM objects WHERE image_id = ? ORDER BY seq",
+                    (image_id,),
+                )
+            ],
+            self.connection.execute(
+                "SELECT subject_id, predicate, object_id FROM triples "
+                "WHERE image_id = ? ORDER BY id",
+                (image_id,),
+            ).fetchall(),
+        )
+
+        self.cache[image_name] = record
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return record
+
+    def has_triple(self, image_id, triple_key):
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM triples "
+                "WHERE image_id = ? AND subject_id = ? AND predicate = ? AND object_id = ?",
+                (image_id, *triple_key),
+            ).fetchone()
+            is not None
+        )
+
+    def apply_edit(self, image_name, op, triple_key, new_triple_key=None):
+        # 저널 기록과 같은 형식의 수정 하나를 트랜잭션으로 반영
+        image_id = self.image_id(image_name)
+        if image_id is None:
+            return
+        with self.connection:
+            # 레코드의 triple 목록과 같이 중복 triple은 저장하지 않음
+            if op == "add" and self.has_triple(image_id, triple_key):
+                return
+            if op == "edit":
+                if tuple(new_triple_key) == tuple(triple_key):
+                    return
+                if self.has_triple(image_id, new_triple_key):
+                    # 수정 결과가 이미 있는 triple이면 수정 전 triple만 삭제
+                    op = "delete"
+            if op == "add":
+                self.connection.execute(
+                    "INSERT INTO triples (image_id, subject_id, predicate, object_id) "
+                    "VALUES (?, ?, ?, ?)",
+                    (image_id, *triple_key),
+                )
+            elif op == "edit":
+                self.connection.execute(
+                    "UPDATE triples SET subject_id = ?, predicate = ?, object_id = ? "
+                    "WHERE image_id = ? AND subject_id = ? AND predicate = ? AND object_id = ?",
+                    (*new_triple_key, image_id, *triple_key),
+                )
+            elif op == "delete":
+                self.connection.execute(
+                    "DELETE FROM triples "
+                    "WHERE image_id = ? AND subject_id = ? AND predicate = ? AND object_id = ?",
+                    (image_id, *triple_key),
+                )
+
+    def import_records(self, vqa_data):
+        # JSON 레코드 목록으로 DB 내용을 모두 교체
+        self.cache.clear()
+        with self.connection:
+            self.connection.execute("DELETE FROM triples")
+            self.connection.execute("DELETE FROM objects")
+            self.connection.execute("DELETE FROM images")
+            for image_id, item in enumerate(vqa_data, 1):
+                scene_graph = item["scene_graph"]
+                record = {
+                    **item,
+                    "scene_graph": {
+                        key: value
+                        for key, value in scene_graph.items()
+                        if key not in ("objects", "triples")
+                    },
+                }
+                self.connection.execute(
+                    "INSERT INTO images (id, image_name, record) VALUES (?, ?, ?)",
+                    (
+                        image_id,
+                        item["image"]["image_name"],
+                        json.dumps(record, ensure_ascii=False),
+                    ),
+                )
+                self.connection.executemany(
+                    "INSERT INTO objects (image_id, seq, object_id, class, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (
+                            image_id,
+                            seq,
+                            obj["object_id"],
+                            obj["class"],
+                            json.dumps(obj, ensure_ascii=False),
+                        )
+                        for seq, obj in enumerate(scene_graph["objects"])
+                    ),
+                )
+                # 중복 triple은 순서를 유지하며 한 번만 저장
+                self.connection.executemany(
+                    "INSERT INTO triples (image_id, subject_id, predicate, object_id) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        (image_id, *triple_key)
+                        for triple_key in dict.fromkeys(
+                            triple_key_of(triple) for triple in scene_graph["triples"]
+                        )
+                    ),
+                )
+
+    def iter_records(self):
+        # 모든 레코드를 순서대로 반환. 이미지/객체/triple을 각각 한 번씩만 조회하여 합침
+        objects = groupby(
+            self.connection.execute(
+                "SELECT image_id, data FROM objects ORDER BY image_id, seq"
+            ),
+            key=lambda row: row[0],
+        )
+        triples = groupby(
+            self.connection.execute(
+                "SELECT image_id, subject_id, predicate, object_id FROM triples "
+                "ORDER BY image_id, id"
+            ),
+            key=lambda row: row[0],
+        )
+        next_objects = next(objects, None)
+        next_triples = next(triples, None)
+
+        for image_id, record_json in self.connection.execute(
+            "SELECT id, record FROM images ORDER BY id"
+        ):
+            object_rows = []
+            if next_objects is not None and next_objects[0] == image_id:
+                object_rows = [row[1] for row in next_objects[1]]
+                next_objects = next(objects, None)
+            triple_rows = []
+            if next_triples is not None and next_triples[0] == image_id:
+                triple_rows = [row[1:] for row in next_triples[1]]
+                next_triples = next(triples, None)
+            yield self.build_record(record_json, object_rows, triple_rows)
+
+    def export_json(self, path, compact=False):
+        # 기존 JSON 형식(indent=4)으로 저장. compact=True이면 레코드마다 한 줄로 저장
+        write_file_atomic(
+            path,
+            lambda file: write_json_array(
+                file,
+                (
+                    serialize_record(item, item["scene_graph"]["triples"], compact)
+                    for item in self.iter_records()
+                ),
+            ),
+        )
+
+
+def build_record_index(vqa_data):
+    # 이미지 이름 -> vqa_data 내 위치
+    # LazyVQAData는 백그라운드 색인 결과를 그대로 사용
+    if isinstance(vqa_data, LazyVQAData):
+        return vqa_data.index
+    return {
+        item["image"]["image_name"]: position
+        for position, item in enumerate(vqa_data)
+    }
+
+
+def find_record(vqa_data, vqa_index, image_name):
+    # 이미지 이름에 해당하는 레코드를 O(1)로 반환. 없으면 None
+    if isinstance(vqa_data, LazyVQAData):
+        position = vqa_data.find(image_name)
+    else:
+        position = vqa_index.get(image_name)
+    if position is None:
+        return None
+    return vqa_data[position]
+
+
+def apply_journal_entries(vqa_data, entries):
+    # 레코드 리스트에 저널 기록들을 순서대로 적용
+    vqa_index = build_record_index(vqa_data)
+    triple_keys = {}
+    for entry in entries:
+        position = vqa_index.get(entry["image"])
+        if position is not None:
+            item = vqa_data[position]
+            if position not in triple_keys:
+                triple_keys[position] = {
+                    triple_key_of(triple) for triple in item["scene_graph"]["triples"]
+                }
+            apply_journal_entry(item, entry, triple_keys[position])
+
+
+def load_latest_records(folder):
+    # 가장 최근 스냅샷을 읽고, 같은 스냅샷을 기준으로 한 저널 기록을 적용
+    # 분할 파일(json/shards)이 있으면 프로그램과 마찬가지로 가장 최근 JSON 파일 대신 분할 파일을 사용
+    # (레코드 리스트, 스냅샷 경로, 적용한 기록 개수) 반환. 스냅샷이 없으면 None
+    shard_dir = os.path.join(folder, "json", SHARD_DIR_NAME)
+    if os.path.exists(os.path.join(shard_dir, SHARD_INDEX_FILE_NAME)):
+        json_path = shard_dir
+        vqa_data = load_shards(shard_dir)
+    else:
+        json_path = find_latest_json(folder)
+        if json_path is None:
+            print(f"No JSON file found in {os.path.join(folder, 'json')}")
+            return None
+        with open(json_path, "r") as file:
+            vqa_data = json.load(file)
+    for item in vqa_data:
+        dedup_triples(item)
+
+    snapshot_name, entries = EditJournal(
+        os.path.join(folder, "json", JOURNAL_FILE_NAME)
+    ).read()
+    if snapshot_name == os.path.basename(json_path):
+        apply_journal_entries(vqa_data, entries)
+    else:
+        entries = []
+    return vqa_data, json_path, len(entries)
+
+
+def import_sqlite(folder):
+    # 가장 최근 스냅샷(JSON 파일 또는 분할 파일)과 저널을 합쳐 Dataset 폴더의 SQLite DB로 가져옴
+    loaded = load_latest_records(folder)
+    if loaded is None:
+        return
+    vqa_data, json_path, entry_count = loaded
+
+    store = SQLiteSceneGraphStore(os.path.join(folder, SQLITE_FILE_NAME))
+    try:
+        store.import_records(vqa_data)
+    finally:
+        store.close()
+    print(
+        f"Imported {len(vqa_data)} records from {os.path.basename(json_path)} "
+        f"({entry_count} journal entries applied)"
+    )
+
+
+def export_sqlite(folder, output, compact=False):
+    # Dataset 폴더의 SQLite DB를 JSON 파일로 내보냄
+    sqlite_path = os.path.join(folder, SQLITE_FILE_NAME)
+    if not os.path.exists(sqlite_path):
+        print(f"{sqlite_path} not found")
+        return
+    store = SQLiteSceneGraphStore(sqlite_path)
+    try:
+        store.export_json(output, compact)
+    finally:
+        store.close()
+    print(f"Exported {output}")
+
+
+def shard_path(shard_dir, image_name):
+    return os.path.join(shard_dir, f"{image_name}.json")
+
+
+def read_shard(shard_dir, image_name):
+    with open(shard_path(shard_dir, image_name), "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def load_shards(shard_dir, workers=None):
+    # index.json 순서대로 이미지별 파일을 스레드 풀에서 병렬로 읽어 레코드 리스트로 반환
+    with open(os.path.join(shard_dir, SHARD_INDEX_FILE_NAME), "r", encoding="utf-8") as file:
+        image_names = json.load(file)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(partial(read_shard, shard_dir), image_names))
+
+
+def write_shards(shard_dir, records, workers=None):
+    # records: (레코드, triple 리스트) 목록. 주어진 레코드의 파일만 병렬로 다시 씀
+    def write(record):
+        item, triples = record
+        text = serialize_record(item, triples, compact=True)
+        write_file_atomic(
+            shard_path(shard_dir, item["image"]["image_name"]),
+            lambda file: file.write(text),
+        )
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # 예외가 있으면 여기서 다시 발생
+        for _ in executor.map(write, records):
+            pass
+
+
+def shard_json(folder, workers=None):
+    # 가장 최근 JSON 스냅샷과 저널을 합쳐 이미지별 파일로 나누어 저장
+    loaded = load_latest_records(folder)
+    if loaded is None:
+        return
+    vqa_data, json_path, entry_count = loaded
+
+    shard_dir = os.path.join(folder, "json", SHARD_DIR_NAME)
+    os.makedirs(shard_dir, exist_ok=True)
+    write_shards(
+        shard_dir,
+        [(item, item["scene_graph"]["triples"]) for item in vqa_data],
+        workers,
+    )
+    image_names = [item["image"]["image_name"] for item in vqa_data]
+    write_file_atomic(
+        os.path.join(shard_dir, SHARD_INDEX_FILE_NAME),
+        lambda file: json.dump(image_names, file, ensure_ascii=False),
+    )
+    # 저널의 기록은 분할 파일에 반영되었으므로 분할 파일을 기준으로 새로 시작
+    EditJournal(os.path.join(folder, "json", JOURNAL_FILE_NAME)).start(SHARD_DIR_NAME)
+    print(
+        f"Wrote {len(vqa_data)} shards from {os.path.basename(json_path)} "
+        f"({entry_count} journal entries applied)"
+    )
+
+
+def unshard_json(folder, output, workers=None, compact=False):
+    # 이미지별 파일과 저널을 합쳐 하나의 JSON 파일로 저장
+    shard_dir = os.path.join(folder, "json", SHARD_DIR_NAME)
+    vqa_data = load_shards(shard_dir, workers)
+    snapshot_name, entries = EditJournal(
+        os.path.join(folder, "json", JOURNAL_FILE_NAME)
+    ).read()
+    if snapshot_name == SHARD_DIR_NAME:
+        apply_journal_entries(vqa_data, entries)
+
+    write_file_atomic(
+        output,
+        lambda file: write_json_array(
+            file,
+            (
+                serialize_record(item, item["scene_graph"]["triples"], compact)
+                for item in vqa_data
+            ),
+        ),
+    )
+    print(f"Exported {len(vqa_data)} records to {output}")
+
+
+def benchmark_lookup(sizes=(1000, 10000, 100000), num_queries=1000):
+    # 프로그램이 사용하는 build_record_index/find_record로 이미지 이름 -> 레코드를 찾는 시간이
+    # 데이터셋 크기와 무관하게 일정한지 확인 (이전 방식인 선형 탐색과 비교)
+    # 일반 JSON 파일(레코드 리스트)과 큰 JSON 파일(LazyVQAData) 모두 측정
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as folder:
+        for num_images in sizes:
+            vqa_data = [
+                {
+                    "image": {"image_name": f"{position:06d}.jpg"},
+                    "scene_graph": {"objects": [], "triples": []},
+                }
+                for position in range(num_images)
+            ]
+            queries = [
+                f"{rng.randrange(num_images):06d}.jpg" for _ in range(num_queries)
+            ]
+            json_path = os.path.join(folder, f"{num_images}.json")
+            with open(json_path, "w") as file:
+                json.dump(vqa_data, file, indent=4)
+
+            def open_lazy():
+                # LazyVQAData의 색인은 백그라운드 스캔 결과이므로 스캔 시간까지 포함하여 측정
+                lazy_data = LazyVQAData(json_path)
+                lazy_data.wait()
+                return lazy_data
+
+            print(f"images: {num_images}")
+            for label, load in (("list", lambda: vqa_data), ("lazy", open_lazy)):
+                start = time.perf_counter()
+                data = load()
+                vqa_index = build_record_index(data)
+                build_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for image_name in queries:
+                    item = find_record(data, vqa_index, image_name)
+                    assert item["image"]["image_name"] == image_name
+                index_time = time.perf_counter() - start
+                print(
+                    f"  {label} index build: {build_time * 1000:.2f} ms, "
+                    f"lookup: {index_time / num_queries * 1e6:.3f} us/query"
+                )
+
+            # 선형 탐색은 오래 걸리므로 일부 검색어만 측정
+            linear_queries = queries[: max(1, num_queries // 10)]
+            start = time.perf_counter()
+            for image_name in linear_queries:
+                next(
+                    item
+                    for item in vqa_data
+                    if item["image"]["image_name"] == image_name
+                )
+            linear_time = time.perf_counter() - start
+            print(
+                f"  linear scan: {linear_time / len(linear_queries) * 1e6:.3f} us/query"
+            )
+
+
+def benchmark_storage(num_images=10000, triples_per_image=20, num_edits=100):
+    # JSON 스냅샷 + 저널 방식과 SQLite 방식의 불러오기, 수정, 저장 시간 비교
+    rng = random.Random(0)
+    vqa_data = []
+    for position in range(num_images):
+        objects = [
+            {
+                "object_id": object_id,
+                "class": f"class_{rng.randrange(10)}",
+                "bbox": [rng.random() for _ in range(4)],
+            }
+            for object_id in range(10)
+        ]
+        triples = [
+            {
+                "subject_id": rng.randrange(10),
+                "predicate": rng.choice(PREDICATES),
+                "object_id": rng.randrange(10),
+            }
+            for _ in range(triples_per_image)
+        ]
+        vqa_data.append(
+            {
+                "image": {"image_name": f"{position:06d}.jpg"},
+                "scene_graph": {"objects": objects, "triples": triples},
+            }
+        )
+    edits = [
+        (
+            f"{rng.randrange(num_images):06d}.jpg",
+            (rng.randrange(10), rng.choice(PREDICATES), rng.randrange(10)),
+        )
+        for _ in range(num_edits)
+    ]
+
+    with tempfile.TemporaryDirectory() as folder:
+        json_path = os.path.join(folder, "data.json")
+        with open(json_path, "w") as file:
+            json.dump(vqa_data, file, ensure_ascii=False, indent=4)
+        store = SQLiteSceneGraphStore(os.path.join(folder, SQLITE_FILE_NAME))
+        store.import_records(vqa_data)
+        store.close()
+
+        start = time.perf_counter()
+        with open(json_path, "r") as file:
+            loaded = json.load(file)
+        json_load_time = time.perf_counter() - start
+
+        journal = EditJournal(os.path.join(folder, JOURNAL_FILE_NAME))
+        journal.start(os.path.basename(json_path))
+        journal.open(0)
+        vqa_index = {
+            item["image"]["image_name"]: position
+            for position, item in enumerate(loaded)
+        }
+        triple_keys = {}
+        start = time.perf_counter()
+        for image_name, triple_key in edits:
+            item = loaded[vqa_index[image_name]]
+            if image_name not in triple_keys:
+                triple_keys[image_name] = {
+                    triple_key_of(triple) for triple in item["scene_graph"]["triples"]
+                }
+            append_triple(item, triple_key, triple_keys[image_name])
+            journal.append("add", image_name, triple_key)
+        json_edit_time = time.perf_counter() - start
+        journal.close()
+
+        save_times = []
+        for compact in (False, True):
+            start = time.perf_counter()
+            write_file_atomic(
+                json_path,
+                lambda file: write_json_array(
+                    file,
+                    (
+                        serialize_record(item, item["scene_graph"]["triples"], compact)
+                        for item in loaded
+                    ),
+                ),
+            )
+            save_times.append(
+                (time.perf_counter() - start, os.path.getsize(json_path))
+            )
+
+        start = time.perf_counter()
+        store = SQLiteSceneGraphStore(os.path.join(folder, SQLITE_FILE_NAME))
+        vqa_index = store.image_positions()
+        store.get_record(edits[0][0])
+        sqlite_load_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for image_name, triple_key in edits:
+            store.apply_edit(image_name, "add", triple_key)
+        sqlite_edit_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.export_json(os.path.join(folder, "export.json"))
+        sqlite_export_time = time.perf_counter() - start
+        store.close()
+
+    print(f"images: {num_images}, triples/image: {triples_per_image}, edits: {num_edits}")
+    print(
+        f"JSON   load: {json_load_time * 1000:.1f} ms, "
+        f"edit: {json_edit_time / num_edits * 1000:.3f} ms/edit"
+    )
+    for label, (save_time, size) in zip(("indent=4", "compact"), save_times):
+        print(
+            f"JSON   full save ({label}): {save_time * 1000:.1f} ms, "
+            f"{size / 1024 / 1024:.1f} MB"
+        )
+    print(
+        f"SQLite open: {sqlite_load_time * 1000:.1f} ms, "
+        f"edit: {sqlite_edit_time / num_edits * 1000:.3f} ms/edit, "
+        f"export: {sqlite_export_time * 1000:.1f} ms"
+    )
+
+
+def write_file_atomic(path, write):
+    # 임시 파일에 쓰고 fsync한 뒤 교체하여, 쓰는 도중 종료되어도 기존 파일이 깨지지 않도록 함
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_label_font():
+    # 속성값 표시용 폰트. arial.ttf가 없는 환경에서는 기본 폰트 사용
+    try:
+        return ImageFont.truetype("arial.ttf", 20)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def draw_scene_graph(
+    image, triple_keys, objects_by_id, class_colors, predicate_colors, font
+):
+    # image 위에 triple들의 바운딩 박스, 화살표, 속성값을 그림 (Tk 없이 사용 가능)
+    draw = ImageDraw.Draw(image)
+
+    for triple in triple_keys:
+        triple_dict = {
+            "subject_id": triple[0],
+            "predicate": triple[1],
+            "object_id": triple[2],
+        }
+
+        # Draw the bounding boxes of the subject and object
+        subject = objects_by_id[triple_dict["subject_id"]]
+        object = objects_by_id[triple_dict["object_id"]]
+
+        subject_x_center, subject_y_center, subject_width, subject_height = (
+            subject["bounding_box"]
+        )
+        subject_x1 = (subject_x_center - subject_width / 2) * image.width
+        subject_y1 = (subject_y_center - subject_height / 2) * image.height
+        subject_x2 = (subject_x_center + subject_width / 2) * image.width
+        subject_y2 = (subject_y_center + subject_height / 2) * image.height
+        subject_bounding_box = [subject_x1, subject_y1, subject_x2, subject_y2]
+
+        object_x_center, object_y_center, object_width, object_height = object[
+            "bounding_box"
+        ]
+        object_x1 = (object_x_center - object_width / 2) * image.width
+        object_y1 = (object_y_center - object_height / 2) * image.height
+        object_x2 = (object_x_center + object_width / 2) * image.width
+        object_y2 = (object_y_center + object_height / 2) * image.height
+        object_bounding_box = [object_x1, object_y1, object_x2, object_y2]
+
+        # Draw the bounding boxes
+        draw.rectangle(
+            subject_bounding_box,
+            outline=class_colors[subject["class"]],
+            width=3,
+        )
+        draw.rectangle(
+            object_bounding_box,
+            outline=class_colors[object["class"]],
+            width=2,
+        )
+
+        abs_subject_x_center = subject_x_center * image.width
+        abs_subject_y_center = subject_y_center * image.height
+        abs_object_x_center = object_x_center * image.width
+        abs_object_y_center = object_y_center * image.height
+
+        draw.line(
+            (
+                abs_subject_x_center,
+                abs_subject_y_center,
+                abs_object_x_center,
+                abs_object_y_center,
+            ),
+            fill=predicate_colors[triple_dict["predicate"]],
+            width=3,
+        )
+
+        arrow_angle = 30
+        angle = math.atan2(
+            abs_object_y_center - abs_subject_y_center,
+            abs_object_x_center - abs_subject_x_center,
+        )
+        angle1 = angle + math.radians(arrow_angle)
+        angle2 = angle + math.radians(-arrow_angle)
+        arrow_length = 20
+
+        draw.line(
+            (
+                abs_object_x_center - arrow_length * math.cos(angle1),
+                abs_object_y_center - arrow_length * math.sin(angle1),
+                abs_object_x_center,
+                abs_object_y_center,
+            ),
+            fill=predicate_colors[triple_dict["predicate"]],
+            width=3,
+        )
+        draw.line(
+            (
+                abs_object_x_center - arrow_length * math.cos(angle2),
+                abs_object_y_center - arrow_length * math.sin(angle2),
+                abs_object_x_center,
+                abs_object_y_center,
+            ),
+            fill=predicate_colors[triple_dict["predicate"]],
+            width=3,
+        )
+
+        # Draw Attribute left above to the bounding box
+        # If attribute is one of 'One-story Building', 'Two-story Builindg', 'Three-story Building', 'Four-stroy Building', 'Multi-story Building', 'Flying', 'Landed'
+        if object["attribute"] and (
+            object["attribute"][0] in ["Flying", "Landed"]
+            or object["class"].lower() == "building"
+        ):
+            attribute = object["attribute"][0]
+            draw.text(
+                (object_x1, object_y1 - 22),
+                attribute,
+                fill=class_colors[object["class"]],
+                font=font,
+            )
+        if subject["attribute"] and (
+            subject["attribute"][0] in ["Flying", "Landed"]
+            or subject["class"].lower() == "building"
+        ):
+            attribute = subject["attribute"][0]
+            draw.text(
+                (subject_x1, subject_y1 - 22),
+                attribute,
+                fill=class_colors[subject["class"]],
+                font=font,
+            )
+
+
+# 일괄 렌더링 프로세스에서 공유하는 색상/폰트 설정
+render_worker_context = {}
+
+
+def init_render_worker(class_colors, predicate_colors):
+    render_worker_context["class_colors"] = class_colors
+    render_worker_context["predicate_colors"] = predicate_colors
+    render_worker_context["font"] = load_label_font()
+
+
+def render_overlay(task):
+    # 이미지 한 장에 장면 그래프를 그려 저장. 실패하면 에러 메시지 반환
+    image_path, output_path, triple_keys, objects = task
+    try:
+        image = Image.open(image_path).convert("RGB")
+        draw_scene_graph(
+            image,
+            triple_keys,
+            {obj["object_id"]: obj for obj in objects},
+            render_worker_context["class_colors"],
+            render_worker_context["predicate_colors"],
+            render_worker_context["font"],
+        )
+
+        # 중간에 중단되어도 완성되지 않은 파일이 남지 않도록 임시 파일에 쓴 뒤 교체
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(output_path))
+        try:
+            with os.fdopen(fd, "wb") as file:
+                image.save(file, "JPEG", quality=95)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    except (OSError, KeyError, ValueError) as e:
+        return f"{image_path}: {e!r}"
+    return None
+
+
+def render_overlays(
+    folder_path,
+    output_dir,
+    predicates=None,
+    classes=None,
+    workers=None,
+    overwrite=False,
+    seed=0,
+):
+    # 가장 최근 JSON 파일의 장면 그래프를 모든 이미지에 그려 output_dir에 저장
+    # predicates/classes가 주어지면 해당 predicate 또는 subject/object 클래스의 triple만 그림
+    # 이미 저장된 이미지는 건너뛰므로 중단된 작업을 이어서 실행할 수 있음
+    json_path = find_latest_json(folder_path)
+    if json_path is None:
+        print("json 폴더에 JSON 파일이 없습니다.")
+        return
+    print(json_path)
+    with open(json_path, "r") as file:
+        vqa_data = json.load(file)
+
+    image_paths = {
+        os.path.basename(path): path
+        for path in list_image_files(folder_path)
+    }
+
+    # 실행할 때마다 같은 색상이 나오도록 seed를 고정한 색상 매핑
+    rng = random.Random(seed)
+    class_names = list(load_class_names(folder_path))
+    for item in vqa_data:
+        for obj in item["scene_graph"]["objects"]:
+            if obj["class"] not in class_names:
+                class_names.append(obj["class"])
+    class_colors = {cls: random_color(rng) for cls in class_names}
+    predicate_colors = {predicate: random_color(rng) for predicate in PREDICATES}
+
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = []
+    skipped = 0
+    for item in vqa_data:
+        image_name = item["image"]["image_name"]
+        image_path = image_paths.get(image_name)
+        if image_path is None:
+            continue
+
+        objects = item["scene_graph"]["objects"]
+        classes_by_id = {obj["object_id"]: obj["class"] for obj in objects}
+        triple_keys = [
+            (triple["subject_id"], triple["predicate"], triple["object_id"])
+            for triple in item["scene_graph"]["triples"]
+            if (not predicates or triple["predicate"] in predicates)
+            and (
+                not classes
+                or classes_by_id.get(triple["subject_id"]) in classes
+                or classes_by_id.get(triple["object_id"]) in classes
+            )
+        ]
+        if (predicates or classes) and not triple_keys:
+            continue
+
+        output_path = os.path.join(output_dir, image_name)
+        if not overwrite and os.path.exists(output_path):
+            skipped += 1
+            continue
+        tasks.append((image_path, output_path, triple_keys, objects))
+
+    print(f"{len(tasks)} images to render, {skipped} already rendered")
+
+    errors = []
+    with multiprocessing.Pool(
+        workers, initializer=init_render_worker, initargs=(class_colors, predicate_colors)
+    ) as pool:
+        for done, error in enumerate(
+            pool.imap_unordered(render_overlay, tasks, chunksize=8), 1
+        ):
+            if error is not None:
+                errors.append(error)
+            if done % 100 == 0 or done == len(tasks):
+                print(f"\r{done}/{len(tasks)} images rendered", end="", flush=True)
+    print()
+
+    for error in errors:
+        print(error)
+    print(f"{len(errors)} errors")
+
+
+def validate_record(item, class_names, predicates):
+    # 레코드 하나를 검사하여 (이미지 이름, 문제 종류, 내용) 목록을 반환
+    # class_names가 비어 있으면(data.yaml이 없으면) 클래스는 검사하지 않음
+    image_name = item.get("image", {}).get("image_name", "")
+    issues = []
+    try:
+        objects = item["scene_graph"]["objects"]
+        triples = item["scene_graph"]["triples"]
+
+        object_ids = set()
+        for obj in objects:
+            object_id = obj["object_id"]
+            object_ids.add(object_id)
+            if class_names and obj["class"] not in class_names:
+                issues.append(
+                    (image_name, "unknown_class", f"object {object_id}: {obj['class']}")
+                )
+            x_center, y_center, width, height = obj["bounding_box"]
+            if (
+                x_center - width / 2 < -BBOX_TOLERANCE
+                or y_center - height / 2 < -BBOX_TOLERANCE
+                or x_center + width / 2 > 1 + BBOX_TOLERANCE
+                or y_center + height / 2 > 1 + BBOX_TOLERANCE
+            ):
+                issues.append(
+                    (
+                        image_name,
+                        "bbox_out_of_range",
+                        f"object {object_id}: {obj['bounding_box']}",
+                    )
+                )
+
+        seen = set()
+        for triple in triples:
+            triple_key = triple_key_of(triple)
+            subject_id, predicate, object_id = triple_key
+            text = f"({subject_id}, {predicate}, {object_id})"
+            missing = [i for i in (subject_id, object_id) if i not in object_ids]
+            if missing:
+                issues.append(
+                    (image_name, "dangling_id", f"{text}: 없는 object_id {missing}")
+                )
+            if subject_id == object_id:
+                issues.append((image_name, "self_loop", text))
+            if predicate not in predicates:
+                issues.append((image_name, "unknown_predicate", text))
+            if triple_key in seen:
+                issues.append((image_name, "duplicate_triple", text))
+            seen.add(triple_key)
+    except (KeyError, TypeError, ValueError) as e:
+        issues.append((image_name, "malformed_record", repr(e)))
+    return issues
+
+
+def validate_records(class_names, predicates, records):
+    # 레코드 묶음 단위 검사 작업 (validate 명령에서는 프로세스 풀에서 실행됨)
+    issues = []
+    for item in records:
+        issues.extend(validate_record(item, class_names, predicates))
+    return issues
+
+
+def validate_dataset(folder_path, workers=None):
+    # 가장 최근 JSON 파일의 모든 레코드를 여러 프로세스에서 나누어 검사
+    # (JSON 파일 경로, 문제 목록) 반환. JSON 파일이 없으면 None
+    json_path = find_latest_json(folder_path)
+    if json_path is None:
+        return None
+    with open(json_path, "r") as file:
+        vqa_data = json.load(file)
+
+    check = partial(
+        validate_records, set(load_class_names(folder_path)), set(PREDICATES)
+    )
+    chunks = [
+        vqa_data[start : start + VALIDATE_CHUNK_SIZE]
+        for start in range(0, len(vqa_data), VALIDATE_CHUNK_SIZE)
+    ]
+    issues = []
+    if len(chunks) <= 1:
+        for chunk in chunks:
+            issues.extend(check(chunk))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for chunk_issues in pool.imap(check, chunks):
+                issues.extend(chunk_issues)
+    return json_path, issues
+
+
+def print_validation_report(folder_path, workers=None):
+    result = validate_dataset(folder_path, workers)
+    if result is None:
+        print("json 폴더에 JSON 파일이 없습니다.")
+        return False
+    json_path, issues = result
+    print(json_path)
+    for issue in sorted(issues):
+        print("\t".join(issue))
+
+    counts = {}
+    for _, kind, _ in issues:
+        counts[kind] = counts.get(kind, 0) + 1
+    for kind, count in sorted(counts.items()):
+        print(f"{kind}: {count}")
+    print(f"{len(issues)} issues")
+    return not issues
+
+
+# 이미지 검색어에서 역색인을 사용하는 조건 종류와 개수 비교 연산자
+QUERY_FIELDS = ("predicate", "class", "triple")
+QUERY_OPERATORS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    "=": operator.eq,
+}
+QUERY_COUNT_PATTERN = re.compile(r"^(.*?)(>=|<=|!=|>|<|=)(\d+)$")
+
+
+def parse_image_query(text):
+    # 이미지 목록 검색어를 [(제외 여부, 종류, 값, (비교 연산자, 개수)), ...]로 변환
+    # 종류는 QUERY_FIELDS 중 하나(역색인 사용) 또는 "path"(상대 경로의 일부)
+    # 예: class:"Enemy MBT" triple:"Enemy MBT",behind,Building predicate:inside>5 -predicate:above
+    lexer = shlex.shlex(text, posix=True)
+    lexer.whitespace_split = True
+    lexer.commenters = ""
+    # Windows 경로의 역슬래시를 그대로 사용
+    lexer.escape = ""
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        raise ValueError("따옴표가 닫히지 않았습니다")
+
+    terms = []
+    for token in tokens:
+        negate = token.startswith("-") and len(token) > 1
+        if negate:
+            token = token[1:]
+        field, separator, value = token.partition(":")
+        if not separator or field not in QUERY_FIELDS:
+            terms.append((negate, "path", token.lower(), None))
+            continue
+
+        # 개수 조건이 없으면 1개 이상
+        count = QUERY_COUNT_PATTERN.match(value)
+        if count is not None:
+            value, compare, number = count.groups()
+            count_match = (QUERY_OPERATORS[compare], int(number))
+        else:
+            count_match = (operator.ge, 1)
+
+        value = value.strip()
+        if field == "triple":
+            # subject 클래스,predicate,object 클래스. 비어 있거나 *이면 모든 값
+            parts = [part.strip() for part in value.split(",")]
+            if len(parts) != 3:
+                raise ValueError("triple:은 subject 클래스,predicate,object 클래스 형식입니다")
+            value = tuple(None if part in ("", "*") else part for part in parts)
+        elif not value:
+            raise ValueError(f"{field}: 뒤에 값이 없습니다")
+        terms.append((negate, field, value, count_match))
+    return terms
+
+
+class SceneGraphIndex:
+    # 불러온 장면 그래프의 역색인
+    # predicate -> {이미지 이름: triple 개수}, 클래스 -> {이미지 이름: object 개수},
+    # (subject 클래스, predicate, object 클래스) -> {이미지 이름: triple 개수}
+    # 이미지별 개수를 함께 보관하여, 레코드가 바뀌면 해당 이미지의 개수만 빼고 다시 더함
+    def __init__(self):
+        self.class_images = {}
+        self.predicate_images = {}
+        self.pattern_images = {}
+        self.image_counts = {}
+
+    @classmethod
+    def build(cls, records):
+        index = cls()
+        for item in records:
+            try:
+                index.update_record(item)
+            except (KeyError, TypeError):
+                # 형식이 잘못된 레코드는 건너뜀 (validate 명령으로 확인)
+                continue
+        return index
+
+    def postings(self):
+        return (self.class_images, self.predicate_images, self.pattern_images)
+
+    @staticmethod
+    def count_record(item):
+        objects = item["scene_graph"]["objects"]
+        classes_by_id = {obj["object_id"]: obj["class"] for obj in objects}
+        class_counts = {}
+        for obj in objects:
+            class_counts[obj["class"]] = class_counts.get(obj["class"], 0) + 1
+
+        predicate_counts = {}
+        pattern_counts = {}
+        for triple in item["scene_graph"]["triples"]:
+            predicate = triple["predicate"]
+            predicate_counts[predicate] = predicate_counts.get(predicate, 0) + 1
+            pattern = (
+                classes_by_id.get(triple["subject_id"]),
+                predicate,
+                classes_by_id.get(triple["object_id"]),
+            )
+            pattern_counts[pattern] = pattern_counts.get(pattern, 0) + 1
+        return class_counts, predicate_counts, pattern_counts
+
+    def update_record(self, item):
+        # 레코드를 처음 추가하거나, 수정된 레코드의 개수를 다시 반영
+        image_name = item["image"]["image_name"]
+        counts = self.count_record(item)
+        self.remove_image(image_name)
+        self.image_counts[image_name] = counts
+        for postings, image_counts in zip(self.postings(), counts):
+            for key, count in image_counts.items():
+                postings.setdefault(key, {})[image_name] = count
+
+    def remove_image(self, image_name):
+        counts = self.image_counts.pop(image_name, None)
+        if counts is None:
+            return
+        for postings, image_counts in zip(self.postings(), counts):
+            for key in image_counts:
+                images = postings[key]
+                del images[image_name]
+                if not images:
+                    del postings[key]
+
+    @staticmethod
+    def matching_keys(keys, value):
+        # 대소문자를 구분하지 않고 일치하는 키 (클래스/predicate 종류는 많지 않음)
+        value = value.lower()
+        return [key for key in keys if key is not None and key.lower() == value]
+
+    def find_images(self, field, value, count_match, all_names):
+        # 조건을 만족하는 이미지 이름 집합. 개수 조건이 0개를 허용하면 all_names 중 해당 키가 없는 이미지도 포함
+        compare, number = count_match
+        if field == "triple":
+            postings = self.pattern_images
+            keys = [
+                pattern
+                for pattern in postings
+                if all(
+                    part is None or (key is not None and key.lower() == part.lower())
+                    for key, part in zip(pattern, value)
+                )
+            ]
+        else:
+            postings = self.predicate_images if field == "predicate" else self.class_images
+            keys = self.matching_keys(postings, value)
+
+        if len(keys) == 1:
+            counts = postings[keys[0]]
+        else:
+            counts = {}
+            for key in keys:
+                for image_name, count in postings[key].items():
+                    counts[image_name] = counts.get(image_name, 0) + count
+
+        if count_match == (operator.ge, 1):
+            names = set(counts)
+        else:
+            names = {
+                image_name
+                for image_name, count in counts.items()
+                if compare(count, number)
+            }
+        if compare(0, number):
+            names.update(all_names - counts.keys())
+        return names
+
+
+class FrameCache:
+    # 디코딩 후 화면 크기로 리사이즈된 이미지를 보관하는 LRU 캐시
+    # key: (이미지 경로, 수정 시간, 리사이즈 너비)
+    # 반환된 이미지는 캐시와 공유되므로 그리기 전에 반드시 copy() 해서 사용해야 함
+    def __init__(self, max_bytes=FRAME_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # 설정되면 원본 대신 디스크 미리보기 캐시에서 이미지를 읽음
+        self.preview_cache = None
+        self.current_bytes = 0
+        self.frames = OrderedDict()
+        self.lock = threading.Lock()
+
+        # 백그라운드 prefetch 작업 Queue와 작업 세대 번호
+        # 새 prefetch 요청이 들어오면 세대 번호가 바뀌어 이전 요청은 무시됨
+        self.prefetch_queue = queue.Queue()
+        self.prefetch_generation = 0
+        self.prefetch_thread = threading.Thread(
+            target=self.prefetch_worker, daemon=True
+        )
+        self.prefetch_thread.start()
+
+    @staticmethod
+    def frame_bytes(image):
+        return image.width * image.height * len(image.getbands())
+
+    @staticmethod
+    def make_key(path, width):
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        return (path, mtime, width)
+
+    def load_frame(self, path, width):
+        return load_resized_image(path, width, self.preview_cache)
+
+    def get(self, path, width):
+        key = self.make_key(path, width)
+        with self.lock:
+            frame = self.frames.get(key)
+            if frame is not None:
+                self.frames.move_to_end(key)
+                return frame
+
+        frame = self.load_frame(path, width)
+        self.put(key, frame)
+        return frame
+
+    def peek(self, path, width):
+        # 캐시에 있는 경우에만 반환 (디코딩하지 않음)
+        key = self.make_key(path, width)
+        with self.lock:
+            frame = self.frames.get(key)
+            if frame is not None:
+                self.frames.move_to_end(key)
+            return frame
+
+    def contains(self, path, width):
+        with self.lock:
+            return self.make_key(path, width) in self.frames
+
+    def put(self, key, frame):
+        size = self.frame_bytes(frame)
+        # 캐시 전체 용량보다 큰 이미지는 저장하지 않음
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            old_frame = self.frames.pop(key, None)
+            if old_frame is not None:
+                self.current_bytes -= self.frame_bytes(old_frame)
+
+            self.frames[key] = frame
+            self.current_bytes += size
+
+            # 용량을 넘으면 가장 오래 사용되지 않은 이미지부터 제거
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self.frames.popitem(last=False)
+                self.current_bytes -= self.frame_bytes(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.current_bytes = 0
+
+    def prefetch(self, paths, width):
+        # 이전 prefetch 요청을 버리고 새로운 경로 목록을 등록
+        self.prefetch_generation += 1
+        generation = self.prefetch_generation
+        for path in paths:
+            self.prefetch_queue.put((generation, path, width))
+
+    def prefetch_worker(self):
+        while True:
+            generation, path, width = self.prefetch_queue.get()
+            if generation != self.prefetch_generation:
+                continue
+            if self.contains(path, width):
+                continue
+            try:
+                self.put(self.make_key(path, width), self.load_frame(path, width))
+            except (OSError, ValueError):
+                # 읽을 수 없는 이미지는 실제로 표시할 때 에러를 보여주도록 무시
+                pass
+
+
+def point_segment_distance(px, py, x1, y1, x2, y2):
+    # 점 (px, py)와 선분 (x1, y1)-(x2, y2) 사이의 최단 거리
+    dx = x2 - x1
+    dy = y2 - y1
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(px - x1, py - y1)
+    t = ((px - x1) * dx + (py - y1) * dy) / length_sq
+    t = max(0.0, min(1.0, t))
+    return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+
+class SpatialIndex:
+    # 화살표 선분을 균일 격자에 나누어 담는 이미지 단위 공간 인덱스
+    # 좌표는 정규화 좌표(0~1)를 받고, 내부적으로 y에 aspect_ratio를 곱해 가로/세로 거리 단위를 맞춤
+    def __init__(self, aspect_ratio=1.0, cell_size=1 / 32):
+        self.aspect_ratio = aspect_ratio
+        self.cell_size = cell_size
+        self.segments = []
+        self.segment_cells = {}
+
+    def cell_of(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def traverse_cells(self, x1, y1, x2, y2):
+        # 선분이 지나가는 격자 칸을 순서대로 반환 (Amanatides-Woo 격자 순회)
+        cx, cy = self.cell_of(x1, y1)
+        end_cx, end_cy = self.cell_of(x2, y2)
+        cells = [(cx, cy)]
+
+        dx = x2 - x1
+        dy = y2 - y1
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        if dx != 0:
+            t_max_x = ((cx + (step_x > 0)) * self.cell_size - x1) / dx
+            t_delta_x = self.cell_size / abs(dx)
+        else:
+            t_max_x = t_delta_x = math.inf
+        if dy != 0:
+            t_max_y = ((cy + (step_y > 0)) * self.cell_size - y1) / dy
+            t_delta_y = self.cell_size / abs(dy)
+        else:
+            t_max_y = t_delta_y = math.inf
+
+        # 부동소수점 오차로 끝 칸을 지나치지 않도록 최대 이동 횟수 제한
+        for _ in range(abs(end_cx - cx) + abs(end_cy - cy)):
+            if t_max_x < t_max_y:
+                cx += step_x
+                t_max_x += t_delta_x
+            else:
+                cy += step_y
+                t_max_y += t_delta_y
+            cells.append((cx, cy))
+        return cells
+
+    def add_segment(self, key, x1, y1, x2, y2):
+        y1 *= self.aspect_ratio
+        y2 *= self.aspect_ratio
+        index = len(self.segments)
+        self.segments.append((key, x1, y1, x2, y2))
+        for cell in self.traverse_cells(x1, y1, x2, y2):
+            self.segment_cells.setdefault(cell, []).append(index)
+
+    def query_segments(self, x, y, radius):
+        # (x, y)에서 radius(이미지 너비 기준) 이내에 있는 선분의 key를 가까운 순서로 반환
+        y *= self.aspect_ratio
+        cx1, cy1 = self.cell_of(x - radius, y - radius)
+        cx2, cy2 = self.cell_of(x + radius, y + radius)
+
+        candidates = set()
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                candidates.update(self.segment_cells.get((cx, cy), ()))
+
+        hits = []
+        for index in candidates:
+            key, x1, y1, x2, y2 = self.segments[index]
+            distance = point_segment_distance(x, y, x1, y1, x2, y2)
+            if distance <= radius:
+                hits.append((distance, index, key))
+        hits.sort(key=lambda hit: hit[:2])
+        return [key for _, _, key in hits]
+
+
+def benchmark_hit_test(num_triples=1000, num_objects=200, num_queries=1000):
+    # 선형 탐색과 SpatialIndex 기반 hit test의 속도 비교
+    rng = random.Random(0)
+    objects = {
+        object_id: (rng.random(), rng.random()) for object_id in range(num_objects)
+    }
+    triples = [tuple(rng.sample(range(num_objects), 2)) for _ in range(num_triples)]
+    queries = [(rng.random(), rng.random()) for _ in range(num_queries)]
+    radius = 0.005
+
+    start = time.perf_counter()
+    index = SpatialIndex()
+    for subject_id, object_id in triples:
+        index.add_segment(
+            (subject_id, object_id), *objects[subject_id], *objects[object_id]
+        )
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    linear_hits = 0
+    for x, y in queries:
+        for subject_id, object_id in triples:
+            if (
+                point_segment_distance(
+                    x, y, *objects[subject_id], *objects[object_id]
+                )
+                <= radius
+            ):
+                linear_hits += 1
+    linear_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index_hits = 0
+    for x, y in queries:
+        index_hits += len(index.query_segments(x, y, radius))
+    index_time = time.perf_counter() - start
+
+    print(f"triples: {num_triples}, queries: {num_queries}")
+    print(f"index build: {build_time * 1000:.2f} ms")
+    print(
+        f"linear scan: {linear_time / num_queries * 1000:.4f} ms/query ({linear_hits} hits)"
+    )
+    print(
+        f"spatial index: {index_time / num_queries * 1000:.4f} ms/query ({index_hits} hits)"
+    )
+
+
+class VirtualListView(tk.Frame):
+    # 항목이 매우 많은 목록을 위한 가상 목록
+    # Listbox에는 화면에 보이는 행만 채우고, 스크롤바와 선택 상태는 전체 항목 기준으로 직접 관리함
+    # 항목 문자열은 get_label(index)로 보이는 행에 대해서만 만듦
+    def __init__(self, master, on_select):
+        super().__init__(master)
+        # on_select(index)는 사용자가 항목을 선택했을 때 호출됨
+        self.on_select = on_select
+        self.count = 0
+        self.get_label = None
+        self.top = 0
+        self.selected = None
+
+        self.scrollbar = ttk.Scrollbar(self, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(self, exportselection=False, activestyle="none")
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.row_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+        self.listbox.bind("<<ListboxSelect>>", self.on_listbox_select)
+        self.listbox.bind("<Configure>", lambda event: self.render())
+        self.listbox.bind(
+            "<MouseWheel>", lambda event: self.scroll_by(-3 if event.delta > 0 else 3)
+        )
+        self.listbox.bind("<Button-4>", lambda event: self.scroll_by(-3))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll_by(3))
+        self.listbox.bind("<Up>", lambda event: self.select_relative(-1))
+        self.listbox.bind("<Down>", lambda event: self.select_relative(1))
+
+    def set_items(self, count, get_label):
+        self.count = count
+        self.get_label = get_label
+        self.selected = None
+        self.render()
+
+    def visible_rows(self):
+        return max(1, self.listbox.winfo_height() // self.row_height)
+
+    def render(self):
+        rows = self.visible_rows()
+        self.top = max(0, min(self.top, self.count - rows))
+        end = min(self.count, self.top + rows)
+
+        self.listbox.delete(0, tk.END)
+        if end > self.top:
+            self.listbox.insert(tk.END, *(self.get_label(i) for i in range(self.top, end)))
+        if self.selected is not None and self.top <= self.selected < end:
+            self.listbox.selection_set(self.selected - self.top)
+
+        if self.count:
+            self.scrollbar.set(self.top / self.count, end / self.count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = int(float(amount) * self.count)
+        elif unit == "pages":
+            self.top += int(amount) * self.visible_rows()
+        else:
+            self.top += int(amount)
+        self.render()
+
+    def scroll_by(self, rows):
+        self.top += rows
+        self.render()
+        return "break"
+
+    def see(self, index):
+        rows = self.visible_rows()
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + rows:
+            self.top = index - rows + 1
+        self.render()
+
+    def select(self, index):
+        # 항목을 선택 상태로 표시하고 보이도록 스크롤 (on_select는 호출하지 않음). None이면 선택 해제
+        self.selected = index
+        if index is None:
+            self.render()
+        else:
+            self.see(index)
+
+    def select_relative(self, offset):
+        if self.count:
+            index = 0 if self.selected is None else self.selected + offset
+            if 0 <= index < self.count:
+                self.on_select(index)
+        return "break"
+
+    def on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self.on_select(self.top + selection[0])
+
+
+def parse_object_choice(text):
+    # 콤보박스 값 "class: object_id"에서 object_id를 읽음. 입력 중이라 형식이 맞지 않으면 None
+    try:
+        return int(text.rsplit(": ", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+class TriplePreview:
+    # triple 수정/추가 Dialog의 미리보기 캔버스
+    # 베이스 이미지(PhotoImage)는 여러 Dialog가 공유하고, 값이 바뀌면 박스 2개와 화살표 1개의 좌표만 옮김
+    # 콤보박스 입력처럼 연속된 변경은 after_idle로 모아서 한 번만 다시 그림
+    def __init__(self, master, get_state, size=DIALOG_PREVIEW_SIZE):
+        # get_state()는 (subject, subject 색상, object, object 색상, 화살표 색상) 또는 None을 반환
+        self.get_state = get_state
+        self.width, self.height = size
+        self.photo = None
+        self.redraw_job = None
+
+        self.canvas = tk.Canvas(master, width=self.width, height=self.height)
+        self.image_item = self.canvas.create_image(0, 0, anchor=tk.NW)
+        self.box_items = []
+        self.text_items = []
+        for _ in range(2):
+            self.box_items.append(
+                self.canvas.create_rectangle(
+                    0, 0, 0, 0, width=3, state=tk.HIDDEN, tags="preview_shape"
+                )
+            )
+            self.text_items.append(
+                self.canvas.create_text(
+                    0,
+                    0,
+                    anchor=tk.NW,
+                    font=("Arial", -20),
+                    state=tk.HIDDEN,
+                    tags="preview_shape",
+                )
+            )
+        self.arrow_item = self.canvas.create_line(
+            0,
+            0,
+            0,
+            0,
+            width=3,
+            arrow=tk.LAST,
+            arrowshape=(17, 17, 10),
+            state=tk.HIDDEN,
+            tags="preview_shape",
+        )
+
+    def set_base(self, photo):
+        # Tk 이미지가 사라지지 않도록 참조를 보관
+        self.photo = photo
+        self.canvas.itemconfigure(self.image_item, image=photo)
+
+    def schedule_redraw(self):
+        if self.redraw_job is None:
+            self.redraw_job = self.canvas.after_idle(self.redraw)
+
+    def redraw(self):
+        if self.redraw_job is not None:
+            self.canvas.after_cancel(self.redraw_job)
+            self.redraw_job = None
+        # 예약된 뒤 Dialog가 닫힌 경우
+        if not self.canvas.winfo_exists():
+            return
+
+        state = self.get_state()
+        if state is None:
+            self.canvas.itemconfigure("preview_shape", state=tk.HIDDEN)
+            return
+        subject, subject_color, object, object_color, arrow_color = state
+
+        centers = []
+        for box_item, text_item, obj, color in (
+            (self.box_items[0], self.text_items[0], subject, subject_color),
+            (self.box_items[1], self.text_items[1], object, object_color),
+        ):
+            x_center, y_center, box_width, box_height = obj["bounding_box"]
+            x1 = (x_center - box_width / 2) * self.width
+            y1 = (y_center - box_height / 2) * self.height
+            x2 = (x_center + box_width / 2) * self.width
+            y2 = (y_center + box_height / 2) * self.height
+            self.canvas.coords(box_item, x1, y1, x2, y2)
+            self.canvas.itemconfigure(box_item, outline=color, state=tk.NORMAL)
+
+            # 일부 속성값은 바운딩 박스 좌측 상단에 표시
+            if obj["attribute"] and (
+                obj["attribute"][0] in ["Flying", "Landed"]
+                or obj["class"].lower() == "building"
+            ):
+                self.canvas.coords(text_item, x1, y1 - 22)
+                self.canvas.itemconfigure(
+                    text_item, text=obj["attribute"][0], fill=color, state=tk.NORMAL
+                )
+            else:
+                self.canvas.itemconfigure(text_item, state=tk.HIDDEN)
+
+            centers.extend((x_center * self.width, y_center * self.height))
+
+        # subject 중심에서 object 중심으로 향하는 화살표
+        self.canvas.coords(self.arrow_item, *centers)
+        self.canvas.itemconfigure(self.arrow_item, fill=arrow_color, state=tk.NORMAL)
+
+
+class TripleDialog:
+    # triple 수정/추가에 함께 쓰는 Dialog
+    # 닫을 때 파괴하지 않고 숨겨 두었다가 configure()로 값만 바꿔서 다시 사용함
+    def __init__(self, root, get_preview_state, on_close):
+        self.window = tk.Toplevel(root)
+        self.window.withdraw()
+        self.on_confirm = None
+        self.predicates = []
+
+        # subject_id, predicate, object_id 입력 칸 (콤보박스)
+        self.subject_id_var = tk.StringVar(self.window)
+        self.predicate_var = tk.StringVar(self.window)
+        self.object_id_var = tk.StringVar(self.window)
+        self.comboboxes = []
+        for row, (text, var) in enumerate(
+            (
+                ("Subject ID:", self.subject_id_var),
+                ("Predicate:", self.predicate_var),
+                ("Object ID:", self.object_id_var),
+            )
+        ):
+            tk.Label(self.window, text=text).grid(row=row, column=0)
+            combobox = ttk.Combobox(self.window, textvariable=var, width=30)
+            combobox.grid(row=row, column=1)
+            self.comboboxes.append(combobox)
+
+        # 확인 버튼과 화살표 방향 전환 버튼
+        self.confirm_button = ttk.Button(self.window, text="확인", command=self.confirm)
+        self.confirm_button.grid(row=1, column=2)
+        ttk.Button(
+            self.window, text="화살표 방향 전환", command=self.swap_subject_and_object
+        ).grid(row=1, column=3)
+
+        # 값이 이미지에서 어떻게 보일지 미리보기로 표시
+        # subject_id, predicate, object_id가 바뀔 때마다 박스와 화살표만 다시 그림
+        self.preview = TriplePreview(
+            self.window,
+            lambda: get_preview_state(
+                self.subject_id_var.get(),
+                self.predicate_var.get(),
+                self.object_id_var.get(),
+            ),
+        )
+        self.preview.canvas.grid(row=3, column=0, columnspan=4)
+        for var in (self.subject_id_var, self.predicate_var, self.object_id_var):
+            var.trace_add("write", lambda *args: self.preview.schedule_redraw())
+
+        # 닫기 버튼, ESC 키는 on_close(dialog), Enter 키는 확인 버튼
+        self.window.protocol("WM_DELETE_WINDOW", lambda: on_close(self))
+        self.window.bind("<Escape>", lambda event: on_close(self))
+        self.window.bind("<Return>", lambda event: self.confirm_button.invoke())
+
+    def configure(
+        self, title, object_choices, predicates, subject, predicate, object, base_photo, on_confirm
+    ):
+        # on_confirm(subject_id, predicate, object_id)은 확인 버튼을 누를 때 호출됨
+        self.window.title(title)
+        self.on_confirm = on_confirm
+        self.predicates = predicates
+        self.comboboxes[0].configure(values=object_choices)
+        self.comboboxes[1].configure(values=predicates)
+        self.comboboxes[2].configure(values=object_choices)
+        self.subject_id_var.set(subject)
+        self.predicate_var.set(predicate)
+        self.object_id_var.set(object)
+        self.preview.set_base(base_photo)
+        self.preview.redraw()
+
+    def confirm(self):
+        if self.on_confirm is None:
+            return
+        subject_id = parse_object_choice(self.subject_id_var.get())
+        object_id = parse_object_choice(self.object_id_var.get())
+        # 콤보박스 값이 "class: object_id" 형식이 아니면 확인하지 않음
+        if subject_id is None or object_id is None:
+            return
+        # predicate 콤보박스는 직접 입력할 수 있으므로 목록에 없는 predicate는 거부
+        predicate = self.predicate_var.get()
+        if predicate not in self.predicates:
+            messagebox.showerror(
+                title="잘못된 Predicate",
+                message=f"목록에 없는 predicate입니다: {predicate!r}",
+                parent=self.window,
+            )
+            return
+        self.on_confirm(subject_id, predicate, object_id)
+
+    def swap_subject_and_object(self):
+        tmp_subject_id = self.subject_id_var.get()
+        self.subject_id_var.set(self.object_id_var.get())
+        self.object_id_var.set(tmp_subject_id)
+
+    def focus_set(self):
+        self.window.focus_set()
+
+
+class DialogManager:
+    # 모든 Dialog를 루트 이벤트 루프 하나에서 처리 (Dialog마다 mainloop를 중첩하지 않음)
+    # 닫힌 Dialog는 최대 pool_size개까지 숨겨 두었다가 다음에 열 때 다시 설정하여 사용
+    def __init__(self, root, create_dialog, pool_size=DIALOG_POOL_SIZE):
+        self.root = root
+        # create_dialog()는 숨겨진 상태의 새 Dialog를 반환
+        self.create_dialog = create_dialog
+        self.pool_size = pool_size
+        self.pool = []
+        # 열려 있는 Dialog들 (마지막이 가장 최근에 열린 Dialog)
+        self.open_dialogs = []
+        self.focus_job = None
+
+    def prewarm(self):
+        # idle 때마다 하나씩 미리 만들어 두어 시작 직후 UI가 멈추지 않도록 함
+        if len(self.pool) + len(self.open_dialogs) < self.pool_size:
+            self.pool.append(self.create_dialog())
+            self.root.after_idle(self.prewarm)
+
+    def acquire(self):
+        dialog = self.pool.pop() if self.pool else self.create_dialog()
+        self.open_dialogs.append(dialog)
+        return dialog
+
+    def show(self, dialog):
+        dialog.window.deiconify()
+        dialog.window.lift()
+        dialog.focus_set()
+
+    def release(self, dialog):
+        # Enter 키 연타 등으로 이미 닫힌 Dialog를 다시 닫으려는 경우
+        if dialog not in self.open_dialogs:
+            return
+        self.open_dialogs.remove(dialog)
+        # 에러 메시지 창처럼 Dialog에 딸린 창은 함께 닫음
+        for child in dialog.window.winfo_children():
+            if isinstance(child, tk.Toplevel):
+                child.destroy()
+        dialog.window.withdraw()
+        dialog.on_confirm = None
+        if len(self.pool) < self.pool_size:
+            self.pool.append(dialog)
+        else:
+            dialog.window.destroy()
+        self.schedule_focus()
+
+    def schedule_focus(self):
+        if self.focus_job is None:
+            self.focus_job = self.root.after_idle(self.restore_focus)
+
+    def restore_focus(self):
+        # 남아있는 Dialog가 있다면 마지막으로 열린 Dialog에, 없다면 메인 창에 포커스를 맞춤
+        self.focus_job = None
+        if self.open_dialogs:
+            self.open_dialogs[-1].focus_set()
+        else:
+            self.root.focus_set()
+
+
+class TaskDispatcher:
+    # 작업 스레드와 Tk 스레드를 잇는 연결 통로
+    # submit()한 작업은 스레드 풀에서 실행되고, 완료 콜백은 가상 이벤트로 Tk 스레드를 깨워서 실행함
+    # 할 일이 없을 때는 Tk 스레드를 주기적으로 깨우지 않음
+    def __init__(
+        self, root, workers=TASK_WORKERS, interactive_workers=INTERACTIVE_TASK_WORKERS
+    ):
+        self.root = root
+        # pool 이름별 스레드 풀
+        # "interactive": 화면 표시용 이미지 디코딩처럼 바로 끝나야 하는 작업
+        # "search_index": 레코드 전체를 읽는 검색 색인 생성. 다른 작업의 스레드를 차지하지 않도록 따로 둠
+        self.executors = {
+            None: ThreadPoolExecutor(max_workers=workers),
+            "interactive": ThreadPoolExecutor(max_workers=interactive_workers),
+            "search_index": ThreadPoolExecutor(max_workers=1),
+        }
+        # Tk 스레드에서 실행할 콜백
+        self.callbacks = queue.Queue()
+        # channel별 최신 작업 번호와 Future. 새 작업이 들어오면 이전 작업은 취소됨
+        self.generations = {}
+        self.futures = {}
+        self.closed = False
+
+        self.root.bind(TASK_DONE_EVENT, lambda event: self.run_pending(), add="+")
+        if self.root.tk.call("info", "exists", "tcl_platform(threaded)"):
+            self.wakeup = threading.Event()
+            threading.Thread(target=self.notify_worker, daemon=True).start()
+        else:
+            # 다른 스레드에서 Tk를 호출할 수 없는 경우 주기적으로 확인
+            self.wakeup = None
+            self.root.after(TASK_POLL_MS, self.poll)
+
+    def call_soon(self, callback):
+        # 어느 스레드에서나 호출 가능. callback()이 Tk 스레드에서 실행되도록 등록
+        self.callbacks.put(callback)
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def notify_worker(self):
+        # 작업 스레드가 Tk 호출을 기다리며 멈추지 않도록 가상 이벤트는 이 스레드에서만 발생시킴
+        while not self.closed:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            try:
+                self.root.event_generate(TASK_DONE_EVENT, when="tail")
+            except RuntimeError:
+                # mainloop가 아직 시작되지 않은 경우. 잠시 뒤 다시 알림
+                self.wakeup.set()
+                time.sleep(TASK_POLL_MS / 1000)
+            except tk.TclError:
+                # 창이 닫힌 경우
+                return
+
+    def poll(self):
+        self.run_pending()
+        if not self.closed:
+            self.root.after(TASK_POLL_MS, self.poll)
+
+    def run_pending(self):
+        while True:
+            try:
+                callback = self.callbacks.get_nowait()
+            except queue.Empty:
+                return
+            callback()
+
+    def submit(self, function, on_done=None, channel=None, pool=None):
+        # function()을 pool의 작업 스레드에서 실행하고, 끝나면 Tk 스레드에서 on_done(result, error) 호출
+        # channel이 주어지면 같은 channel의 이전 작업은 취소됨
+        # (아직 시작하지 않았으면 실행하지 않고, 이미 실행 중이면 결과를 버림)
+        generation = None
+        if channel is not None:
+            self.cancel(channel)
+            generation = self.generations[channel]
+
+        def run():
+            if not self.is_current(channel, generation):
+                return
+            try:
+                result = function()
+            except Exception as e:
+                if on_done is None:
+                    traceback.print_exception(type(e), e, e.__traceback__)
+                    return
+                result, error = None, e
+            else:
+                error = None
+            if on_done is not None:
+                self.call_soon(lambda: deliver(result, error))
+
+        def deliver(result, error):
+            # Tk 스레드에서 실행됨. 그 사이 같은 channel에 새 작업이 들어왔으면 결과를 버림
+            if self.is_current(channel, generation):
+                on_done(result, error)
+
+        future = self.executors[pool].submit(run)
+        if channel is not None:
+            self.futures[channel] = future
+        return future
+
+    def is_current(self, channel, generation):
+        return channel is None or self.generations.get(channel) == generation
+
+    def cancel(self, channel):
+        self.generations[channel] = self.generations.get(channel, 0) + 1
+        future = self.futures.pop(channel, None)
+        if future is not None:
+            future.cancel()
+
+    def shutdown(self):
+        self.closed = True
+        if self.wakeup is not None:
+            self.wakeup.set()
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
 class ImageLabelingApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Image Labeling App")
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
-        # Edit Triple 병렬 처리를 위한 Queue 생성
-        self.task_queue = queue.Queue()
-        self.root.after(100, self.process_queue)
+        # 백그라운드 작업 실행과 완료 콜백 전달 (작업 스레드 -> Tk 스레드)
+        self.dispatcher = TaskDispatcher(self.root)
+
+        # 하단 상태 표시줄 (저장 상태 등)
+        self.status_label = tk.Label(self.root, text="", anchor="w")
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
 
         # PanedWindow 생성
         self.paned_window = tk.PanedWindow(
@@ -36,18 +2716,18 @@ class ImageLabelingApp:
         self.left_frame = tk.Frame(self.paned_window)
         self.paned_window.add(self.left_frame, minsize=170)  # 최소 크기 설정
 
-        self.left_scrollbar = ttk.Scrollbar(self.left_frame)
-        self.left_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.image_listbox = tk.Listbox(
-            self.left_frame, yscrollcommand=self.left_scrollbar.set
+        # 이미지 목록 필터 (이미지 이름의 일부, 또는 "predicate:이름"으로 해당 predicate의 triple이 있는 이미지)
+        self.image_filter_var = tk.StringVar()
+        self.image_filter_entry = ttk.Entry(
+            self.left_frame, textvariable=self.image_filter_var
         )
-        self.image_listbox.pack(
-            side=tk.LEFT, fill=tk.BOTH, expand=True
-        )  # fill=tk.BOTH와 expand=True 추가
-        self.image_listbox.bind("<<ListboxSelect>>", self.on_image_select)
+        self.image_filter_entry.pack(side=tk.TOP, fill=tk.X)
+        self.image_filter_var.trace_add("write", lambda *args: self.schedule_image_filter())
+        self.image_filter_job = None
 
-        self.left_scrollbar.config(command=self.image_listbox.yview)
+        # 화면에 보이는 행만 그리는 가상 목록
+        self.image_list_view = VirtualListView(self.left_frame, self.on_image_select)
+        self.image_list_view.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
         # 중앙 패널: 이미지 표시
         self.center_frame = tk.Frame(self.paned_window)
@@ -86,42 +2766,16 @@ class ImageLabelingApp:
         self.canvas = tk.Canvas(self.center_frame)
         self.canvas.pack(fill=tk.BOTH, expand=True)
         self.canvas.bind("<Configure>", self.on_canvas_resize)
+        self.canvas.bind("<Motion>", self.on_canvas_motion)
 
         # 우측 패널: 장면 그래프
         self.right_frame = tk.Frame(self.paned_window)
         self.paned_window.add(self.right_frame, minsize=450)  # 최소 크기 설정
 
-        # 우측 패널에 스크롤바 추가
-        self.right_scrollbar = ttk.Scrollbar(self.right_frame)
-        self.right_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        # 스크롤 가능한 캔버스 생성
-        self.scroll_canvas = tk.Canvas(
-            self.right_frame, yscrollcommand=self.right_scrollbar.set
-        )
-        self.scroll_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        # 스크롤바와 캔버스 연결
-        self.right_scrollbar.config(command=self.scroll_canvas.yview)
-
-        # 캔버스 내부에 프레임 생성
-        self.notebook_frame = tk.Frame(self.scroll_canvas)
-        self.scroll_canvas.create_window(
-            (0, 0), window=self.notebook_frame, anchor="nw"
-        )
-
-        # 프레임 내부에 노트북 추가
-        self.notebook = ttk.Notebook(self.notebook_frame, style="TNotebook.Tab")
+        # predicate별 탭 추가
+        # 각 탭의 triple 목록은 Treeview로 표시하여 화면에 보이는 행만 그려지도록 함 (스크롤은 Treeview에서 처리)
+        self.notebook = ttk.Notebook(self.right_frame, style="TNotebook.Tab")
         self.notebook.pack(fill=tk.BOTH, expand=True)
-        self.last_selected_tab = None
-
-        # 캔버스 크기 조정 이벤트 바인딩
-        self.notebook_frame.bind(
-            "<Configure>",
-            lambda e: self.scroll_canvas.configure(
-                scrollregion=self.scroll_canvas.bbox("all")
-            ),
-        )
 
         # 탭 변경 이벤트 바인딩
         self.notebook.bind(
@@ -130,22 +2784,22 @@ class ImageLabelingApp:
         )
 
         self.predicate_tabs = {}
-        self.predicate_checkbuttons = {}
+        # predicate -> 해당 탭의 Treeview
+        self.predicate_trees = {}
+        # 표시 상태 모델
+        # triple_checked: triple_key -> 체크 여부 (이미지 위에 그릴지)
+        # predicate_triple_keys: predicate -> 해당 탭의 triple_key 집합
+        # tab_predicates: 탭 위젯 이름 -> predicate (탭 제목 문자열에 의존하지 않도록 함)
+        self.triple_checked = {}
+        self.predicate_triple_keys = {}
+        self.tab_predicates = {}
+        # triple_key <-> Treeview 행 id
+        self.triple_rows = {}
+        self.row_triples = {}
+        self.row_count = 0
         self.objects_ids_with_class = []
 
-        self.predicates = [
-            "to the left of",
-            "to the right of",
-            "above",
-            "below",
-            "in front of",
-            "behind",
-            "inside",
-            "located in",
-            "holding",
-            "carrying",
-            "riding",
-        ]
+        self.predicates = list(PREDICATES)
 
         self.relation_triples = (
             []
@@ -156,6 +2810,11 @@ class ImageLabelingApp:
         # 장면그래프 정보 초기화 여부
         self.relation_triple_info_initialized = False
 
+        # 오버레이를 PIL 이미지 대신 Tk Canvas 도형으로 그릴지 여부
+        self.canvas_overlay_var = tk.BooleanVar(value=False)
+        # 들여쓰기 없이 레코드마다 한 줄로 저장 (파일 크기와 저장 시간 감소)
+        self.compact_json_var = tk.BooleanVar(value=False)
+
         # 메뉴
         self.menu = tk.Menu(self.root)
         self.root.config(menu=self.menu)
@@ -168,9 +2827,22 @@ class ImageLabelingApp:
         self.file_menu.add_command(
             label="Save to JSON [CTRL + S]", command=self.save_to_json
         )
+        self.file_menu.add_command(
+            label="Export JSON Snapshot [CTRL + E]", command=self.export_snapshot
+        )
+        self.file_menu.add_checkbutton(
+            label="Compact JSON Output",
+            variable=self.compact_json_var,
+            command=self.on_compact_json_change,
+        )
+        self.file_menu.add_command(
+            label="Validate Dataset", command=self.run_validation
+        )
 
         # Ctrl + S 키 조합을 save_to_json 함수에 바인딩
         self.root.bind("<Control-s>", lambda event: self.save_to_json())
+        # Ctrl + E 키 조합을 export_snapshot 함수에 바인딩
+        self.root.bind("<Control-e>", lambda event: self.export_snapshot())
         # Ctrl + r 키 조합을 class_and_predicate_random_color 함수에 바인딩
         self.root.bind(
             "<Control-r>", lambda event: self.class_and_predicate_random_color()
@@ -191,6 +2863,14 @@ class ImageLabelingApp:
             command=self.class_and_predicate_random_color,
         )
 
+        self.view_menu = tk.Menu(self.menu, tearoff=0)
+        self.menu.add_cascade(label="View", menu=self.view_menu)
+        self.view_menu.add_checkbutton(
+            label="Canvas Vector Overlay",
+            variable=self.canvas_overlay_var,
+            command=self.on_render_mode_change,
+        )
+
         self.add_new_triple_menu = tk.Menu(self.menu, tearoff=0)
         self.menu.add_cascade(label="Add New Triple", menu=self.add_new_triple_menu)
         self.add_new_triple_menu.add_command(
@@ -200,9 +2880,90 @@ class ImageLabelingApp:
 
         self.folder_path = ""
         self.Class = []
-        self.image_files = []
         self.label_files = {}
         self.current_image = None
+        # 현재 이미지의 self.image_files 내 위치
+        self.current_index = None
+        self.image_files = []
+        self.image_positions = {}
+        self.image_name_positions = {}
+        # 불러온 장면 그래프의 역색인 (백그라운드에서 생성되며, 생성 중에는 None)
+        self.search_index = None
+        self.search_index_dirty = set()
+        # LazyVQAData의 레코드 위치 색인이 끝나기를 기다리는 중인지
+        self.search_index_deferred = False
+        self.image_prefix_length = 0
+        # 필터된 목록에 보이는 이미지들의 self.image_files 내 위치 (오름차순)
+        self.visible_indices = range(0)
+
+        # 디코딩된 이미지 LRU 캐시와 prefetch 상태
+        self.frame_cache = FrameCache()
+        self.last_prefetch = None
+        self.preview_cache = None
+
+        # 화면 표시용 레이어: 리사이즈된 원본 이미지(베이스)와 predicate별 오버레이
+        self.base_layer = None
+        self.base_layer_key = None
+        self.overlay_layers = {}
+        self.tk_image = None
+        self.canvas_image_item = None
+        self.label_font = None
+        self.objects = []
+        self.objects_by_id = {}
+        self.displayed_image_key = None
+
+        # 클릭/마우스 이동 시 화살표를 찾기 위한 현재 이미지의 공간 인덱스
+        self.hit_index = None
+
+        # 창 크기 변경 처리 상태: 마지막 고화질 이미지, 예약된 작업, 측정값
+        self.displayed_image = None
+        self.resize_preview_job = None
+        self.resize_settle_job = None
+        self.resize_stats = {"events": 0, "previews": 0, "full_renders": 0}
+        # 크기 조절이 끝난 뒤 다시 그리기 시작한 시각. 디코딩이 끝나고 실제로 그려지면 None
+        self.resize_render_start = None
+
+        # Tk Canvas 도형으로 오버레이를 그리는 모드 상태
+        # triple_key -> 캔버스 태그, 화살표 선 item id -> triple_key
+        self.canvas_overlay_key = None
+        self.canvas_triple_tags = {}
+        self.canvas_arrow_triples = {}
+        self.canvas_triple_visible = {}
+        self.color_version = 0
+
+        # 이미지 이름 -> self.vqa_data 내 위치 인덱스 (O(1) 조회용)
+        self.vqa_data = []
+        self.vqa_index = {}
+
+        # 가장 최근 스냅샷 이후의 triple 수정 기록
+        # pending_journal_entries: 아직 읽지 않은 레코드에 적용할 기록 (LazyVQAData 사용 시)
+        self.journal = None
+        self.pending_journal_entries = {}
+        # 이미지 이름 -> 불러올 때 제거한 중복 triple key 목록 (데이터 검사 결과에 표시)
+        self.removed_duplicates = {}
+
+        # 이미지 이름 -> 레코드의 triple key 집합 (중복 triple 방지용)
+        self.triple_keys = {}
+
+        # Dataset 폴더의 이미지 목록 캐시
+        self.manifest = None
+
+        # Dataset 폴더에 SQLite DB가 있을 때 사용하는 저장소 (없으면 None)
+        self.sqlite_store = None
+        # 이미지별 분할 파일을 사용할 때 그 폴더 경로 (없으면 None)
+        self.shard_dir = None
+
+        # 백그라운드 자동 저장 상태
+        # dirty_positions: 마지막 저장 이후 수정된 레코드 위치
+        self.autosaver = AutoSaver(
+            lambda result: self.dispatcher.call_soon(lambda: self.on_save_finished(result))
+        )
+        self.dirty_positions = set()
+        self.full_save_needed = True
+        self.edits_since_save = 0
+        self.autosave_timer = None
+        self.pending_save = None
+        self.last_autosave_path = None
 
         # 색상 매핑
         self.class_colors = {}
@@ -211,173 +2972,866 @@ class ImageLabelingApp:
         # 전체 체크/해제 체크버튼 변수
         self.checkbox_vars = {}
 
-        # 열린 edit_dialog 창들을 추적하기 위한 리스트
-        self.open_dialogs = []
-
-    def process_queue(self):
-        while not self.task_queue.empty():
-            task = self.task_queue.get()
-            task()
-        self.root.after(100, self.process_queue)
+        # triple 수정/추가 Dialog 관리 (풀에서 꺼내 재사용하고 닫은 뒤 포커스를 되돌림)
+        self.dialog_manager = DialogManager(
+            self.root,
+            lambda: TripleDialog(
+                self.root, self.get_preview_state, self.dialog_manager.release
+            ),
+        )
+        # 데이터 검사 결과 창
+        self.validation_window = None
+        # 수정/추가 Dialog 미리보기의 베이스 이미지: (캐시 key, PhotoImage)
+        self.dialog_base_photo = None
+        self.root.after_idle(self.dialog_manager.prewarm)
 
     def on_closing(self):
-        # json 폴더안에 저장되어 있는 파일들을 확인하여 가장 최근 파일의 시간이 현재 시간과 1분 이상 차이가 나는 경우
-        # 사용자에게 저장 여부를 묻는 메시지 창을 띄움
-        tmp_json_path_list = glob.glob(os.path.join(self.folder_path, "json", "*.json"))
-        tmp_json_path_list.sort(key=lambda x: os.path.getmtime(x))
-        if tmp_json_path_list:
-            if (
-                datetime.now().timestamp() - os.path.getmtime(tmp_json_path_list[-1])
-                > 60
-            ):
-                # 저장하고 종료, 저장하지 않고 종료, 취소 중 하나 선택
-                answer = messagebox.askyesnocancel(
-                    "종료",
-                    "최종 변경 사항을 저장하고 종료 하시겠습니까?",
-                    default=messagebox.CANCEL,
-                )
-                if answer is None:
-                    return
-                elif answer:
-                    self.save_to_json()
+        # 진행 중인 저장이 있으면 끝날 때까지 기다림
+        self.autosaver.wait()
+        self.dispatcher.run_pending()
+
+        # 수정 기록은 저널에 바로 저장되므로 종료 시 유실되지 않음
+        # 저널에 기록이 남아 있는 경우 JSON 파일로 저장할지 사용자에게 물어봄
+        if self.journal is not None and self.journal.entry_count > 0:
+            # 저장하고 종료, 저장하지 않고 종료, 취소 중 하나 선택
+            answer = messagebox.askyesnocancel(
+                "종료",
+                "최종 변경 사항을 JSON 파일로 저장하고 종료 하시겠습니까?\n"
+                "(저장하지 않아도 변경 사항은 다음 실행 시 복원됩니다)",
+                default=messagebox.CANCEL,
+            )
+            if answer is None:
+                return
+            elif answer:
+                if isinstance(self.vqa_data, LazyVQAData) and not self.vqa_data.complete:
+                    # request_save()는 색인이 끝날 때까지 저장을 미루므로 여기서 끝날 때까지 기다림
+                    self.status_label.config(text="레코드 색인이 끝난 뒤 저장합니다...")
+                    self.root.update_idletasks()
+                    self.vqa_data.wait()
+                self.request_save()
+                self.autosaver.wait()
+                self.dispatcher.run_pending()
+                # 저장에 실패하면 저널의 기록이 그대로 남아 있음
+                if self.journal is not None and self.journal.entry_count > 0:
+                    if not messagebox.askyesno(
+                        "종료",
+                        "JSON 파일을 저장하지 못했습니다.\n"
+                        f"({self.status_label.cget('text')})\n"
+                        "변경 사항은 다음 실행 시 복원됩니다. 그래도 종료 하시겠습니까?",
+                    ):
+                        return
+        if self.journal is not None:
+            self.journal.close()
+        if self.sqlite_store is not None:
+            self.sqlite_store.close()
+        self.dispatcher.shutdown()
         self.root.destroy()
 
     def save_to_json(self):
-        # self.vqa_data를 deepcopy하여 self.changed_vqa_data 생성
-        self.changed_vqa_data = copy.deepcopy(self.vqa_data)
+        # 백그라운드에서 JSON 파일을 저장 (다음 자동 저장 시 새 파일로 대체됨)
+        if self.sqlite_store is not None:
+            # DB 사용 시에는 수정할 때마다 바로 저장됨
+            self.status_label.config(text=f"변경 사항은 {SQLITE_FILE_NAME}에 저장되어 있습니다")
+            return
+        self.request_save()
+
+    def export_snapshot(self):
+        # 자동 저장으로 지워지지 않는 JSON 파일로 저장
+        if self.sqlite_store is not None:
+            self.export_sqlite_snapshot()
+            return
+        self.request_save(keep=True)
+
+    def export_sqlite_snapshot(self):
+        # DB 내용을 JSON 파일로 내보냄 (연결은 스레드마다 따로 열어야 하므로 작업 스레드에서 새로 엶)
+        if not self.image_files:
+            return
+        sqlite_path = self.sqlite_store.path
+        file_name = self.make_snapshot_path()
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+
+        def export():
+            store = SQLiteSceneGraphStore(sqlite_path)
+            try:
+                store.export_json(file_name)
+            finally:
+                store.close()
 
+        def on_done(result, error):
+            if error is not None:
+                self.status_label.config(text=f"Export failed: {error}")
+            else:
+                self.status_label.config(text=f"Exported {os.path.basename(file_name)}")
+
+        self.status_label.config(text="Exporting...")
+        self.dispatcher.submit(export, on_done)
+
+    def on_compact_json_change(self):
+        # 저장 형식이 바뀌면 다음 저장 시 모든 레코드를 다시 직렬화
+        self.full_save_needed = True
+
+    def mark_record_dirty(self):
+        # 현재 이미지의 레코드가 수정되었음을 기록하고, 필요하면 자동 저장 예약
+        position = self.vqa_index.get(os.path.basename(self.current_image))
+        if position is not None:
+            self.dirty_positions.add(position)
+            if isinstance(self.vqa_data, LazyVQAData):
+                self.vqa_data.pin(position)
+        self.edits_since_save += 1
+
+        if self.edits_since_save >= AUTOSAVE_EVERY_EDITS:
+            self.request_save()
+        elif self.autosave_timer is None:
+            self.autosave_timer = self.root.after(
+                AUTOSAVE_INTERVAL_MS, self.request_save
+            )
+
+    def make_snapshot_path(self):
         # 현재 날짜와 시간가 이미지 파일 범위를 가져와 파일 이름 생성
         current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         first_image_name = os.path.basename(self.image_files[0]).split(".")[0]
         last_image_name = os.path.basename(self.image_files[-1]).split(".")[0]
-        file_name = os.path.join(
+        base_name = os.path.join(
             self.folder_path,
             "json",
-            f"VQA_data_with_scene_graph({first_image_name}~{last_image_name})-{current_time}.json",
+            f"VQA_data_with_scene_graph({first_image_name}~{last_image_name})-{current_time}",
         )
+        # 같은 초에 여러 번 저장하는 경우 기존 파일을 덮어쓰지 않도록 번호를 붙임
+        file_name = f"{base_name}.json"
+        count = 1
+        while os.path.exists(file_name) or file_name == self.last_autosave_path:
+            file_name = f"{base_name}_{count}.json"
+            count += 1
+        return file_name
+
+    def request_save(self, keep=False):
+        if not self.image_files or self.journal is None:
+            return
+
+        if self.autosave_timer is not None:
+            self.root.after_cancel(self.autosave_timer)
+            self.autosave_timer = None
+
+        # 저장 중이면 끝난 뒤 한 번 더 저장
+        if self.autosaver.busy:
+            self.pending_save = keep or bool(self.pending_save)
+            return
+
+        raw_text = None
+        if isinstance(self.vqa_data, LazyVQAData):
+            # 색인이 끝나야 전체 레코드 수를 알 수 있으므로 끝날 때까지 저장을 미룸
+            if not self.vqa_data.complete:
+                self.status_label.config(text="레코드 색인이 끝난 뒤 저장합니다...")
+                self.autosave_timer = self.root.after(
+                    1000, lambda: self.request_save(keep)
+                )
+                return
+            # 색인이 중간에 실패했으면 색인된 레코드만 저장되어 나머지가 사라지므로 저장하지 않음
+            if self.vqa_data.error is not None:
+                self.status_label.config(
+                    text=f"레코드 색인 실패로 저장할 수 없습니다: {self.vqa_data.error!r}"
+                )
+                return
+            # 아직 적용되지 않은 저널 기록이 있는 레코드를 읽어서 적용
+            for image_name in list(self.pending_journal_entries):
+                self.get_vqa_item(image_name)
+            # 수정되지 않은 레코드는 원본 파일의 내용을 그대로 씀
+            raw_text = self.vqa_data.raw_text
+
+        # 분할 파일 사용 시 Ctrl+E는 분할 파일을 그대로 두고 하나의 JSON 파일로 내보냄
+        sharded = self.shard_dir is not None and not keep
+        export = self.shard_dir is not None and keep
+
+        # 저장 시점의 레코드와 triple 리스트 참조만 모아서 작업 스레드로 넘김
+        if sharded:
+            positions = self.dirty_positions
+        elif export:
+            positions = range(len(self.vqa_data))
+        elif raw_text is not None and self.full_save_needed:
+            positions = set(self.vqa_data.pinned) | self.dirty_positions
+        elif self.full_save_needed:
+            positions = range(len(self.vqa_data))
+        else:
+            positions = self.dirty_positions
+        records = {
+            position: (
+                self.vqa_data[position],
+                self.vqa_data[position]["scene_graph"]["triples"],
+            )
+            for position in positions
+        }
+        job = {
+            "path": self.shard_dir if sharded else self.make_snapshot_path(),
+            "count": len(self.vqa_data),
+            "records": records,
+            "positions": list(records),
+            "raw_text": raw_text,
+            "journal_path": self.journal.path,
+            "journal_mark": self.journal.entry_count,
+            "keep": keep,
+            "sharded": sharded,
+            "export": export,
+            "compact": self.compact_json_var.get(),
+        }
+        if not export:
+            self.dirty_positions = set()
+            self.full_save_needed = False
+            self.edits_since_save = 0
+
+        self.status_label.config(text="저장 중...")
+        self.autosaver.submit(job)
+
+    def on_save_finished(self, result):
+        # 저장 작업이 끝나면 메인 스레드에서 호출됨
+        self.autosaver.busy = False
+
+        # 저장 도중 다른 폴더를 연 경우 이전 폴더의 결과는 무시
+        if self.journal is None or result["journal_path"] != self.journal.path:
+            self.status_label.config(text="")
+        elif result["error"] is not None:
+            # 다음 저장 시 모든 레코드를 다시 직렬화 (수정 기록은 저널에 남아 있음)
+            # 분할 파일 사용 시에는 저장하지 못한 이미지의 파일을 다시 씀
+            self.full_save_needed = True
+            if result["sharded"]:
+                self.dirty_positions.update(result["positions"])
+            self.status_label.config(text=f"저장 실패: {result['error']}")
+        elif result["export"]:
+            # 분할 파일에서 내보낸 JSON 파일은 저널의 기준이 아니므로 저널은 그대로 둠
+            self.status_label.config(
+                text=f"{os.path.relpath(result['path'], self.folder_path)} 내보내기 완료"
+            )
+        else:
+            # 스냅샷에 반영된 기록을 저널에서 제거하고 새 스냅샷을 기준으로 변경
+            self.journal.rebase(
+                os.path.basename(result["path"]), result["journal_mark"]
+            )
+
+            # 이전 자동 저장 파일은 새 파일로 대체되었으므로 삭제
+            if self.last_autosave_path is not None:
+                try:
+                    os.remove(self.last_autosave_path)
+                except OSError:
+                    pass
+            if not result["sharded"]:
+                self.last_autosave_path = None if result["keep"] else result["path"]
+
+            self.status_label.config(
+                text=f"{os.path.relpath(result['path'], self.folder_path)} 저장 완료 "
+                f"({datetime.now().strftime('%H:%M:%S')})"
+            )
+
+        if self.pending_save is not None:
+            keep = self.pending_save
+            self.pending_save = None
+            self.request_save(keep)
 
-        # self.changed_vqa_data를 JSON 파일로 저장
-        with open(file_name, "w", encoding="utf-8") as json_file:
-            # 각 이미지별 relation triple들에서 중복되는 triple(딕셔너리) 제거
-            for item in self.changed_vqa_data:
-                tmp_list: list[dict] = item["scene_graph"]["triples"]
-                item["scene_graph"]["triples"] = [
-                    dict(t) for t in {tuple(d.items()) for d in tmp_list}
-                ]
+    def show_previous_image(self):
+        # 필터된 목록에서 현재 이미지의 바로 앞 이미지로 이동
+        if self.current_index is None:
+            return
+        position = bisect_left(self.visible_indices, self.current_index)
+        if position > 0:
+            self.show_image_at(self.visible_indices[position - 1])
+
+    def show_next_image(self):
+        # 필터된 목록에서 현재 이미지의 바로 뒤 이미지로 이동
+        if self.current_index is None:
+            position = 0
+        else:
+            position = bisect_right(self.visible_indices, self.current_index)
+        if position < len(self.visible_indices):
+            self.show_image_at(self.visible_indices[position])
 
-            json.dump(self.changed_vqa_data, json_file, ensure_ascii=False, indent=4)
+    def show_image_at(self, index):
+        # index: self.image_files 내 위치
+        self.current_index = index
+        self.current_image = self.image_files[index]
+        self.select_current_in_list()
 
-        # 저장이 완료되었음을 알리는 메시지 창 띄우기
-        # 상대 주소로 파일 이름을 표시
-        messagebox.showinfo(
-            "저장 완료",
-            f"{os.path.relpath(file_name, self.folder_path)} 파일 저장 완료",
+        self.relation_triple_info_initialized = False
+        self.display_image()
+
+    def select_current_in_list(self):
+        # 현재 이미지가 필터된 목록에 있으면 선택 표시
+        position = None
+        if self.current_index is not None:
+            position = bisect_left(self.visible_indices, self.current_index)
+            if (
+                position == len(self.visible_indices)
+                or self.visible_indices[position] != self.current_index
+            ):
+                position = None
+        self.image_list_view.select(position)
+
+    def image_label(self, position):
+        index = self.visible_indices[position]
+        return f"{index + 1}. {self.image_files[index][self.image_prefix_length:]}"
+
+    def schedule_image_filter(self):
+        # 입력이 멈춘 뒤 한 번만 필터 적용
+        if self.image_filter_job is not None:
+            self.root.after_cancel(self.image_filter_job)
+        self.image_filter_job = self.root.after(200, self.apply_image_filter)
+
+    def apply_image_filter(self):
+        self.image_filter_job = None
+        query = self.image_filter_var.get().strip()
+        if not query:
+            self.visible_indices = range(len(self.image_files))
+        else:
+            try:
+                terms = parse_image_query(query)
+            except ValueError as e:
+                self.status_label.config(text=f"검색어 오류: {e}")
+                return
+            self.visible_indices = self.search_images(terms)
+        self.image_list_view.set_items(len(self.visible_indices), self.image_label)
+        self.select_current_in_list()
+
+    def search_images(self, terms):
+        # 역색인 조건은 이미지 이름 집합으로 계산하고, 경로 조건은 남은 이미지에만 적용
+        index_terms = [term for term in terms if term[1] != "path"]
+        path_terms = [term for term in terms if term[1] == "path"]
+
+        if not index_terms:
+            indices = range(len(self.image_files))
+        elif self.search_index is None:
+            # 색인이 끝나면 검색어를 다시 적용함
+            self.status_label.config(text="검색 색인 생성 중...")
+            return []
+        else:
+            all_names = self.image_name_positions.keys()
+            names = None
+            for negate, field, value, count_match in sorted(
+                index_terms, key=lambda term: term[0]
+            ):
+                matched = self.search_index.find_images(
+                    field, value, count_match, all_names
+                )
+                if negate:
+                    names = (set(all_names) if names is None else names) - matched
+                else:
+                    names = matched if names is None else names & matched
+            indices = sorted(
+                self.image_name_positions[name]
+                for name in names
+                if name in self.image_name_positions
+            )
+
+        if not path_terms:
+            return indices
+        return [
+            index
+            for index in indices
+            if all(
+                (value in self.image_files[index][self.image_prefix_length :].lower())
+                != negate
+                for negate, _, value, _ in path_terms
+            )
+        ]
+
+    def build_search_index(self):
+        # 작업 스레드에서 불러온 레코드 전체의 역색인을 만듦
+        # 색인을 만드는 동안 수정된 이미지는 기록해 두었다가 완료 후 다시 반영
+        self.search_index = None
+        self.search_index_dirty = set()
+        self.dispatcher.cancel("search_index")
+        # LazyVQAData는 레코드 위치 색인이 끝난 뒤 update_indexing_status()에서 시작
+        # (작업 스레드가 색인 완료를 기다리며 멈춰 있지 않도록)
+        self.search_index_deferred = (
+            isinstance(self.vqa_data, LazyVQAData) and not self.vqa_data.complete
+        )
+        if not self.search_index_deferred:
+            self.start_search_index_build()
+
+    def start_search_index_build(self):
+        self.search_index_deferred = False
+        iter_records = self.loaded_records_source()
+        self.dispatcher.submit(
+            lambda: SceneGraphIndex.build(iter_records()),
+            self.on_search_index_built,
+            channel="search_index",
+            pool="search_index",
+        )
+
+    def loaded_records_source(self):
+        # 불러온 레코드 전체(저장되지 않은 수정 사항 포함)를 순회하는 함수를 반환. 반환된 함수는 작업 스레드에서 호출
+        # 반환된 함수에 dict를 넘기면 순회 중 제거한 중복 triple을 이미지 이름별로 기록함
+        if self.sqlite_store is not None:
+            sqlite_path = self.sqlite_store.path
+
+            def iter_records(removed_duplicates=None):
+                # SQLite DB에는 중복 triple이 저장되지 않으므로 removed_duplicates는 사용하지 않음
+                # 연결은 스레드마다 따로 열어야 하므로 작업 스레드에서 새로 엶
+                store = SQLiteSceneGraphStore(sqlite_path)
+                try:
+                    yield from store.iter_records()
+                finally:
+                    store.close()
+
+            return iter_records
+        vqa_data = self.vqa_data
+        pending_journal_entries = self.pending_journal_entries
+        return partial(self.iter_search_records, vqa_data, pending_journal_entries)
+
+    def iter_search_records(
+        self, vqa_data, pending_journal_entries, removed_duplicates=None
+    ):
+        # 작업 스레드에서 실행됨
+        if not isinstance(vqa_data, LazyVQAData):
+            yield from list(vqa_data)
+            return
+        # LazyVQAData는 캐시를 건드리지 않도록 직접 파싱하고, 아직 적용되지 않은 저널 기록은 복사본에 적용
+        # 레코드 위치 색인이 끝난 뒤에만 호출됨
+        for position in range(len(vqa_data)):
+            item = vqa_data.pinned.get(position)
+            if item is None:
+                item = json.loads(vqa_data.raw_text(position))
+                removed = dedup_triples(item)
+                if removed and removed_duplicates is not None:
+                    removed_duplicates[item["image"]["image_name"]] = removed
+                for entry in pending_journal_entries.get(item["image"]["image_name"], ()):
+                    apply_journal_entry(item, entry)
+            yield item
+
+    def on_search_index_built(self, search_index, error):
+        if error is not None:
+            self.status_label.config(text=f"검색 색인 생성 실패: {error}")
+            return
+        self.search_index = search_index
+        for image_name in self.search_index_dirty:
+            self.update_search_index(image_name)
+        self.search_index_dirty = set()
+        if self.image_filter_var.get().strip():
+            self.apply_image_filter()
+
+    def update_search_index(self, image_name):
+        # triple이 수정된 이미지의 색인만 다시 계산
+        if self.search_index is None:
+            self.search_index_dirty.add(image_name)
+            return
+        item = self.get_vqa_item(image_name)
+        if item is None:
+            return
+        self.search_index.update_record(item)
+        # 색인을 사용하는 검색어가 입력되어 있으면 목록도 갱신
+        query = self.image_filter_var.get()
+        if any(f"{field}:" in query for field in QUERY_FIELDS):
+            self.schedule_image_filter()
+
+    def open_folder(self):
+        self.folder_path = filedialog.askdirectory()
+        if not self.folder_path:
+            return
+
+        self.frame_cache.clear()
+        self.last_prefetch = None
+        self.base_layer_key = None
+
+        # Dataset 폴더 안의 디스크 미리보기 캐시 사용
+        self.preview_cache = PreviewCache(
+            os.path.join(self.folder_path, PREVIEW_CACHE_DIR_NAME)
+        )
+        self.frame_cache.preview_cache = self.preview_cache
+
+        # 하위 폴더의 이미지도 검색하도록 수정
+        # 저장된 manifest가 있으면 저장된 목록을 바로 사용하고, 바뀐 부분은 백그라운드에서 확인하여 반영
+        self.manifest = DatasetManifest(self.folder_path)
+        manifest_loaded = self.manifest.load()
+        if not manifest_loaded:
+            self.manifest.refresh()
+
+        # data.yaml 파일 읽기
+        self.Class = load_class_names(self.folder_path)
+        if self.Class:
+            # 클래스별 랜덤 색상 매핑
+            self.class_colors = {cls: self.get_random_color() for cls in self.Class}
+            self.predicate_colors = {
+                predicate: self.get_random_color() for predicate in self.predicates
+            }
+            self.color_version += 1
+            # print(self.class_colors)
+
+        self.load_records()
+        self.build_search_index()
+
+        # 레코드를 읽은 뒤에 이미지 목록을 표시 (검색어가 새 레코드의 색인을 사용하도록)
+        self.set_image_files(self.manifest.image_files())
+        # 다른 폴더를 열면 이전 폴더의 갱신 작업은 취소됨
+        if manifest_loaded:
+            manifest = self.manifest
+            self.dispatcher.submit(
+                lambda: self.refresh_manifest(manifest),
+                lambda image_files, error: self.on_manifest_refreshed(
+                    manifest, image_files, error
+                ),
+                channel="manifest",
+            )
+        else:
+            self.dispatcher.cancel("manifest")
+            self.dispatcher.submit(self.manifest.save)
+
+    def load_records(self):
+        # 자동 저장 상태 초기화 (처음 저장할 때는 모든 레코드를 직렬화)
+        self.autosaver.reset()
+        self.dirty_positions = set()
+        self.full_save_needed = True
+        self.edits_since_save = 0
+        self.last_autosave_path = None
+        self.triple_keys = {}
+        self.removed_duplicates = {}
+
+        # SQLite DB가 있으면 JSON 스냅샷과 저널 대신 DB에서 읽고 수정 사항을 바로 씀
+        if self.sqlite_store is not None:
+            self.sqlite_store.close()
+            self.sqlite_store = None
+        sqlite_path = os.path.join(self.folder_path, SQLITE_FILE_NAME)
+        if os.path.exists(sqlite_path):
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+            self.sqlite_store = SQLiteSceneGraphStore(sqlite_path)
+            self.vqa_data = []
+            self.vqa_index = self.sqlite_store.image_positions()
+            self.status_label.config(text=f"{SQLITE_FILE_NAME} 사용 중")
+            return
+
+        self.pending_journal_entries = {}
+        shard_dir = os.path.join(self.folder_path, "json", SHARD_DIR_NAME)
+        if os.path.exists(os.path.join(shard_dir, SHARD_INDEX_FILE_NAME)):
+            # 이미지별 분할 파일을 사용 (저널은 분할 폴더 이름을 기준으로 함)
+            self.shard_dir = json_path = shard_dir
+        else:
+            self.shard_dir = None
+            # VQA_data_with_scene_graph.json 파일 읽기
+            json_path = find_latest_json(self.folder_path)  # 가장 최근 파일 선택
+        print(json_path)
+        if self.shard_dir is not None:
+            # 분할 파일을 병렬로 읽음. 저장 시에는 수정된 이미지의 파일만 다시 씀
+            self.vqa_data = load_shards(self.shard_dir)
+        elif json_path is None:
+            self.vqa_data = []
+        elif os.path.getsize(json_path) >= LAZY_LOAD_MIN_BYTES:
+            # 큰 파일은 레코드 위치만 백그라운드에서 색인하고 필요한 레코드만 읽음
+            self.vqa_data = LazyVQAData(
+                json_path,
+                on_materialize=self.on_record_materialized,
+                record_index=self.manifest.get_record_index(json_path),
+            )
+            self.update_indexing_status()
+        else:
+            with open(json_path, "r") as file:
+                self.vqa_data = json.load(file)
+
+        # 이미지 이름으로 레코드를 바로 찾을 수 있도록 인덱스 생성
+        self.build_vqa_index()
+
+        # 파일에 저장된 중복 triple을 순서를 유지하며 한 번만 제거 (LazyVQAData는 레코드를 읽을 때 제거)
+        if not isinstance(self.vqa_data, LazyVQAData):
+            for position, item in enumerate(self.vqa_data):
+                removed = dedup_triples(item)
+                if removed:
+                    self.dirty_positions.add(position)
+                    self.removed_duplicates[item["image"]["image_name"]] = removed
+
+        # 스냅샷 이후의 수정 기록을 다시 적용
+        self.replay_journal(json_path)
+
+    def set_image_files(self, image_files):
+        self.image_files = image_files
+        # 이미지 경로 -> 목록 내 위치
+        self.image_positions = {path: index for index, path in enumerate(image_files)}
+        # 이미지 파일 이름 -> 목록 내 위치 (검사 결과에서 이미지로 이동할 때 사용)
+        self.image_name_positions = {
+            os.path.basename(path): index for index, path in enumerate(image_files)
+        }
+        # 목록에는 Dataset 폴더 기준 상대 경로를 표시
+        self.image_prefix_length = len(os.path.join(self.folder_path, ""))
+        # 보고 있던 이미지가 목록에 남아 있으면 위치를 갱신
+        self.current_index = self.image_positions.get(self.current_image)
+        self.apply_image_filter()
+
+    def refresh_manifest(self, manifest):
+        # 작업 스레드에서 실행됨. 바뀐 디렉터리만 다시 읽고, 목록이 바뀌었으면 새 목록을 반환
+        if not manifest.refresh():
+            return None
+        manifest.save()
+        return manifest.image_files()
+
+    def on_manifest_refreshed(self, manifest, image_files, error):
+        # 목록이 그대로이거나, 그 사이에 다른 폴더를 열었으면 무시
+        if error is not None:
+            self.status_label.config(text=f"이미지 목록 갱신 실패: {error}")
+            return
+        if image_files is None or manifest is not self.manifest:
+            return
+        self.set_image_files(image_files)
+        self.status_label.config(text=f"이미지 목록 갱신 완료 ({len(image_files)}개)")
+
+    def run_validation(self):
+        # 불러온 레코드(저널, 분할 파일, SQLite DB의 내용과 저장되지 않은 수정 사항 포함)를 작업 스레드에서 검사
+        # 저장된 파일만 검사하려면 validate 명령 사용
+        if not self.folder_path:
+            return
+        if isinstance(self.vqa_data, LazyVQAData) and not self.vqa_data.complete:
+            self.status_label.config(text="레코드 색인이 끝난 뒤 검사할 수 있습니다.")
+            return
+        folder_path = self.folder_path
+        iter_records = self.loaded_records_source()
+        check = partial(validate_records, set(self.Class), set(PREDICATES))
+        # 불러올 때 이미 제거된 중복 triple도 결과에 포함
+        removed_duplicates = dict(self.removed_duplicates)
+
+        def validate():
+            issues = check(iter_records(removed_duplicates))
+            for image_name, triple_keys in removed_duplicates.items():
+                for subject_id, predicate, object_id in triple_keys:
+                    issues.append(
+                        (
+                            image_name,
+                            "duplicate_triple",
+                            f"({subject_id}, {predicate}, {object_id}): 불러올 때 제거됨",
+                        )
+                    )
+            return issues
+
+        self.status_label.config(text="데이터 검사 중...")
+        self.dispatcher.submit(
+            validate,
+            lambda issues, error: self.show_validation_report(
+                folder_path, issues, error
+            ),
+            channel="validate",
+        )
+
+    def show_validation_report(self, folder_path, issues, error):
+        # 그 사이에 다른 폴더를 열었으면 무시
+        if folder_path != self.folder_path:
+            return
+        if error is not None:
+            self.status_label.config(text=f"데이터 검사 실패: {error}")
+            return
+        self.status_label.config(text=f"데이터 검사 완료: 문제 {len(issues)}개")
+
+        # 이전 결과 창은 닫고 새로 띄움
+        if self.validation_window is not None and self.validation_window.winfo_exists():
+            self.validation_window.destroy()
+        window = tk.Toplevel(self.root)
+        window.title(f"검사 결과 - {os.path.basename(folder_path)} ({len(issues)}개)")
+        window.geometry("900x400")
+        self.validation_window = window
+
+        # 열 제목을 클릭하면 정렬, 행을 클릭하면 해당 이미지로 이동
+        tree = ttk.Treeview(
+            window, columns=("image", "kind", "detail"), show="headings"
+        )
+        sort_state = {"column": None, "reverse": False}
+        for column, text, width in (
+            ("image", "이미지", 250),
+            ("kind", "문제", 150),
+            ("detail", "내용", 450),
+        ):
+            tree.heading(
+                column,
+                text=text,
+                command=lambda column=column: self.sort_validation_report(
+                    tree, column, sort_state
+                ),
+            )
+            tree.column(column, width=width, stretch=column == "detail")
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        for issue in issues:
+            tree.insert("", tk.END, values=issue)
+        tree.bind(
+            "<<TreeviewSelect>>", lambda event: self.on_validation_select(tree)
         )
 
-    def show_previous_image(self):
-        current_index = self.image_files.index(self.current_image)
-        if current_index > 0:
-            self.current_image = self.image_files[current_index - 1]
-            self.image_listbox.selection_clear(0, tk.END)  # 기존 선택을 모두 해제
-            self.image_listbox.selection_set(current_index - 1)  # 주어진 인덱스를 선택
-            self.image_listbox.activate(
-                current_index - 1
-            )  # 선택된 항목으로 포커스를 이동
-
-            self.relation_triple_info_initialized = False
-            self.last_selected_tab = None
-            self.display_image()
-
-    def show_next_image(self):
-        current_index = self.image_files.index(self.current_image)
-        if current_index < len(self.image_files) - 1:
-            self.current_image = self.image_files[current_index + 1]
-            self.image_listbox.selection_clear(0, tk.END)  # 기존 선택을 모두 해제
-            self.image_listbox.selection_set(current_index + 1)  # 주어진 인덱스를 선택
-            self.image_listbox.activate(current_index + 1)
-
-            self.relation_triple_info_initialized = False
-            self.last_selected_tab = None
-            self.display_image()
+    def sort_validation_report(self, tree, column, sort_state):
+        # 같은 열을 다시 누르면 역순으로 정렬. 값이 같으면 이미지 이름 순서
+        reverse = sort_state["column"] == column and not sort_state["reverse"]
+        sort_state["column"] = column
+        sort_state["reverse"] = reverse
+        rows = sorted(
+            tree.get_children(""),
+            key=lambda row_id: (tree.set(row_id, column), tree.set(row_id, "image")),
+            reverse=reverse,
+        )
+        for index, row_id in enumerate(rows):
+            tree.move(row_id, "", index)
 
-    def open_folder(self):
-        self.folder_path = filedialog.askdirectory()
-        if not self.folder_path:
+    def on_validation_select(self, tree):
+        selection = tree.selection()
+        if not selection:
             return
+        image_name = tree.set(selection[0], "image")
+        index = self.image_name_positions.get(image_name)
+        if index is None:
+            self.status_label.config(text=f"이미지 파일을 찾을 수 없습니다: {image_name}")
+            return
+        self.show_image_at(index)
 
-        self.image_files = []
-        self.image_listbox.delete(0, tk.END)
-
-        # 하위 폴더의 이미지도 검색하도록 수정
-        for idx, img_file in enumerate(
-            glob.glob(os.path.join(self.folder_path, "**", "*.jpg"), recursive=True)
-        ):
-            self.image_files.append(img_file)
-            self.image_listbox.insert(
-                tk.END, f"{idx + 1}. {os.path.relpath(img_file, self.folder_path)}"
-            )  # 이미지 리스트에 번호 추가
-
-        # data.yaml 파일 읽기
-        yaml_path = os.path.join(self.folder_path, "data.yaml")
-        if os.path.exists(yaml_path):
-            with open(yaml_path, "r") as file:
-                data = yaml.safe_load(file)
-                self.Class = data.get("names", [])
-                # 클래스별 랜덤 색상 매핑
-                self.class_colors = {cls: self.get_random_color() for cls in self.Class}
-                self.predicate_colors = {
-                    predicate: self.get_random_color() for predicate in self.predicates
-                }
-                # print(self.class_colors)
-        else:
-            self.Class = []
-
-        # VQA_data_with_scene_graph.json 파일 읽기
-        json_path_list = glob.glob(os.path.join(self.folder_path, "json", "*.json"))
-        json_path_list.sort(
-            key=lambda x: os.path.getmtime(x)
-        )  # 날짜와 시간이 포함된 파일명을 기준으로 정렬
-        json_path = json_path_list[-1]  # 가장 최근 파일 선택
-        print(json_path)
-        if os.path.exists(json_path):
-            with open(json_path, "r") as file:
-                self.vqa_data = json.load(file)
+    def replay_journal(self, json_path):
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = EditJournal(
+            os.path.join(self.folder_path, "json", JOURNAL_FILE_NAME)
+        )
+        snapshot_name = os.path.basename(json_path) if json_path else None
+        journal_snapshot_name, entries = self.journal.read()
+
+        if journal_snapshot_name != snapshot_name:
+            # 다른 스냅샷을 기준으로 한 기록은 적용하지 않고 백업해 둠
+            # (스냅샷 저장 직후 저널을 비우기 전에 종료된 경우도 여기에 해당하며, 이때는 이미 스냅샷에 반영되어 있음)
+            if entries:
+                backup_path = (
+                    f"{self.journal.path}.{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.bak"
+                )
+                os.replace(self.journal.path, backup_path)
+                print(f"Journal for {journal_snapshot_name} moved to {backup_path}")
+            self.journal.start(snapshot_name)
+            entries = []
+
+        if isinstance(self.vqa_data, LazyVQAData):
+            # 레코드를 처음 읽을 때 적용하도록 이미지별로 모아둠
+            for entry in entries:
+                self.pending_journal_entries.setdefault(entry["image"], []).append(entry)
         else:
-            self.vqa_data = {}
+            for entry in entries:
+                item = self.get_vqa_item(entry["image"])
+                if item is not None:
+                    apply_journal_entry(item, entry, self.get_triple_keys(item))
+                    # 분할 파일 사용 시 다음 저장 때 해당 파일을 다시 쓰도록 표시
+                    self.dirty_positions.add(self.vqa_index[entry["image"]])
+        if entries:
+            print(f"{len(entries)} journal entries replayed")
+
+        self.journal.open(len(entries))
+
+    def record_edit(self, op, triple_key, new_triple_key=None):
+        # 현재 이미지의 triple 수정을 저널에 기록
+        if self.sqlite_store is not None:
+            # DB 사용 시에는 트랜잭션으로 바로 반영하므로 저널과 자동 저장이 필요 없음
+            self.sqlite_store.apply_edit(
+                os.path.basename(self.current_image), op, triple_key, new_triple_key
+            )
+            self.update_search_index(os.path.basename(self.current_image))
+            return
+        if self.journal is not None:
+            self.journal.append(
+                op, os.path.basename(self.current_image), triple_key, new_triple_key
+            )
+        self.mark_record_dirty()
+        self.update_search_index(os.path.basename(self.current_image))
+
+    def build_vqa_index(self):
+        # 이미지 이름 -> self.vqa_data 내 위치
+        self.vqa_index = build_record_index(self.vqa_data)
+
+    def get_vqa_item(self, image_name):
+        # 이미지 이름에 해당하는 레코드를 O(1)로 반환. 없으면 None
+        if self.sqlite_store is not None:
+            return self.sqlite_store.get_record(image_name)
+        return find_record(self.vqa_data, self.vqa_index, image_name)
+
+    def on_record_materialized(self, position, item):
+        # LazyVQAData에서 레코드를 처음 파싱할 때 호출됨
+        # 아직 적용되지 않은 저널 기록이 있으면 적용하고, 변경 사항이 유지되도록 고정
+        # 파일에 중복 triple이 있었다면 제거한 결과가 저장되도록 고정
+        image_name = item["image"]["image_name"]
+        removed = dedup_triples(item)
+        if removed:
+            self.removed_duplicates[image_name] = removed
+        entries = self.pending_journal_entries.pop(image_name, None)
+        if not entries and not removed:
+            return False
+        for entry in entries or []:
+            apply_journal_entry(item, entry, self.get_triple_keys(item))
+        self.dirty_positions.add(position)
+        return True
+
+    def get_triple_keys(self, item):
+        # 레코드의 triple key 집합. 처음 사용할 때 만들고 이후에는 추가/수정/삭제 시 함께 갱신됨
+        image_name = item["image"]["image_name"]
+        triple_keys = self.triple_keys.get(image_name)
+        if triple_keys is None:
+            triple_keys = self.triple_keys[image_name] = {
+                triple_key_of(triple) for triple in item["scene_graph"]["triples"]
+            }
+        return triple_keys
+
+    def has_triple(self, triple_key):
+        # 현재 이미지에 이미 있는 triple인지 확인
+        item = self.get_current_vqa_item()
+        return item is not None and triple_key in self.get_triple_keys(item)
+
+    def update_indexing_status(self):
+        # 백그라운드 색인 진행 상황을 상태 표시줄에 표시
+        if not isinstance(self.vqa_data, LazyVQAData):
+            return
+        if self.vqa_data.complete and self.vqa_data.error is not None:
+            # 일부만 색인된 상태로 저장하면 레코드가 사라지므로 저장하지 않음 (request_save 참고)
+            self.status_label.config(
+                text=f"레코드 색인 실패 ({len(self.vqa_data)}개 이후): {self.vqa_data.error!r} "
+                "- JSON 파일을 고친 뒤 다시 열어주세요 (수정 사항은 저널에 기록됨)"
+            )
+            if self.search_index_deferred:
+                self.start_search_index_build()
+            return
+        if self.vqa_data.complete:
+            self.status_label.config(text=f"{len(self.vqa_data)}개 레코드 색인 완료")
+            # 다음에 같은 파일을 열 때 다시 색인하지 않도록 manifest에 저장
+            if self.vqa_data.thread is not None and self.manifest is not None:
+                self.manifest.set_record_index(
+                    self.vqa_data.path, self.vqa_data.names, self.vqa_data.offsets
+                )
+                self.dispatcher.submit(self.manifest.save)
+            if self.search_index_deferred:
+                self.start_search_index_build()
+            return
+        self.status_label.config(text=f"레코드 색인 중... ({len(self.vqa_data)}개)")
+        self.root.after(500, self.update_indexing_status)
+
+    def get_current_vqa_item(self):
+        if not self.current_image:
+            return None
+        return self.get_vqa_item(os.path.basename(self.current_image))
 
     def display_image(self):
         if not self.current_image:
             return
 
         image_path = self.current_image
-        image = Image.open(image_path)
 
         self.image_name_label.config(text=os.path.basename(image_path))
 
-        # 중앙 패널의 너비에 맞춰 이미지 리사이즈
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        aspect_ratio = image.height / image.width
-        new_width = canvas_width
-        new_height = int(new_width * aspect_ratio)
-        image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-        # 이미지의 현재 크기와 위치 저장
-        self.image_x = (canvas_width - new_width) // 2
-        self.image_y = (canvas_height - new_height) // 2
-        self.current_image_width = new_width
-        self.current_image_height = new_height
-
         # 레이블 정보 읽기
         image_name = os.path.basename(image_path)
         objects = []
         relation_triples = []
-        for item in self.vqa_data:
-            if item["image"]["image_name"] == image_name:
-                objects = item["scene_graph"]["objects"]
-                relation_triples = item["scene_graph"]["triples"]
-                break
+        item = None
+        if (
+            self.sqlite_store is None
+            and isinstance(self.vqa_data, LazyVQAData)
+            and self.vqa_data.when_indexed(
+                image_name,
+                lambda: self.dispatcher.call_soon(
+                    lambda: self.on_record_indexed(image_path)
+                ),
+            )
+        ):
+            # 아직 색인되지 않은 레코드는 기다리지 않고 이미지만 먼저 표시. 색인되면 다시 표시함
+            self.image_name_label.config(text=f"{image_name} (레코드 색인 중...)")
+        else:
+            item = self.get_vqa_item(image_name)
+        if item is not None:
+            objects = item["scene_graph"]["objects"]
+            relation_triples = item["scene_graph"]["triples"]
         self.objects = objects
+        self.objects_by_id = {obj["object_id"]: obj for obj in self.objects}
         self.object_ids = [obj["object_id"] for obj in self.objects]
         self.objects_ids_with_class = [
             f"{obj['class']}: {obj['object_id']}" for obj in self.objects
@@ -388,230 +3842,393 @@ class ImageLabelingApp:
 
         # Relation Triple 표시
         if not self.relation_triple_info_initialized:
+            self.hit_index = None
             self.display_relation_triples()
             self.relation_triple_info_initialized = True
             # print("Relation triple info initialized")  # 디버깅 출력
 
+        # 중앙 패널의 너비에 맞춰 리사이즈된 이미지를 캐시에서 가져와 베이스 레이어로 사용
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+
+        # 앞/뒤 이미지를 백그라운드에서 미리 읽어둠
+        self.prefetch_neighbor_images(canvas_width)
+
+        # 캐시에 없으면 작업 스레드에서 디코딩하고, 끝나면 이 함수가 다시 호출됨
+        if not self.update_base_layer(image_path, canvas_width):
+            return
+        new_width, new_height = self.base_layer.size
+
+        # 이미지의 현재 크기와 위치 저장
+        self.image_x = (canvas_width - new_width) // 2
+        self.image_y = (canvas_height - new_height) // 2
+        self.current_image_width = new_width
+        self.current_image_height = new_height
+
         # Relation Triple 그리기
-        self.draw_relation_triple(image)
+        self.redraw_overlay()
+        self.finish_resize_render()
+
+        self.canvas.bind("<Button-1>", self.on_image_click)
+
+    def on_record_indexed(self, image_path):
+        # 레코드 색인을 기다리던 이미지가 아직 표시 중이면 레이블 정보를 다시 읽어서 표시
+        if image_path != self.current_image:
+            return
+        self.relation_triple_info_initialized = False
+        self.display_image()
 
-        self.canvas.create_image(
-            canvas_width // 2, canvas_height // 2, anchor=tk.CENTER, image=self.tk_image
+    def update_base_layer(self, image_path, width):
+        # 이미지나 크기가 바뀐 경우에만 베이스 레이어와 오버레이 레이어를 새로 만듦
+        # 베이스 레이어가 준비되었으면 True, 작업 스레드에서 디코딩을 시작했으면 False
+        base_layer_key = (image_path, width)
+        if self.base_layer_key == base_layer_key:
+            return True
+
+        frame = self.frame_cache.peek(image_path, width)
+        if frame is not None:
+            self.dispatcher.cancel("base_layer")
+            self.set_base_layer(base_layer_key, frame.convert("RGBA"))
+            return True
+
+        # 디코딩이 끝날 때까지 이전 이미지의 레이어를 사용하지 않도록 비움
+        # 그 사이 다른 이미지로 넘어가면 이전 디코딩 작업은 취소됨
+        self.base_layer = None
+        self.base_layer_key = None
+        self.overlay_layers.clear()
+        if self.canvas_overlay_var.get():
+            self.clear_canvas_overlay()
+        self.dispatcher.submit(
+            lambda: self.frame_cache.get(image_path, width).convert("RGBA"),
+            lambda base_layer, error: self.on_base_layer_loaded(
+                base_layer_key, base_layer, error
+            ),
+            channel="base_layer",
+            pool="interactive",
         )
+        return False
 
-        self.canvas.bind("<Button-1>", self.on_image_click)
+    def set_base_layer(self, base_layer_key, base_layer):
+        self.base_layer_key = base_layer_key
+        self.base_layer = base_layer
+        self.overlay_layers.clear()
 
-    def on_image_click(self, event):
-        # 클릭된 지점의 좌표 얻기
-        x = event.x
-        y = event.y
+    def on_base_layer_loaded(self, base_layer_key, base_layer, error):
+        if error is not None:
+            self.status_label.config(
+                text=f"이미지를 읽을 수 없습니다: {os.path.basename(base_layer_key[0])} ({error})"
+            )
+            return
+        if base_layer_key[0] != self.current_image:
+            return
+        self.set_base_layer(base_layer_key, base_layer)
+        self.display_image()
 
-        clicked_triple = []
+    def redraw_overlay(self):
+        # 베이스 레이어 위에 predicate별 오버레이 레이어를 합성하여 캔버스에 표시
+        # 체크 상태가 바뀐 predicate의 레이어만 다시 그림
+        if self.base_layer is None:
+            return
 
-        # 클릭된 지점이 이미지 내부에 있는지 확인
-        if (
-            self.image_x <= x <= self.image_x + self.current_image_width
-            and self.image_y <= y <= self.image_y + self.current_image_height
-        ):
-            # 이미지 상의 좌표로 변환
-            image_x = x - self.image_x
-            image_y = y - self.image_y
-            image_x /= self.current_image_width
-            image_y /= self.current_image_height
+        # Canvas 도형 모드에서는 베이스 이미지만 올리고 도형의 표시 여부만 변경
+        if self.canvas_overlay_var.get():
+            self.displayed_image = self.base_layer
+            self.show_canvas_image(self.base_layer, key=self.base_layer_key)
+            self.update_canvas_overlay()
+            return
 
-            # 현재 선택된 탭의 이름을 가져옴
-            current_predicate = self.notebook.tab(self.notebook.select(), "text")
+        checked_triples = {}
+        for triple, checked in self.triple_checked.items():
+            if checked:
+                checked_triples.setdefault(triple[1], []).append(triple)
 
-            # Subject와 Bounding의 중심 지점을 이은 선분의 방정식을 이용하여 클릭한 지점이 선분 위에 있는지 확인
-            for triple in self.relation_triples:
-                if triple["predicate"] != current_predicate:
-                    continue
-                object = None
-                subject = None
-                for obj in self.objects:
-                    if obj["object_id"] == triple["object_id"]:
-                        object = obj
-                    elif obj["object_id"] == triple["subject_id"]:
-                        subject = obj
-                    if object and subject:
-                        break
-
-                subject_x_center, subject_y_center, subject_width, subject_height = (
-                    subject["bounding_box"]
-                )
-                object_x_center, object_y_center, object_width, object_height = object[
-                    "bounding_box"
-                ]
-
-                # 선분의 방정식: y = ax + b
-                # Divide by Zero 예방
-                if object_x_center == subject_x_center:
-                    a = (object_y_center - subject_y_center) / sys.float_info.epsilon
-                    b = subject_y_center - a * subject_x_center
-                else:
-                    a = (object_y_center - subject_y_center) / (
-                        object_x_center - subject_x_center
-                    )
-                    b = subject_y_center - a * subject_x_center
-
-                minimum_margin = 0.005
-
-                # 클릭한 지점이 선분 위에 있는지 확인
-                if (
-                    min(object_x_center, subject_x_center) - minimum_margin
-                    <= image_x
-                    <= max(object_x_center, subject_x_center) + minimum_margin
-                    and min(object_y_center, subject_y_center) - minimum_margin
-                    <= image_y
-                    <= max(object_y_center, subject_y_center) + minimum_margin
-                ):
-                    # print(f"Triple: {triple}")
-                    # 선분과 점 사이의 거리가 0.005 이하인 경우에만 클릭한 것으로 간주
-                    d = abs(a * image_x - image_y + b) / math.sqrt(a**2 + 1)
-                    if d <= 0.005:
-                        clicked_triple.append(triple)
+        image = self.base_layer
+        for predicate in self.predicates:
+            layer = self.get_overlay_layer(
+                predicate, tuple(checked_triples.get(predicate, ()))
+            )
+            if layer is not None:
+                image = Image.alpha_composite(image, layer)
 
-        if clicked_triple:
-            # edit_triple을 Queue에 추가하여 메인 스레드에서 실행되도록 함
-            for triple in clicked_triple:
-                # print(f"triple: {triple}")
-                self.root.after_idle(
-                    self.edit_triple,
-                    (
-                        triple["subject_id"],
-                        triple["predicate"],
-                        triple["object_id"],
-                    ),
-                )
+        self.displayed_image = image
+        self.show_canvas_image(image)
 
-        # print(f"Clicked at ({image_x}, {image_y})")
+    def get_overlay_layer(self, predicate, triple_keys):
+        if not triple_keys:
+            return None
 
-    def draw_relation_triple(self, image):
-        draw = ImageDraw.Draw(image)
+        cached = self.overlay_layers.get(predicate)
+        if cached is not None and cached[0] == triple_keys:
+            return cached[1]
 
-        for triple, var in self.predicate_checkbuttons.items():
-            if var.get():
-                triple_dict = {
-                    "subject_id": triple[0],
-                    "predicate": triple[1],
-                    "object_id": triple[2],
-                }
+        layer = Image.new("RGBA", self.base_layer.size, (0, 0, 0, 0))
+        self.draw_relation_triple(layer, triple_keys)
+        self.overlay_layers[predicate] = (triple_keys, layer)
+        return layer
 
-                # Draw the bounding boxes of the subject and object
-                subject = next(
-                    obj
-                    for obj in self.objects
-                    if obj["object_id"] == triple_dict["subject_id"]
-                )
-                object = next(
-                    obj
-                    for obj in self.objects
-                    if obj["object_id"] == triple_dict["object_id"]
-                )
+    def show_canvas_image(self, image, key=None):
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
 
-                subject_x_center, subject_y_center, subject_width, subject_height = (
-                    subject["bounding_box"]
-                )
-                subject_x1 = (subject_x_center - subject_width / 2) * image.width
-                subject_y1 = (subject_y_center - subject_height / 2) * image.height
-                subject_x2 = (subject_x_center + subject_width / 2) * image.width
-                subject_y2 = (subject_y_center + subject_height / 2) * image.height
-                subject_bounding_box = [subject_x1, subject_y1, subject_x2, subject_y2]
-
-                object_x_center, object_y_center, object_width, object_height = object[
-                    "bounding_box"
-                ]
-                object_x1 = (object_x_center - object_width / 2) * image.width
-                object_y1 = (object_y_center - object_height / 2) * image.height
-                object_x2 = (object_x_center + object_width / 2) * image.width
-                object_y2 = (object_y_center + object_height / 2) * image.height
-                object_bounding_box = [object_x1, object_y1, object_x2, object_y2]
-
-                # Draw the bounding boxes
-                draw.rectangle(
-                    subject_bounding_box,
-                    outline=self.class_colors[subject["class"]],
-                    width=3,
+        # 이미 같은 이미지가 표시되어 있으면 다시 올리지 않음
+        if key is not None and key == self.displayed_image_key:
+            self.canvas.coords(
+                self.canvas_image_item, canvas_width // 2, canvas_height // 2
+            )
+            return
+        self.displayed_image_key = key
+
+        # 크기가 같으면 기존 PhotoImage에 덮어써서 Tk 이미지 재생성을 피함
+        if self.tk_image is not None and (
+            self.tk_image.width(),
+            self.tk_image.height(),
+        ) == image.size:
+            self.tk_image.paste(image)
+        else:
+            self.tk_image = ImageTk.PhotoImage(image)
+
+        if self.canvas_image_item is None:
+            self.canvas_image_item = self.canvas.create_image(
+                canvas_width // 2,
+                canvas_height // 2,
+                anchor=tk.CENTER,
+                image=self.tk_image,
+            )
+        else:
+            self.canvas.coords(
+                self.canvas_image_item, canvas_width // 2, canvas_height // 2
+            )
+            self.canvas.itemconfigure(self.canvas_image_item, image=self.tk_image)
+
+    def update_canvas_overlay(self):
+        # 이미지, 위치, triple 목록, 색상 중 하나라도 바뀐 경우에만 도형을 새로 만듦
+        canvas_overlay_key = (
+            self.base_layer_key,
+            self.image_x,
+            self.image_y,
+            tuple(self.triple_checked),
+            self.color_version,
+        )
+        if self.canvas_overlay_key != canvas_overlay_key:
+            self.canvas_overlay_key = canvas_overlay_key
+            self.create_canvas_overlay()
+
+        # 체크 상태가 바뀐 triple의 도형만 숨기거나 보이게 함
+        for triple, visible in self.triple_checked.items():
+            if self.canvas_triple_visible.get(triple) != visible:
+                self.canvas_triple_visible[triple] = visible
+                self.canvas.itemconfigure(
+                    self.canvas_triple_tags[triple],
+                    state=tk.NORMAL if visible else tk.HIDDEN,
                 )
-                draw.rectangle(
-                    object_bounding_box,
-                    outline=self.class_colors[object["class"]],
-                    width=2,
+
+    def clear_canvas_overlay(self):
+        self.canvas.delete("triple_overlay")
+        self.canvas_overlay_key = None
+        self.canvas_triple_tags = {}
+        self.canvas_arrow_triples = {}
+        self.canvas_triple_visible = {}
+
+    def create_canvas_overlay(self):
+        self.clear_canvas_overlay()
+
+        width = self.current_image_width
+        height = self.current_image_height
+
+        def to_canvas(x, y):
+            return self.image_x + x * width, self.image_y + y * height
+
+        for index, triple in enumerate(self.triple_checked):
+            tag = f"triple_{index}"
+            tags = ("triple_overlay", tag)
+            self.canvas_triple_tags[triple] = tag
+
+            subject = self.objects_by_id[triple[0]]
+            object = self.objects_by_id[triple[2]]
+
+            # 바운딩 박스 (subject는 3px, object는 2px)
+            for obj, line_width in ((subject, 3), (object, 2)):
+                x_center, y_center, box_width, box_height = obj["bounding_box"]
+                x1, y1 = to_canvas(x_center - box_width / 2, y_center - box_height / 2)
+                x2, y2 = to_canvas(x_center + box_width / 2, y_center + box_height / 2)
+                self.canvas.create_rectangle(
+                    x1,
+                    y1,
+                    x2,
+                    y2,
+                    outline=self.class_colors[obj["class"]],
+                    width=line_width,
+                    tags=tags,
                 )
 
-                abs_subject_x_center = subject_x_center * image.width
-                abs_subject_y_center = subject_y_center * image.height
-                abs_object_x_center = object_x_center * image.width
-                abs_object_y_center = object_y_center * image.height
+                # 일부 속성값은 바운딩 박스 좌측 상단에 표시
+                if obj["attribute"] and (
+                    obj["attribute"][0] in ["Flying", "Landed"]
+                    or obj["class"].lower() == "building"
+                ):
+                    self.canvas.create_text(
+                        x1,
+                        y1 - 22,
+                        text=obj["attribute"][0],
+                        anchor=tk.NW,
+                        fill=self.class_colors[obj["class"]],
+                        font=("Arial", -20),
+                        tags=tags,
+                    )
+
+            # subject 중심에서 object 중심으로 향하는 화살표
+            arrow = self.canvas.create_line(
+                *to_canvas(*subject["bounding_box"][:2]),
+                *to_canvas(*object["bounding_box"][:2]),
+                fill=self.predicate_colors[triple[1]],
+                width=3,
+                arrow=tk.LAST,
+                arrowshape=(17, 17, 10),
+                tags=tags,
+            )
+            self.canvas_arrow_triples[arrow] = triple
 
-                draw.line(
-                    (
-                        abs_subject_x_center,
-                        abs_subject_y_center,
-                        abs_object_x_center,
-                        abs_object_y_center,
-                    ),
-                    fill=self.predicate_colors[triple_dict["predicate"]],
-                    width=3,
+    def find_canvas_triples_at(self, x, y):
+        # 클릭 지점 주변의 화살표를 캔버스에서 직접 찾음 (숨겨진 도형은 제외됨)
+        halo = max(3, int(self.current_image_width * 0.005))
+        current_predicate = self.current_predicate()
+
+        clicked_triple = []
+        for item in self.canvas.find_overlapping(x - halo, y - halo, x + halo, y + halo):
+            triple = self.canvas_arrow_triples.get(item)
+            if triple is not None and triple[1] == current_predicate:
+                clicked_triple.append(
+                    {
+                        "subject_id": triple[0],
+                        "predicate": triple[1],
+                        "object_id": triple[2],
+                    }
                 )
+        return clicked_triple
 
-                arrow_angle = 30
-                angle = math.atan2(
-                    abs_object_y_center - abs_subject_y_center,
-                    abs_object_x_center - abs_subject_x_center,
+    def get_hit_index(self):
+        # 이미지가 바뀌거나 triple이 수정된 뒤 처음 필요할 때 한 번만 생성
+        if self.hit_index is None:
+            self.hit_index = SpatialIndex(
+                aspect_ratio=self.current_image_height / self.current_image_width
+            )
+            for triple in self.relation_triples:
+                subject = self.objects_by_id.get(triple["subject_id"])
+                object = self.objects_by_id.get(triple["object_id"])
+                if subject is None or object is None:
+                    continue
+                self.hit_index.add_segment(
+                    (triple["subject_id"], triple["predicate"], triple["object_id"]),
+                    *subject["bounding_box"][:2],
+                    *object["bounding_box"][:2],
                 )
-                angle1 = angle + math.radians(arrow_angle)
-                angle2 = angle + math.radians(-arrow_angle)
-                arrow_length = 20
+        return self.hit_index
 
-                draw.line(
-                    (
-                        abs_object_x_center - arrow_length * math.cos(angle1),
-                        abs_object_y_center - arrow_length * math.sin(angle1),
-                        abs_object_x_center,
-                        abs_object_y_center,
-                    ),
-                    fill=self.predicate_colors[triple_dict["predicate"]],
-                    width=3,
+    def find_indexed_triples_at(self, x, y):
+        # 클릭된 지점이 이미지 내부에 있는지 확인
+        if not (
+            self.image_x <= x <= self.image_x + self.current_image_width
+            and self.image_y <= y <= self.image_y + self.current_image_height
+        ):
+            return []
+
+        # 이미지 상의 좌표로 변환
+        image_x = (x - self.image_x) / self.current_image_width
+        image_y = (y - self.image_y) / self.current_image_height
+
+        # 현재 선택된 탭의 triple 중 선분과의 거리가 0.005 이하인 것만 클릭한 것으로 간주
+        current_predicate = self.current_predicate()
+        clicked_triple = []
+        for triple in self.get_hit_index().query_segments(image_x, image_y, 0.005):
+            if triple[1] == current_predicate and triple in self.triple_checked:
+                clicked_triple.append(
+                    {
+                        "subject_id": triple[0],
+                        "predicate": triple[1],
+                        "object_id": triple[2],
+                    }
                 )
-                draw.line(
+        return clicked_triple
+
+    def on_canvas_motion(self, event):
+        # 화살표 위에 마우스가 올라가면 커서 모양을 바꿔 클릭 가능함을 표시
+        if self.base_layer is None or not self.notebook.tabs():
+            return
+        if self.canvas_overlay_var.get():
+            hovered = self.find_canvas_triples_at(event.x, event.y)
+        else:
+            hovered = self.find_indexed_triples_at(event.x, event.y)
+        self.canvas.config(cursor="hand2" if hovered else "")
+
+    def on_render_mode_change(self):
+        # 렌더링 모드가 바뀌면 기존 도형과 레이어를 지우고 다시 그림
+        self.clear_canvas_overlay()
+        self.displayed_image_key = None
+        self.redraw_overlay()
+
+    def prefetch_neighbor_images(self, width):
+        # 같은 이미지, 같은 크기에 대해서는 다시 요청하지 않음
+        if self.last_prefetch == (self.current_image, width):
+            return
+        self.last_prefetch = (self.current_image, width)
+
+        current_index = self.current_index
+        if current_index is None:
+            return
+        paths = []
+        # 다음 이미지를 먼저, 이전 이미지를 그 다음으로 가까운 순서대로 요청
+        for offset in range(1, PREFETCH_COUNT + 1):
+            for index in (current_index + offset, current_index - offset):
+                if 0 <= index < len(self.image_files):
+                    paths.append(self.image_files[index])
+        self.frame_cache.prefetch(paths, width)
+
+    def on_image_click(self, event):
+        # 이미지를 읽는 중에는 무시
+        if self.base_layer is None:
+            return
+
+        # 클릭된 지점의 좌표 얻기
+        x = event.x
+        y = event.y
+
+        clicked_triple = []
+
+        # Canvas 도형 모드에서는 캔버스의 hit test 사용
+        if self.canvas_overlay_var.get():
+            clicked_triple = self.find_canvas_triples_at(x, y)
+
+        else:
+            clicked_triple = self.find_indexed_triples_at(x, y)
+
+        if clicked_triple:
+            # 풀에 있는 Dialog를 재설정하여 열기 때문에 여러 개도 바로 열 수 있음
+            for triple in clicked_triple:
+                self.edit_triple(
                     (
-                        abs_object_x_center - arrow_length * math.cos(angle2),
-                        abs_object_y_center - arrow_length * math.sin(angle2),
-                        abs_object_x_center,
-                        abs_object_y_center,
-                    ),
-                    fill=self.predicate_colors[triple_dict["predicate"]],
-                    width=3,
+                        triple["subject_id"],
+                        triple["predicate"],
+                        triple["object_id"],
+                    )
                 )
 
-                # Draw Attribute left above to the bounding box
-                font = ImageFont.truetype("arial.ttf", 20)
-                # If attribute is one of 'One-story Building', 'Two-story Builindg', 'Three-story Building', 'Four-stroy Building', 'Multi-story Building', 'Flying', 'Landed'
-                if object["attribute"] and (
-                    object["attribute"][0] in ["Flying", "Landed"]
-                    or object["class"].lower() == "building"
-                ):
-                    attribute = object["attribute"][0]
-                    draw.text(
-                        (object_x1, object_y1 - 22),
-                        attribute,
-                        fill=self.class_colors[object["class"]],
-                        font=font,
-                    )
-                if subject["attribute"] and (
-                    subject["attribute"][0] in ["Flying", "Landed"]
-                    or subject["class"].lower() == "building"
-                ):
-                    attribute = subject["attribute"][0]
-                    draw.text(
-                        (subject_x1, subject_y1 - 22),
-                        attribute,
-                        fill=self.class_colors[subject["class"]],
-                        font=font,
-                    )
+        # print(f"Clicked at ({image_x}, {image_y})")
+
+    def draw_relation_triple(self, image, triple_keys):
+        draw_scene_graph(
+            image,
+            triple_keys,
+            self.objects_by_id,
+            self.class_colors,
+            self.predicate_colors,
+            self.get_label_font(),
+        )
 
-        self.tk_image = ImageTk.PhotoImage(image)
+    def get_label_font(self):
+        # 폰트 파일은 한 번만 읽어서 재사용
+        if self.label_font is None:
+            self.label_font = load_label_font()
+        return self.label_font
 
     def display_relation_triples(self):
         # print("display_relation_triples called")  # 디버깅 출력
@@ -619,8 +4236,15 @@ class ImageLabelingApp:
         # 기존의 모든 탭 제거
         for tab_id in self.notebook.tabs():
             self.notebook.forget(tab_id)
+        for frame in self.predicate_tabs.values():
+            frame.destroy()
         self.predicate_tabs.clear()
-        self.predicate_checkbuttons.clear()
+        self.predicate_trees.clear()
+        self.triple_checked.clear()
+        self.predicate_triple_keys.clear()
+        self.tab_predicates.clear()
+        self.triple_rows.clear()
+        self.row_triples.clear()
         self.checkbox_vars.clear()
 
         for predicate in self.predicates:
@@ -632,480 +4256,331 @@ class ImageLabelingApp:
             ]
             # print(triples)
             if triples:
-                frame = ttk.Frame(self.notebook)
-                self.notebook.add(frame, text=predicate)
-                self.predicate_tabs[predicate] = frame
-
-                row = 0  # 행 번호 초기화
-                select_all_var = tk.BooleanVar()
-                select_all_var.set(True)
-                self.checkbox_vars[predicate] = select_all_var
-                select_all_checkbutton = ttk.Checkbutton(
-                    frame,
-                    text="전체 체크/해제",
-                    variable=select_all_var,
-                    command=lambda p=predicate, v=self.checkbox_vars[
-                        predicate
-                    ]: self.toggle_all_checkbuttons(p, v),
-                )
-                select_all_checkbutton.grid(row=row, column=0, sticky="w")
-
-                # 새로운 triple 추가 버튼 생성
-                add_new_triple_button = ttk.Button(
-                    frame,
-                    text="추가",
-                    command=self.add_new_triple,
-                )
-                add_new_triple_button.grid(row=row, column=1, sticky="w")
-
-                row += 1
-
-                for triple in triples:
-                    var = tk.BooleanVar()
-                    var.set(True)
-                    triple_key = (
-                        triple["subject_id"],
-                        triple["predicate"],
-                        triple["object_id"],
-                    )
-
-                    # 삭제 버튼 생성
-                    delete_button = ttk.Button(
-                        frame,
-                        text="삭제",
-                        command=lambda tk=triple_key: self.delete_triple(tk),
-                        name=f"{triple_key[0]}-{triple_key[1]}-{triple_key[2]}-delete",
-                    )
-                    delete_button.grid(
-                        row=row, column=0, sticky="w"
-                    )  # 첫 번째 열에 배치
-
-                    # 체크버튼 생성
-                    checkbutton = ttk.Checkbutton(
-                        frame,
-                        text=f"{triple['subject_id']} - {triple['predicate']} - {triple['object_id']}",
-                        variable=var,
-                        command=self.display_image,
-                    )
-                    checkbutton.grid(row=row, column=1, sticky="w")  # 두 번째 열에 배치
-
-                    # predicate 수정 버튼 생성
-                    edit_button = ttk.Button(
-                        frame,
-                        text="수정",
-                        command=lambda tk=triple_key: self.edit_triple(tk),
-                        name=f"{triple_key[0]}-{triple_key[1]}-{triple_key[2]}-edit",
-                    )
-                    edit_button.grid(row=row, column=2, sticky="w")  # 세 번째 열에 배치
-
-                    self.predicate_checkbuttons[triple_key] = var
-                    row += 1  # 다음 행으로 이동
-
-        if self.last_selected_tab is not None:
-            try:
-                self.notebook.select(self.last_selected_tab)
-            except:
-                pass
-        else:
-            # 첫번쨰 탭 선택 및 포커스 후 짥은 시간 대기
-            self.notebook.select(0)
-            self.root.after(100, lambda: self.notebook.focus_set())
-
-    def toggle_all_checkbuttons(self, predicate, var):
-        for triple, checkbutton in self.predicate_checkbuttons.items():
-            if triple[1] == predicate:
-                checkbutton.set(var.get())
-        self.display_image()
-
-    def toggle_all_checkbuttons_with_shortcut(self):
-        current_predicate = self.notebook.tab(self.notebook.select(), "text")
-        # print(f"Current predicate: {current_predicate}")
-        # print(f"Initizlized: {self.relation_triple_info_initialized}")
-        var = self.checkbox_vars[current_predicate]
-        var.set(not var.get())
-        self.checkbox_vars[current_predicate] = var
-        # print(var.get())
-        # self.notebook.unbind("<<NotebookTabChanged>>")
-        self.toggle_all_checkbuttons(current_predicate, var)
-
-    def delete_triple(self, triple_key):
-        # UI에서 삭제
-        for widget in self.predicate_tabs[triple_key[1]].winfo_children():
-            if (
-                isinstance(widget, ttk.Checkbutton)
-                and widget["text"]
-                == f"{triple_key[0]} - {triple_key[1]} - {triple_key[2]}"
-            ):
-                widget.grid_forget()
-            elif (
-                isinstance(widget, ttk.Button)
-                and f"{triple_key[0]}-{triple_key[1]}-{triple_key[2]}"
-                in widget.winfo_name()
-            ):
-                widget.grid_forget()
-
-        # self.predicate_checkbuttons에서 삭제
-        self.predicate_checkbuttons.pop(triple_key)
-
-        # self.vqa_data에서 삭제
-        for item in self.vqa_data:
-            if item["image"]["image_name"] == os.path.basename(self.current_image):
-                item["scene_graph"]["triples"] = [
-                    triple
-                    for triple in item["scene_graph"]["triples"]
-                    if not (
-                        triple["subject_id"] == triple_key[0]
-                        and triple["predicate"] == triple_key[1]
-                        and triple["object_id"] == triple_key[2]
-                    )
-                ]
-                break
-
-        # 이미지 다시 그리기
-        self.display_image()
-
-    def edit_triple(self, triple_key):
-        # 수정 Dialog 생성
-        edit_dialog = tk.Toplevel(self.root)
-        edit_dialog.title("Triple 수정")
-        edit_dialog.focus_set()
-
-        # 열린 Dialog 창을 리스트에 추가
-        self.open_dialogs.append(edit_dialog)
-
-        # 수정할 subject_id, predicate, object_id 입력 칸 생성
-        # 각각의 입력 칸은 기본값으로 기존 값이 들어가도록 함
-        # Predicate의 경우 self.predicates에 있는 값 중 하나만 입력 가능하도록 함
-        # subject_id, object_id는 해당 이미지의 object_list에 있는 object_id 중 하나만 입력 가능하도록 함
-        subject_id_var = tk.StringVar()
-        for obj in self.objects:
-            if obj["object_id"] == triple_key[0]:
-                subject_id_var.set(f"{obj['class']}: {obj['object_id']}")
-                break
-        subject_id_label = tk.Label(edit_dialog, text="Subject ID:")
-        subject_id_label.grid(row=0, column=0)
-        subject_id_entry = ttk.Combobox(
-            edit_dialog,
-            textvariable=subject_id_var,
-            values=self.objects_ids_with_class,
-            width=30,
-        )
-        subject_id_entry.grid(row=0, column=1)
-
-        predicate_var = tk.StringVar()
-        predicate_var.set(triple_key[1])
-        predicate_label = tk.Label(edit_dialog, text="Predicate:")
-        predicate_label.grid(row=1, column=0)
-        predicate_entry = ttk.Combobox(
-            edit_dialog, textvariable=predicate_var, values=self.predicates, width=30
-        )
-        predicate_entry.grid(row=1, column=1)
-        object_id_var = tk.StringVar()
-        for obj in self.objects:
-            if obj["object_id"] == triple_key[2]:
-                object_id_var.set(f"{obj['class']}: {obj['object_id']}")
-                break
-        object_id_label = tk.Label(edit_dialog, text="Object ID:")
-        object_id_label.grid(row=2, column=0)
-        object_id_entry = ttk.Combobox(
-            edit_dialog,
-            textvariable=object_id_var,
-            values=self.objects_ids_with_class,
-            width=30,
-        )
-        object_id_entry.grid(row=2, column=1)
-
-        # 수정된 값이 이미지에서 어떻게 보일지 Dialog 상에 이미지로 표시
-        image = Image.open(self.current_image)
-        draw = ImageDraw.Draw(image)
-
-        # 이미지 보여주는 캔버스 생성 후 Dialog에 추가. 이때 이미지는 1280x720 크기로 resize
-        canvas = tk.Canvas(edit_dialog, width=1280, height=720)
-        canvas.grid(row=3, column=0, columnspan=4)
-        tk_image = ImageTk.PhotoImage(image.resize((1280, 720)))
-        canvas.create_image(640, 360, image=tk_image)
-        font = ImageFont.truetype("arial.ttf", 20)
-
-        # 이미지에 subject_id, object_id에 해당하는 bounding box 그리기
-        for obj in self.objects:
-            if obj["object_id"] == int(subject_id_var.get().split(": ")[1]):
-                subject_x_center, subject_y_center, subject_width, subject_height = obj[
-                    "bounding_box"
-                ]
-                subject_x1 = (subject_x_center - subject_width / 2) * image.width
-                subject_y1 = (subject_y_center - subject_height / 2) * image.height
-                subject_x2 = (subject_x_center + subject_width / 2) * image.width
-                subject_y2 = (subject_y_center + subject_height / 2) * image.height
-                draw.rectangle(
-                    (subject_x1, subject_y1, subject_x2, subject_y2),
-                    outline=self.class_colors[obj["class"]],
-                    width=3,
-                )
-                if obj["attribute"] and (
-                    obj["attribute"][0] in ["Flying", "Landed"]
-                    or obj["class"].lower() == "building"
-                ):
-                    attribute = obj["attribute"][0]
-                    draw.text(
-                        (subject_x1, subject_y1 - 22),
-                        attribute,
-                        fill=self.class_colors[obj["class"]],
-                        font=font,
-                    )
-            if obj["object_id"] == int(object_id_var.get().split(": ")[1]):
-                object_x_center, object_y_center, object_width, object_height = obj[
-                    "bounding_box"
-                ]
-                object_x1 = (object_x_center - object_width / 2) * image.width
-                object_y1 = (object_y_center - object_height / 2) * image.height
-                object_x2 = (object_x_center + object_width / 2) * image.width
-                object_y2 = (object_y_center + object_height / 2) * image.height
-                draw.rectangle(
-                    (object_x1, object_y1, object_x2, object_y2),
-                    outline=self.class_colors[obj["class"]],
-                    width=3,
-                )
-                if obj["attribute"] and (
-                    obj["attribute"][0] in ["Flying", "Landed"]
-                    or obj["class"].lower() == "building"
-                ):
-                    attribute = obj["attribute"][0]
-                    draw.text(
-                        (object_x1, object_y1 - 22),
-                        attribute,
-                        fill=self.class_colors[obj["class"]],
-                        font=font,
-                    )
-
-        abs_subject_x_center = subject_x_center * image.width
-        abs_subject_y_center = subject_y_center * image.height
-        abs_object_x_center = object_x_center * image.width
-        abs_object_y_center = object_y_center * image.height
-
-        draw.line(
-            (
-                abs_subject_x_center,
-                abs_subject_y_center,
-                abs_object_x_center,
-                abs_object_y_center,
+                tree = self.create_predicate_tab(predicate)
+                for triple in triples:
+                    triple_key = triple_key_of(triple)
+                    self.triple_checked[triple_key] = True
+                    self.insert_triple_row(tree, triple_key)
+
+        # 첫번쨰 탭 선택 및 포커스 후 짥은 시간 대기
+        if self.notebook.tabs():
+            self.notebook.select(0)
+            self.root.after(100, lambda: self.notebook.focus_set())
+
+    def create_predicate_tab(self, predicate):
+        # 탭마다 위젯 개수는 triple 개수와 상관없이 일정함
+        # 탭 순서는 self.predicates 순서를 따름
+        frame = ttk.Frame(self.notebook)
+
+        toolbar = ttk.Frame(frame)
+        toolbar.pack(side=tk.TOP, fill=tk.X)
+
+        select_all_var = tk.BooleanVar()
+        select_all_var.set(True)
+        self.checkbox_vars[predicate] = select_all_var
+        select_all_checkbutton = ttk.Checkbutton(
+            toolbar,
+            text="전체 체크/해제",
+            variable=select_all_var,
+            command=lambda p=predicate, v=select_all_var: self.toggle_all_checkbuttons(
+                p, v
             ),
-            fill=self.predicate_colors[predicate_var.get()],
-            width=3,
         )
+        select_all_checkbutton.pack(side=tk.LEFT)
 
-        arrow_angle = 30
-        angle = math.atan2(
-            abs_object_y_center - abs_subject_y_center,
-            abs_object_x_center - abs_subject_x_center,
+        # 새로운 triple 추가 버튼 생성
+        add_new_triple_button = ttk.Button(
+            toolbar,
+            text="추가",
+            command=self.add_new_triple,
         )
-        angle1 = angle + math.radians(arrow_angle)
-        angle2 = angle + math.radians(-arrow_angle)
-        arrow_length = 20
+        add_new_triple_button.pack(side=tk.LEFT)
 
-        draw.line(
-            (
-                abs_object_x_center - arrow_length * math.cos(angle1),
-                abs_object_y_center - arrow_length * math.sin(angle1),
-                abs_object_x_center,
-                abs_object_y_center,
-            ),
-            fill=self.predicate_colors[predicate_var.get()],
-            width=3,
+        # 선택된 triple 수정/삭제 버튼 생성
+        edit_button = ttk.Button(
+            toolbar,
+            text="수정",
+            command=lambda p=predicate: self.edit_selected_triples(p),
         )
-        draw.line(
-            (
-                abs_object_x_center - arrow_length * math.cos(angle2),
-                abs_object_y_center - arrow_length * math.sin(angle2),
-                abs_object_x_center,
-                abs_object_y_center,
-            ),
-            fill=self.predicate_colors[predicate_var.get()],
-            width=3,
+        edit_button.pack(side=tk.LEFT)
+        delete_button = ttk.Button(
+            toolbar,
+            text="삭제",
+            command=lambda p=predicate: self.delete_selected_triples(p),
         )
+        delete_button.pack(side=tk.LEFT)
+
+        scrollbar = ttk.Scrollbar(frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree = ttk.Treeview(
+            frame,
+            columns=("checked", "triple"),
+            show="headings",
+            yscrollcommand=scrollbar.set,
+        )
+        tree.heading("checked", text="표시")
+        tree.heading("triple", text="Subject - Predicate - Object")
+        tree.column("checked", width=50, stretch=False, anchor=tk.CENTER)
+        tree.column("triple", width=300)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=tree.yview)
+
+        # 표시 열 클릭 또는 Space: 체크 전환, 더블 클릭: 수정, Delete: 삭제
+        tree.bind("<Button-1>", lambda event, t=tree: self.on_triple_row_click(t, event))
+        tree.bind("<space>", lambda event, p=predicate: self.toggle_selected_triples(p))
+        tree.bind("<Double-1>", lambda event, p=predicate: self.edit_selected_triples(p))
+        tree.bind("<Delete>", lambda event, p=predicate: self.delete_selected_triples(p))
+
+        # 탭 안의 위젯과 변수를 모두 만든 뒤에 노트북에 추가 (탭 변경 이벤트에서 사용됨)
+        position = sum(
+            1
+            for other in self.predicate_tabs
+            if self.predicates.index(other) < self.predicates.index(predicate)
+        )
+        self.predicate_trees[predicate] = tree
+        self.predicate_tabs[predicate] = frame
+        self.predicate_triple_keys[predicate] = set()
+        self.tab_predicates[str(frame)] = predicate
+        if position < len(self.notebook.tabs()):
+            self.notebook.insert(position, frame, text=predicate)
+        else:
+            self.notebook.add(frame, text=predicate)
+        return tree
 
-        tk_image = ImageTk.PhotoImage(image.resize((1280, 720)))
-        canvas.create_image(640, 360, image=tk_image)
-
-        # 값이 바뀔 때마다 이미지 다시 그리기
-        def update_image(var_name, index, operation):
-            image = Image.open(self.current_image)
-            draw = ImageDraw.Draw(image)
+    def triple_row_values(self, triple_key):
+        return (
+            "☑" if self.triple_checked[triple_key] else "☐",
+            f"{triple_key[0]} - {triple_key[1]} - {triple_key[2]}",
+        )
 
-            for obj in self.objects:
-                if obj["object_id"] == int(subject_id_var.get().split(": ")[1]):
-                    (
-                        subject_x_center,
-                        subject_y_center,
-                        subject_width,
-                        subject_height,
-                    ) = obj["bounding_box"]
-                    subject_x1 = (subject_x_center - subject_width / 2) * image.width
-                    subject_y1 = (subject_y_center - subject_height / 2) * image.height
-                    subject_x2 = (subject_x_center + subject_width / 2) * image.width
-                    subject_y2 = (subject_y_center + subject_height / 2) * image.height
-                    draw.rectangle(
-                        (subject_x1, subject_y1, subject_x2, subject_y2),
-                        outline=self.class_colors[obj["class"]],
-                        width=3,
-                    )
-                    if obj["attribute"] and (
-                        obj["attribute"][0] in ["Flying", "Landed"]
-                        or obj["class"].lower() == "building"
-                    ):
-                        attribute = obj["attribute"][0]
-                        draw.text(
-                            (subject_x1, subject_y1 - 22),
-                            attribute,
-                            fill=self.class_colors[obj["class"]],
-                            font=font,
-                        )
-                if obj["object_id"] == int(object_id_var.get().split(": ")[1]):
-                    object_x_center, object_y_center, object_width, object_height = obj[
-                        "bounding_box"
-                    ]
-                    object_x1 = (object_x_center - object_width / 2) * image.width
-                    object_y1 = (object_y_center - object_height / 2) * image.height
-                    object_x2 = (object_x_center + object_width / 2) * image.width
-                    object_y2 = (object_y_center + object_height / 2) * image.height
-                    draw.rectangle(
-                        (object_x1, object_y1, object_x2, object_y2),
-                        outline=self.class_colors[obj["class"]],
-                        width=3,
-                    )
-                    if obj["attribute"] and (
-                        obj["attribute"][0] in ["Flying", "Landed"]
-                        or obj["class"].lower() == "building"
-                    ):
-                        attribute = obj["attribute"][0]
-                        draw.text(
-                            (object_x1, object_y1 - 22),
-                            attribute,
-                            fill=self.class_colors[obj["class"]],
-                            font=font,
-                        )
+    def insert_triple_row(self, tree, triple_key):
+        # 행 id는 탭 사이에서도 겹치지 않도록 직접 만듦
+        self.row_count += 1
+        row_id = f"triple{self.row_count}"
+        tree.insert("", tk.END, iid=row_id, values=self.triple_row_values(triple_key))
+        self.triple_rows[triple_key] = row_id
+        self.row_triples[row_id] = triple_key
+        self.predicate_triple_keys[triple_key[1]].add(triple_key)
+
+    # triple 수정 시에는 패널 전체를 다시 만들지 않고 해당 행과 탭만 추가/이동/삭제함
+    # (선택된 탭과 스크롤 위치가 그대로 유지됨)
+    def add_triple_row(self, triple_key):
+        tree = self.predicate_trees.get(triple_key[1])
+        if tree is None:
+            tree = self.create_predicate_tab(triple_key[1])
+        self.triple_checked[triple_key] = True
+        self.insert_triple_row(tree, triple_key)
+        tree.see(self.triple_rows[triple_key])
+
+    def remove_triple_row(self, triple_key):
+        row_id = self.triple_rows.pop(triple_key)
+        del self.row_triples[row_id]
+        del self.triple_checked[triple_key]
+
+        predicate = triple_key[1]
+        self.predicate_triple_keys[predicate].discard(triple_key)
+        self.predicate_trees[predicate].delete(row_id)
+
+        # 마지막 triple이 삭제되면 탭도 제거
+        if not self.predicate_triple_keys[predicate]:
+            del self.predicate_trees[predicate]
+            del self.predicate_triple_keys[predicate]
+            del self.checkbox_vars[predicate]
+            frame = self.predicate_tabs.pop(predicate)
+            del self.tab_predicates[str(frame)]
+            self.notebook.forget(frame)
+            frame.destroy()
+
+    def replace_triple_row(self, triple_key, new_triple_key):
+        if triple_key[1] != new_triple_key[1]:
+            # predicate가 바뀌면 다른 탭으로 이동
+            checked = self.triple_checked[triple_key]
+            self.remove_triple_row(triple_key)
+            self.add_triple_row(new_triple_key)
+            self.set_triple_checked(new_triple_key, checked)
+            return
 
-            abs_subject_x_center = subject_x_center * image.width
-            abs_subject_y_center = subject_y_center * image.height
-            abs_object_x_center = object_x_center * image.width
-            abs_object_y_center = object_y_center * image.height
+        # 같은 탭 안에서는 행의 내용만 변경
+        row_id = self.triple_rows.pop(triple_key)
+        self.triple_rows[new_triple_key] = row_id
+        self.row_triples[row_id] = new_triple_key
+        self.triple_checked[new_triple_key] = self.triple_checked.pop(triple_key)
+        self.predicate_triple_keys[triple_key[1]].discard(triple_key)
+        self.predicate_triple_keys[new_triple_key[1]].add(new_triple_key)
+        self.predicate_trees[new_triple_key[1]].item(
+            row_id, values=self.triple_row_values(new_triple_key)
+        )
 
-            draw.line(
-                (
-                    abs_subject_x_center,
-                    abs_subject_y_center,
-                    abs_object_x_center,
-                    abs_object_y_center,
-                ),
-                fill=self.predicate_colors[predicate_var.get()],
-                width=3,
-            )
+    def on_triples_changed(self, item):
+        # 레코드의 triple 목록이 바뀐 뒤 hit test 인덱스를 버리고 이미지만 다시 그림
+        self.relation_triples = item["scene_graph"]["triples"]
+        self.hit_index = None
+        self.redraw_overlay()
 
-            arrow_angle = 30
-            angle = math.atan2(
-                abs_object_y_center - abs_subject_y_center,
-                abs_object_x_center - abs_subject_x_center,
-            )
-            angle1 = angle + math.radians(arrow_angle)
-            angle2 = angle + math.radians(-arrow_angle)
-            arrow_length = 20
+    def current_predicate(self):
+        # 선택된 탭의 predicate. 탭이 없으면 None
+        return self.tab_predicates.get(self.notebook.select())
 
-            draw.line(
-                (
-                    abs_object_x_center - arrow_length * math.cos(angle1),
-                    abs_object_y_center - arrow_length * math.sin(angle1),
-                    abs_object_x_center,
-                    abs_object_y_center,
-                ),
-                fill=self.predicate_colors[predicate_var.get()],
-                width=3,
-            )
-            draw.line(
-                (
-                    abs_object_x_center - arrow_length * math.cos(angle2),
-                    abs_object_y_center - arrow_length * math.sin(angle2),
-                    abs_object_x_center,
-                    abs_object_y_center,
-                ),
-                fill=self.predicate_colors[predicate_var.get()],
-                width=3,
-            )
+    def refresh_triple_rows(self, predicate):
+        # 탭의 체크 표시를 표시 상태 모델에 맞게 갱신
+        tree = self.predicate_trees[predicate]
+        for triple_key in self.predicate_triple_keys[predicate]:
+            tree.item(self.triple_rows[triple_key], values=self.triple_row_values(triple_key))
 
-            # 캔버스 초기화
-            canvas.delete("all")
-
-            tk_image.paste(image.resize((1280, 720)))
-            canvas.create_image(640, 360, image=tk_image)
-            canvas.image = tk_image
-
-        # subject_id, predicate, object_id가 바뀔 때마다 이미지 다시 그리기
-        subject_id_var.trace_add("write", update_image)
-        predicate_var.trace_add("write", update_image)
-        object_id_var.trace_add("write", update_image)
-
-        # 수정 Dialog의 닫을때 실행되는 함수
-        def close_edit_dialog():
-            # Dialog가 닫힐 때 open_dialogs 리스트에서 해당 Dialog를 제거
-            # print("close_edit_dialog")
-            self.open_dialogs.remove(edit_dialog)
-            edit_dialog.destroy()
-
-            # 만약 열린 edit_dialog가 남아있다면 마지막으로 열린 Dialog에 포커스를 맞춤
-            if self.open_dialogs:
-                # print("focus_set on last dialog")
-                self.root.after(100, lambda: self.open_dialogs[-1].focus_set())
-            else:
-                # 남아있는 edit_dialog가 없다면 메인 창에 포커스를 맞춤
-                # print("focus_set on root")
-                self.root.after(100, lambda: self.root.focus_set())
-
-        # 수정 Dialog의 확인 버튼 생성
-        # 확인 버튼을 누르면 수정된 값으로 triple_key를 수정하고, 이미지를 다시 그림
-        confirm_button = ttk.Button(
-            edit_dialog,
-            text="확인",
-            command=lambda: self.confirm_edit_triple(
-                triple_key,
-                subject_id_var.get().split(": ")[1],
-                predicate_var.get(),
-                object_id_var.get().split(": ")[1],
-                edit_dialog,
-            ),
+    def set_triple_checked(self, triple_key, checked):
+        if self.triple_checked[triple_key] == checked:
+            return
+        self.triple_checked[triple_key] = checked
+        self.predicate_trees[triple_key[1]].item(
+            self.triple_rows[triple_key], values=self.triple_row_values(triple_key)
         )
 
-        confirm_button.grid(row=1, column=2)
+    def on_triple_row_click(self, tree, event):
+        # 표시 열을 클릭하면 해당 triple의 체크 상태를 전환
+        if tree.identify_column(event.x) != "#1":
+            return
+        row_id = tree.identify_row(event.y)
+        if not row_id:
+            return
+        triple_key = self.row_triples[row_id]
+        self.set_triple_checked(triple_key, not self.triple_checked[triple_key])
+        self.redraw_overlay()
 
-        # edit_dialog 닫기 버튼 설정 시 close_edit_dialog 호출
-        edit_dialog.protocol("WM_DELETE_WINDOW", close_edit_dialog)
+    def get_selected_triples(self, predicate):
+        tree = self.predicate_trees[predicate]
+        return [self.row_triples[row_id] for row_id in tree.selection()]
 
-        # ESC 키를 누르면 edit_dialog 닫고 close_edit_dialog 호출
-        edit_dialog.bind("<Escape>", lambda event: close_edit_dialog())
+    def toggle_selected_triples(self, predicate):
+        triple_keys = self.get_selected_triples(predicate)
+        if not triple_keys:
+            return
+        checked = not all(self.triple_checked[triple_key] for triple_key in triple_keys)
+        for triple_key in triple_keys:
+            self.set_triple_checked(triple_key, checked)
+        self.redraw_overlay()
 
-        def swap_subject_and_object(subject_id_var, object_id_var):
-            tmp_subject_id = subject_id_var.get()
-            subject_id_var.set(object_id_var.get())
-            object_id_var.set(tmp_subject_id)
+    def edit_selected_triples(self, predicate):
+        for triple_key in self.get_selected_triples(predicate):
+            self.edit_triple(triple_key)
 
-        reverse_arrow_button = ttk.Button(
-            edit_dialog,
-            text="화살표 방향 전환",
-            command=lambda: swap_subject_and_object(subject_id_var, object_id_var),
-        )
+    def delete_selected_triples(self, predicate):
+        for triple_key in self.get_selected_triples(predicate):
+            self.delete_triple(triple_key)
 
-        reverse_arrow_button.grid(row=1, column=3)
+    def toggle_all_checkbuttons(self, predicate, var):
+        for triple_key in self.predicate_triple_keys[predicate]:
+            self.set_triple_checked(triple_key, var.get())
+        self.redraw_overlay()
+
+    def toggle_all_checkbuttons_with_shortcut(self):
+        current_predicate = self.current_predicate()
+        if current_predicate is None:
+            return
+        # print(f"Current predicate: {current_predicate}")
+        # print(f"Initizlized: {self.relation_triple_info_initialized}")
+        var = self.checkbox_vars[current_predicate]
+        var.set(not var.get())
+        self.checkbox_vars[current_predicate] = var
+        # print(var.get())
+        # self.notebook.unbind("<<NotebookTabChanged>>")
+        self.toggle_all_checkbuttons(current_predicate, var)
+
+    def delete_triple(self, triple_key):
+        # UI에서 삭제 (이미 삭제된 triple이면 무시)
+        if triple_key not in self.triple_rows:
+            return
+        self.remove_triple_row(triple_key)
+
+        # self.vqa_data에서 삭제
+        item = self.get_current_vqa_item()
+        if item is not None:
+            # 레코드가 실제로 바뀐 경우에만 저널에 기록
+            if remove_triple(item, triple_key, self.get_triple_keys(item)):
+                self.record_edit("delete", triple_key)
+
+            # 이미지 다시 그리기
+            self.on_triples_changed(item)
+
+    def edit_triple(self, triple_key):
+        # 수정 Dialog를 풀에서 꺼내 기존 값을 기본값으로 설정
+        # Predicate의 경우 self.predicates에 있는 값 중 하나만 입력 가능하도록 함
+        # subject_id, object_id는 해당 이미지의 object_list에 있는 object_id 중 하나만 입력 가능하도록 함
+        # 예외가 나도 Dialog가 풀에서 빠진 채로 남지 않도록 인자를 먼저 준비한 뒤 꺼냄
+        base_photo = self.prepare_dialog_base_photo()
+        if base_photo is None:
+            return
+        edit_dialog = self.dialog_manager.acquire()
+        edit_dialog.configure(
+            "Triple 수정",
+            self.objects_ids_with_class,
+            self.predicates,
+            self.object_choice(triple_key[0]),
+            triple_key[1],
+            self.object_choice(triple_key[2]),
+            base_photo,
+            # 확인 버튼을 누르면 수정된 값으로 triple_key를 수정하고, 이미지를 다시 그림
+            lambda subject_id, predicate, object_id: self.confirm_edit_triple(
+                triple_key, subject_id, predicate, object_id, edit_dialog
+            ),
+        )
+        self.dialog_manager.show(edit_dialog)
 
-        # Enter 키를 누르면 confirm_button이 클릭되도록 설정
-        edit_dialog.bind("<Return>", lambda event: confirm_button.invoke())
+    def object_choice(self, object_id):
+        # 콤보박스에 표시되는 "class: object_id" 형식의 값
+        obj = self.objects_by_id.get(object_id)
+        if obj is None:
+            return ""
+        return f"{obj['class']}: {obj['object_id']}"
 
-        # 수정 Dialog 실행
-        edit_dialog.mainloop()
+    def prepare_dialog_base_photo(self):
+        # Dialog를 열기 전에 미리보기 베이스 이미지를 준비. 열 수 없으면 오류를 표시하고 None 반환
+        if not self.current_image:
+            return None
+        try:
+            return self.get_dialog_base_photo()
+        except OSError as e:
+            messagebox.showerror(
+                title="이미지 오류",
+                message=f"이미지를 읽을 수 없습니다: {os.path.basename(self.current_image)}\n{e}",
+            )
+            return None
+
+    def get_dialog_base_photo(self):
+        # 수정/추가 Dialog가 공유하는 미리보기 베이스 이미지. 현재 이미지가 바뀐 경우에만 새로 만듦
+        key = FrameCache.make_key(self.current_image, DIALOG_PREVIEW_SIZE[0])
+        if self.dialog_base_photo is None or self.dialog_base_photo[0] != key:
+            image = self.frame_cache.get(self.current_image, DIALOG_PREVIEW_SIZE[0])
+            if image.size != DIALOG_PREVIEW_SIZE:
+                image = image.resize(DIALOG_PREVIEW_SIZE)
+            self.dialog_base_photo = (key, ImageTk.PhotoImage(image))
+        return self.dialog_base_photo[1]
+
+    def get_preview_state(self, subject_text, predicate, object_text):
+        subject = self.objects_by_id.get(parse_object_choice(subject_text))
+        object = self.objects_by_id.get(parse_object_choice(object_text))
+        if subject is None or object is None or predicate not in self.predicate_colors:
+            return None
+        return (
+            subject,
+            self.class_colors[subject["class"]],
+            object,
+            self.class_colors[object["class"]],
+            self.predicate_colors[predicate],
+        )
 
     def confirm_edit_triple(
         self, triple_key, subject_id, predicate, object_id, edit_dialog
     ):
-        # 현재 선택된 탭 저장
-        self.last_selected_tab = self.notebook.index(self.notebook.select())
+        # 다른 창에서 먼저 수정/삭제되어 수정 전 triple이 없으면 아무것도 바꾸지 않고 닫음
+        if triple_key not in self.triple_rows or not self.has_triple(triple_key):
+            messagebox.showerror(
+                title="없는 Triple",
+                message="수정하려는 Triple이 이미 수정되었거나 삭제되었습니다.",
+            )
+            self.dialog_manager.release(edit_dialog)
+            return
 
-        new_triple_key = (int(subject_id), predicate, int(object_id))
+        new_triple_key = (subject_id, predicate, object_id)
         # 수정 여부 확인
         if triple_key == new_triple_key:
             error_message = messagebox.showerror(
@@ -1118,9 +4593,9 @@ class ImageLabelingApp:
             return
 
         # 중복 여부 확인
-        elif new_triple_key in self.predicate_checkbuttons:
+        elif self.has_triple(new_triple_key):
             # 중복된 triple_key가 있을 경우 에러 메시지 출력창을 띄움. 이떄 에러 메시지 출력창에는 확인 버튼과 삭제 버튼이 있음.
-            error_dialog = tk.Toplevel(edit_dialog)
+            error_dialog = tk.Toplevel(edit_dialog.window)
             error_dialog.title("중복된 Triple")
             error_dialog.geometry("300x100")
 
@@ -1146,17 +4621,7 @@ class ImageLabelingApp:
             def delete_triple_and_close():
                 self.delete_triple(triple_key)
                 error_dialog.destroy()
-                self.open_dialogs.remove(edit_dialog)
-                edit_dialog.destroy()
-
-                # 만약 열린 edit_dialog가 남아있다면 마지막으로 열린 Dialog에 포커스를 맞춤
-                if self.open_dialogs:
-                    # print("focus_set on last dialog")
-                    self.root.after(100, lambda: self.open_dialogs[-1].focus_set())
-                else:
-                    # 남아있는 edit_dialog가 없다면 메인 창에 포커스를 맞춤
-                    # print("focus_set on root")
-                    self.root.after(100, lambda: self.root.focus_set())
+                self.dialog_manager.release(edit_dialog)
 
             delete_button = ttk.Button(
                 error_dialog,
@@ -1185,385 +4650,58 @@ class ImageLabelingApp:
             edit_dialog.focus_set()
             return
 
-        # 수정된 triple_key로 self.predicate_checkbuttons 수정
-        self.predicate_checkbuttons[new_triple_key] = self.predicate_checkbuttons.pop(
-            triple_key
-        )
-
         # 수정된 triple_key로 self.vqa_data 수정
-        for item in self.vqa_data:
-            if item["image"]["image_name"] == os.path.basename(self.current_image):
-                for triple in item["scene_graph"]["triples"]:
-                    if (
-                        triple["subject_id"] == triple_key[0]
-                        and triple["predicate"] == triple_key[1]
-                        and triple["object_id"] == triple_key[2]
-                    ):
-                        triple["subject_id"] = int(subject_id)
-                        triple["predicate"] = predicate
-                        triple["object_id"] = int(object_id)
-                break
-
-        # 수정 Dialog 종료치
-        self.open_dialogs.remove(edit_dialog)
-        edit_dialog.destroy()
+        item = self.get_current_vqa_item()
+        if item is not None:
+            if replace_triple(
+                item, triple_key, new_triple_key, self.get_triple_keys(item)
+            ):
+                self.record_edit("edit", triple_key, new_triple_key)
+            self.replace_triple_row(triple_key, new_triple_key)
 
-        # 만약 열린 edit_dialog가 남아있다면 마지막으로 열린 Dialog에 포커스를 맞춤
-        if self.open_dialogs:
-            # print("focus_set on last dialog")
-            self.root.after(100, lambda: self.open_dialogs[-1].focus_set())
-        else:
-            # 남아있는 edit_dialog가 없다면 메인 창에 포커스를 맞춤
-            # print("focus_set on root")
-            self.root.after(100, lambda: self.root.focus_set())
+        # 수정 Dialog 종료 (숨긴 뒤 풀로 반환)
+        self.dialog_manager.release(edit_dialog)
 
         # 이미지 다시 그리기
-        self.relation_triple_info_initialized = False
-        self.display_image()
+        if item is not None:
+            self.on_triples_changed(item)
 
     def add_new_triple(self):
-        # 새로운 triplet을 추가하기 위한 Dialog 생성
-        add_triplet_dialog = tk.Toplevel(self.root)
-        add_triplet_dialog.title("Triple 추가")
-        add_triplet_dialog.focus_set()
-
-        # 열린 Dialog 창을 리스트에 추가
-        self.open_dialogs.append(add_triplet_dialog)
-
-        # subject_id, predicate, object_id 입력 칸 생성
-        # 각각의 입력 칸은 기본값으로 콤보박스의 첫 번째 값이 들어가도록 함
-        # 단 predicate은 현재 탭의 값이 들어가도록 함
-        # Predicate의 경우 self.predicates에 있는 값 중 하나만 입력 가능하도록 함
-        # subject_id, object_id는 해당 이미지의 object_list에 있는 object_id 중 하나만 입력 가능하도록 함
-        # 입력칸은 콤보박스로 구현
-        subject_id_var = tk.StringVar()
-        subject_id_var.set(self.objects_ids_with_class[0])
-        subject_id_label = tk.Label(add_triplet_dialog, text="Subject ID:")
-        subject_id_label.grid(row=0, column=0)
-
-        subject_id_entry = ttk.Combobox(
-            add_triplet_dialog,
-            textvariable=subject_id_var,
-            values=self.objects_ids_with_class,
-            width=30,
-        )
-        subject_id_entry.grid(row=0, column=1)
-
-        predicate_var = tk.StringVar()
-        predicate_var.set(self.notebook.tab(self.notebook.select(), "text"))
-        predicate_label = tk.Label(add_triplet_dialog, text="Predicate:")
-        predicate_label.grid(row=1, column=0)
-
-        predicate_entry = ttk.Combobox(
-            add_triplet_dialog,
-            textvariable=predicate_var,
-            values=self.predicates,
-            width=30,
-        )
-        predicate_entry.grid(row=1, column=1)
-
-        object_id_var = tk.StringVar()
-        object_id_var.set(self.objects_ids_with_class[0])
-        object_id_label = tk.Label(add_triplet_dialog, text="Object ID:")
-        object_id_label.grid(row=2, column=0)
-
-        object_id_entry = ttk.Combobox(
-            add_triplet_dialog,
-            textvariable=object_id_var,
-            values=self.objects_ids_with_class,
-            width=30,
-        )
-        object_id_entry.grid(row=2, column=1)
-
-        # 확인 버튼과 화살표 방향 전환 버튼 생성
-        confirm_button = ttk.Button(
-            add_triplet_dialog,
-            text="확인",
-            command=lambda: self.confirm_add_triple(
-                subject_id_var.get().split(": ")[1],
-                predicate_var.get(),
-                object_id_var.get().split(": ")[1],
-                add_triplet_dialog,
-            ),
-        )
-        confirm_button.grid(row=1, column=2)
-
-        def swap_subject_and_object(subject_id_var, object_id_var):
-            tmp_subject_id = subject_id_var.get()
-            subject_id_var.set(object_id_var.get())
-            object_id_var.set(tmp_subject_id)
-
-        reverse_arrow_button = ttk.Button(
-            add_triplet_dialog,
-            text="화살표 방향 전환",
-            command=lambda: swap_subject_and_object(subject_id_var, object_id_var),
-        )
-        reverse_arrow_button.grid(row=1, column=3)
-
-        # 추가될 값이 이미지에서 어떻게 보일지 Dialog 상에 이미지로 표시
-        image = Image.open(self.current_image)
-        draw = ImageDraw.Draw(image)
-
-        # 이미지 보여주는 캔버스 생성 후 Dialog에 추가. 이때 이미지는 1280x720 크기로 resize
-        canvas = tk.Canvas(add_triplet_dialog, width=1280, height=720)
-        canvas.grid(row=3, column=0, columnspan=4)
-        tk_image = ImageTk.PhotoImage(image.resize((1280, 720)))
-        canvas.create_image(640, 360, image=tk_image)
-        font = ImageFont.truetype("arial.ttf", 20)
-
-        # 이미지에 subject_id, object_id에 해당하는 bounding box 그리기
-        for obj in self.objects:
-            if obj["object_id"] == int(subject_id_var.get().split(": ")[1]):
-                subject_x_center, subject_y_center, subject_width, subject_height = obj[
-                    "bounding_box"
-                ]
-                subject_x1 = (subject_x_center - subject_width / 2) * image.width
-                subject_y1 = (subject_y_center - subject_height / 2) * image.height
-                subject_x2 = (subject_x_center + subject_width / 2) * image.width
-                subject_y2 = (subject_y_center + subject_height / 2) * image.height
-                draw.rectangle(
-                    (subject_x1, subject_y1, subject_x2, subject_y2),
-                    outline=self.class_colors[obj["class"]],
-                    width=3,
-                )
-                if obj["attribute"] and (
-                    obj["attribute"][0] in ["Flying", "Landed"]
-                    or obj["class"].lower() == "building"
-                ):
-                    attribute = obj["attribute"][0]
-                    draw.text(
-                        (subject_x1, subject_y1 - 22),
-                        attribute,
-                        fill=self.class_colors[obj["class"]],
-                        font=font,
-                    )
-            if obj["object_id"] == int(object_id_var.get().split(": ")[1]):
-                object_x_center, object_y_center, object_width, object_height = obj[
-                    "bounding_box"
-                ]
-                object_x1 = (object_x_center - object_width / 2) * image.width
-                object_y1 = (object_y_center - object_height / 2) * image.height
-                object_x2 = (object_x_center + object_width / 2) * image.width
-                object_y2 = (object_y_center + object_height / 2) * image.height
-                draw.rectangle(
-                    (object_x1, object_y1, object_x2, object_y2),
-                    outline=self.class_colors[obj["class"]],
-                    width=3,
-                )
-                if obj["attribute"] and (
-                    obj["attribute"][0] in ["Flying", "Landed"]
-                    or obj["class"].lower() == "building"
-                ):
-                    attribute = obj["attribute"][0]
-                    draw.text(
-                        (object_x1, object_y1 - 22),
-                        attribute,
-                        fill=self.class_colors[obj["class"]],
-                        font=font,
-                    )
-
-        abs_subject_x_center = subject_x_center * image.width
-        abs_subject_y_center = subject_y_center * image.height
-        abs_object_x_center = object_x_center * image.width
-        abs_object_y_center = object_y_center * image.height
-
-        draw.line(
-            (
-                abs_subject_x_center,
-                abs_subject_y_center,
-                abs_object_x_center,
-                abs_object_y_center,
-            ),
-            fill=self.predicate_colors[predicate_var.get()],
-            width=3,
-        )
-
-        arrow_angle = 30
-        angle = math.atan2(
-            abs_object_y_center - abs_subject_y_center,
-            abs_object_x_center - abs_subject_x_center,
-        )
-        angle1 = angle + math.radians(arrow_angle)
-        angle2 = angle + math.radians(-arrow_angle)
-        arrow_length = 20
-
-        draw.line(
-            (
-                abs_object_x_center - arrow_length * math.cos(angle1),
-                abs_object_y_center - arrow_length * math.sin(angle1),
-                abs_object_x_center,
-                abs_object_y_center,
-            ),
-            fill=self.predicate_colors[predicate_var.get()],
-            width=3,
-        )
-        draw.line(
-            (
-                abs_object_x_center - arrow_length * math.cos(angle2),
-                abs_object_y_center - arrow_length * math.sin(angle2),
-                abs_object_x_center,
-                abs_object_y_center,
+        # 추가 Dialog를 풀에서 꺼내 기본값을 설정
+        # subject_id, object_id는 콤보박스의 첫 번째 값, predicate은 현재 탭의 값이 들어가도록 함
+        # 예외가 나도 Dialog가 풀에서 빠진 채로 남지 않도록 인자를 먼저 준비한 뒤 꺼냄
+        if not self.current_image:
+            return
+        if not self.objects_ids_with_class:
+            messagebox.showerror(
+                title="Object 없음", message="현재 이미지에 triple을 추가할 object가 없습니다."
+            )
+            return
+        base_photo = self.prepare_dialog_base_photo()
+        if base_photo is None:
+            return
+        add_triplet_dialog = self.dialog_manager.acquire()
+        add_triplet_dialog.configure(
+            "Triple 추가",
+            self.objects_ids_with_class,
+            self.predicates,
+            self.objects_ids_with_class[0],
+            self.current_predicate() or self.predicates[0],
+            self.objects_ids_with_class[0],
+            base_photo,
+            lambda subject_id, predicate, object_id: self.confirm_add_triple(
+                subject_id, predicate, object_id, add_triplet_dialog
             ),
-            fill=self.predicate_colors[predicate_var.get()],
-            width=3,
         )
-
-        tk_image = ImageTk.PhotoImage(image.resize((1280, 720)))
-        canvas.create_image(640, 360, image=tk_image)
-
-        # 값이 바뀔 때마다 이미지 다시 그리기
-        def update_image(var_name, index, operation):
-            image = Image.open(self.current_image)
-            draw = ImageDraw.Draw(image)
-
-            for obj in self.objects:
-                if obj["object_id"] == int(subject_id_var.get().split(": ")[1]):
-                    (
-                        subject_x_center,
-                        subject_y_center,
-                        subject_width,
-                        subject_height,
-                    ) = obj["bounding_box"]
-                    subject_x1 = (subject_x_center - subject_width / 2) * image.width
-                    subject_y1 = (subject_y_center - subject_height / 2) * image.height
-                    subject_x2 = (subject_x_center + subject_width / 2) * image.width
-                    subject_y2 = (subject_y_center + subject_height / 2) * image.height
-                    draw.rectangle(
-                        (subject_x1, subject_y1, subject_x2, subject_y2),
-                        outline=self.class_colors[obj["class"]],
-                        width=3,
-                    )
-                    if obj["attribute"] and (
-                        obj["attribute"][0] in ["Flying", "Landed"]
-                        or obj["class"].lower() == "building"
-                    ):
-                        attribute = obj["attribute"][0]
-                        draw.text(
-                            (subject_x1, subject_y1 - 22),
-                            attribute,
-                            fill=self.class_colors[obj["class"]],
-                            font=font,
-                        )
-                if obj["object_id"] == int(object_id_var.get().split(": ")[1]):
-                    object_x_center, object_y_center, object_width, object_height = obj[
-                        "bounding_box"
-                    ]
-                    object_x1 = (object_x_center - object_width / 2) * image.width
-                    object_y1 = (object_y_center - object_height / 2) * image.height
-                    object_x2 = (object_x_center + object_width / 2) * image.width
-                    object_y2 = (object_y_center + object_height / 2) * image.height
-                    draw.rectangle(
-                        (object_x1, object_y1, object_x2, object_y2),
-                        outline=self.class_colors[obj["class"]],
-                        width=3,
-                    )
-                    if obj["attribute"] and (
-                        obj["attribute"][0] in ["Flying", "Landed"]
-                        or obj["class"].lower() == "building"
-                    ):
-                        attribute = obj["attribute"][0]
-                        draw.text(
-                            (object_x1, object_y1 - 22),
-                            attribute,
-                            fill=self.class_colors[obj["class"]],
-                            font=font,
-                        )
-
-            abs_subject_x_center = subject_x_center * image.width
-            abs_subject_y_center = subject_y_center * image.height
-            abs_object_x_center = object_x_center * image.width
-            abs_object_y_center = object_y_center * image.height
-
-            draw.line(
-                (
-                    abs_subject_x_center,
-                    abs_subject_y_center,
-                    abs_object_x_center,
-                    abs_object_y_center,
-                ),
-                fill=self.predicate_colors[predicate_var.get()],
-                width=3,
-            )
-
-            arrow_angle = 30
-            angle = math.atan2(
-                abs_object_y_center - abs_subject_y_center,
-                abs_object_x_center - abs_subject_x_center,
-            )
-            angle1 = angle + math.radians(arrow_angle)
-            angle2 = angle + math.radians(-arrow_angle)
-            arrow_length = 20
-
-            draw.line(
-                (
-                    abs_object_x_center - arrow_length * math.cos(angle1),
-                    abs_object_y_center - arrow_length * math.sin(angle1),
-                    abs_object_x_center,
-                    abs_object_y_center,
-                ),
-                fill=self.predicate_colors[predicate_var.get()],
-                width=3,
-            )
-            draw.line(
-                (
-                    abs_object_x_center - arrow_length * math.cos(angle2),
-                    abs_object_y_center - arrow_length * math.sin(angle2),
-                    abs_object_x_center,
-                    abs_object_y_center,
-                ),
-                fill=self.predicate_colors[predicate_var.get()],
-                width=3,
-            )
-
-            # 캔버스 초기화
-            canvas.delete("all")
-
-            tk_image.paste(image.resize((1280, 720)))
-            canvas.create_image(640, 360, image=tk_image)
-            canvas.image = tk_image
-
-        # subject_id, predicate, object_id가 바뀔 때마다 이미지 다시 그리기
-        subject_id_var.trace_add("write", update_image)
-        predicate_var.trace_add("write", update_image)
-        object_id_var.trace_add("write", update_image)
-
-        # Enter 키를 누르면 confirm_button이 클릭되도록 설정
-        add_triplet_dialog.bind("<Return>", lambda event: confirm_button.invoke())
-
-        def close_add_triplet_dialog():
-            # Dialog가 닫힐 때 open_dialogs 리스트에서 해당 Dialog를 제거
-            self.open_dialogs.remove(add_triplet_dialog)
-            add_triplet_dialog.destroy()
-
-            # 만약 열린 add_triplet_dialog가 남아있다면 마지막으로 열린 Dialog에 포커스를 맞춤
-            if self.open_dialogs:
-                self.root.after(100, lambda: self.open_dialogs[-1].focus_set())
-            else:
-                # 남아있는 add_triplet_dialog가 없다면 메인 창에 포커스를 맞춤
-                self.root.after(100, lambda: self.root.focus_set())
-
-        # add_triplet_dialog 닫기 버튼 설정 시 close_add_triplet_dialog 호출
-        add_triplet_dialog.protocol("WM_DELETE_WINDOW", close_add_triplet_dialog)
-
-        # ESC 키를 누르면 add_triplet_dialog 닫고 close_add_triplet_dialog 호출
-        add_triplet_dialog.bind("<Escape>", lambda event: close_add_triplet_dialog())
-
-        # Enter 키를 누르면 confirm_button이 클릭되도록 설정
-        add_triplet_dialog.bind("<Return>", lambda event: confirm_button.invoke())
-
-        # add_triplet_dialog 실행
-        add_triplet_dialog.mainloop()
+        self.dialog_manager.show(add_triplet_dialog)
 
     def confirm_add_triple(self, subject_id, predicate, object_id, add_triplet_dialog):
-        # 현재 선택된 탭 저장
-        self.last_selected_tab = self.notebook.index(self.notebook.select())
-
-        new_triple_key = (int(subject_id), predicate, int(object_id))
+        new_triple_key = (subject_id, predicate, object_id)
 
         # 중복 여부 확인
-        if new_triple_key in self.predicate_checkbuttons:
+        if self.has_triple(new_triple_key):
             # 중복된 triple_key가 있을 경우 에러 메시지 출력창을 띄움. 이떄 에러 메시지 출력창에는 확인 버튼만 있음
-            error_dialog = tk.Toplevel(add_triplet_dialog)
+            error_dialog = tk.Toplevel(add_triplet_dialog.window)
             error_dialog.title("중복된 Triple")
             error_dialog.geometry("300x100")
 
@@ -1605,112 +4743,265 @@ class ImageLabelingApp:
             add_triplet_dialog.focus_set()
             return
 
-        # 새로운 triple_key로 self.predicate_checkbuttons 수정
-        self.predicate_checkbuttons[new_triple_key] = tk.BooleanVar()
-        self.predicate_checkbuttons[new_triple_key].set(True)
-
         # 새로운 triple_key로 self.vqa_data 수정
-        for item in self.vqa_data:
-            if item["image"]["image_name"] == os.path.basename(self.current_image):
-                item["scene_graph"]["triples"].append(
-                    {
-                        "subject_id": int(subject_id),
-                        "predicate": predicate,
-                        "object_id": int(object_id),
-                    }
-                )
-                break
-
-        # 추가 Dialog 종료
-        self.open_dialogs.remove(add_triplet_dialog)
-        add_triplet_dialog.destroy()
+        item = self.get_current_vqa_item()
+        if item is not None:
+            if append_triple(item, new_triple_key, self.get_triple_keys(item)):
+                self.record_edit("add", new_triple_key)
+            self.add_triple_row(new_triple_key)
 
-        # 만약 열린 add_triplet_dialog가 남아있다면 마지막으로 열린 Dialog에 포커스를 맞춤
-        if self.open_dialogs:
-            self.root.after(100, lambda: self.open_dialogs[-1].focus_set())
-        else:
-            # 남아있는 add_triplet_dialog가 없다면 메인 창에 포커스를 맞춤
-            self.root.after(100, lambda: self.root.focus_set())
+        # 추가 Dialog 종료 (숨긴 뒤 풀로 반환)
+        self.dialog_manager.release(add_triplet_dialog)
 
         # 이미지 다시 그리기
-        self.relation_triple_info_initialized = False
-        self.display_image()
+        if item is not None:
+            self.on_triples_changed(item)
 
     def uncheck_relation_triples_except_current_tab(self):
-        current_tab = self.notebook.select()
+        # 현재 탭의 triple만 표시하도록 표시 상태를 한 번에 바꾼 뒤 한 번만 다시 그림
+        current_predicate = self.current_predicate()
+        if current_predicate is None:
+            return
 
         # 현재 탭의 '전체 체크/해제' 체크 버튼을 항상 체크 상태로 변경
-        for widget in self.notebook.nametowidget(current_tab).winfo_children():
-            if (
-                isinstance(widget, ttk.Checkbutton)
-                and widget["text"] == "전체 체크/해제"
-            ):
-                widget.state(["selected"])
+        self.checkbox_vars[current_predicate].set(True)
 
-        for tab_id in self.notebook.tabs():
-            if tab_id != current_tab:
-                tab_widget = self.notebook.nametowidget(tab_id)
-                for index, child in enumerate(tab_widget.winfo_children()):
-                    if isinstance(child, ttk.Checkbutton):
-                        try:
-                            if child["text"] != "전체 체크/해제":
-                                self.predicate_checkbuttons[
-                                    (
-                                        int(child["text"].split(" - ")[0]),
-                                        child["text"].split(" - ")[1],
-                                        int(child["text"].split(" - ")[2]),
-                                    )
-                                ].set(False)
-                        except KeyError:
-                            pass
-            else:
-                tab_widget = self.notebook.nametowidget(tab_id)
-                for child in tab_widget.winfo_children():
-                    if isinstance(child, ttk.Checkbutton):
-                        try:
-                            if child["text"] != "전체 체크/해제":
-                                self.predicate_checkbuttons[
-                                    (
-                                        int(child["text"].split(" - ")[0]),
-                                        child["text"].split(" - ")[1],
-                                        int(child["text"].split(" - ")[2]),
-                                    )
-                                ].set(True)
-                        except KeyError:
-                            pass
-        self.display_image()
+        for predicate, triple_keys in self.predicate_triple_keys.items():
+            checked = predicate == current_predicate
+            for triple_key in triple_keys:
+                self.triple_checked[triple_key] = checked
+
+        # 체크 표시는 보이는 탭만 갱신 (다른 탭은 선택될 때 이 함수에서 갱신됨)
+        self.refresh_triple_rows(current_predicate)
+        self.redraw_overlay()
+
+    def on_image_select(self, position):
+        # position: 필터된 목록 내 위치
+        self.show_image_at(self.visible_indices[position])
 
-    def on_image_select(self, event):
-        selected_index = self.image_listbox.curselection()
-        if not selected_index:
+    def on_canvas_resize(self, event):
+        # 연속된 <Configure> 이벤트를 모아서 드래그 중에는 저화질 미리보기만 보여주고,
+        # 크기 변화가 멈춘 뒤 한 번만 고화질로 다시 그림
+        if not self.current_image:
             return
 
-        selected_image = self.image_files[selected_index[0]]
-        self.current_image = selected_image
+        self.resize_stats["events"] += 1
+        if self.resize_preview_job is None:
+            self.resize_preview_job = self.root.after_idle(self.render_resize_preview)
+        if self.resize_settle_job is not None:
+            self.root.after_cancel(self.resize_settle_job)
+        self.resize_settle_job = self.root.after(RESIZE_SETTLE_MS, self.finish_resize)
 
-        self.relation_triple_info_initialized = False
-        self.last_selected_tab = None
+    def render_resize_preview(self):
+        self.resize_preview_job = None
+        if self.displayed_image is None:
+            return
 
-        self.display_image()
+        canvas_width = self.canvas.winfo_width()
+        width, height = self.displayed_image.size
+        if canvas_width <= 1 or canvas_width == width:
+            return
 
-    def on_canvas_resize(self, event):
+        # 마지막으로 그린 고화질 이미지를 BILINEAR로 빠르게 확대/축소
+        preview = self.displayed_image.resize(
+            (canvas_width, max(1, int(canvas_width * height / width))),
+            Image.Resampling.BILINEAR,
+        )
+
+        # Canvas 도형은 크기 변경이 끝난 뒤 새 위치로 다시 그려지므로 잠시 숨김
+        if self.canvas_overlay_var.get():
+            self.canvas.itemconfigure("triple_overlay", state=tk.HIDDEN)
+            self.canvas_triple_visible = {}
+
+        self.show_canvas_image(preview)
+        self.resize_stats["previews"] += 1
+
+    def finish_resize(self):
+        self.resize_settle_job = None
+        if self.resize_preview_job is not None:
+            self.root.after_cancel(self.resize_preview_job)
+            self.resize_preview_job = None
+
+        # 새 크기의 디코딩은 작업 스레드에서 실행되므로, 실제로 그려질 때 finish_resize_render()에서 집계
+        self.resize_render_start = time.perf_counter()
         self.display_image()
 
-    def get_random_color(self):
-        import random
+    def finish_resize_render(self):
+        # 크기 조절 후 전체 그리기가 끝났을 때 display_image()에서 호출됨
+        if self.resize_render_start is None:
+            return
+        self.resize_stats["full_renders"] += 1
+        if PROFILE:
+            print(
+                f"[resize] events: {self.resize_stats['events']}, "
+                f"previews: {self.resize_stats['previews']}, "
+                f"full renders: {self.resize_stats['full_renders']}, "
+                f"full render time: "
+                f"{(time.perf_counter() - self.resize_render_start) * 1000:.1f} ms"
+            )
+        self.resize_render_start = None
+        self.resize_stats = {"events": 0, "previews": 0, "full_renders": 0}
 
-        r = lambda: random.randint(0, 255)
-        return f"#{r():02x}{r():02x}{r():02x}"
+    def get_random_color(self):
+        return random_color()
 
     def class_and_predicate_random_color(self):
         self.class_colors = {cls: self.get_random_color() for cls in self.class_colors}
         self.predicate_colors = {
             predicate: self.get_random_color() for predicate in self.predicates
         }
-        self.display_image()
-
+        # 색상이 바뀌었으므로 오버레이 레이어를 모두 다시 그림
+        self.overlay_layers.clear()
+        self.color_version += 1
+        self.redraw_overlay()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scene Graph Inspector")
+    subparsers = parser.add_subparsers(dest="command")
+
+    benchmark_parser = subparsers.add_parser(
+        "benchmark-hit-test", help="화살표 hit test 속도 측정"
+    )
+    benchmark_parser.add_argument("--triples", type=int, default=1000)
+    benchmark_parser.add_argument("--objects", type=int, default=200)
+    benchmark_parser.add_argument("--queries", type=int, default=1000)
+
+    prewarm_parser = subparsers.add_parser(
+        "prewarm-previews", help="Dataset 폴더의 미리보기 캐시 생성"
+    )
+    prewarm_parser.add_argument("folder", help="Dataset 폴더 경로")
+    prewarm_parser.add_argument(
+        "--workers", type=int, default=None, help="프로세스 개수 (기본값: CPU 개수)"
+    )
+
+    render_parser = subparsers.add_parser(
+        "render-overlays", help="장면 그래프가 그려진 이미지를 일괄 저장"
+    )
+    render_parser.add_argument("folder", help="Dataset 폴더 경로")
+    render_parser.add_argument("output", help="결과 이미지를 저장할 폴더")
+    render_parser.add_argument(
+        "--predicate",
+        action="append",
+        dest="predicates",
+        help="해당 predicate의 triple만 그림 (여러 번 지정 가능)",
+    )
+    render_parser.add_argument(
+        "--class",
+        action="append",
+        dest="classes",
+        help="subject 또는 object가 해당 클래스인 triple만 그림 (여러 번 지정 가능)",
+    )
+    render_parser.add_argument("--workers", type=int, default=None)
+    render_parser.add_argument(
+        "--overwrite", action="store_true", help="이미 저장된 이미지도 다시 그림"
+    )
+    render_parser.add_argument("--seed", type=int, default=0, help="색상 seed")
+
+    sqlite_import_parser = subparsers.add_parser(
+        "sqlite-import",
+        help="가장 최근 JSON 파일(분할 파일이 있으면 분할 파일)과 저널을 SQLite DB로 가져옴",
+    )
+    sqlite_import_parser.add_argument("folder", help="Dataset 폴더 경로")
+
+    sqlite_export_parser = subparsers.add_parser(
+        "sqlite-export", help="SQLite DB를 JSON 파일로 내보냄"
+    )
+    sqlite_export_parser.add_argument("folder", help="Dataset 폴더 경로")
+    sqlite_export_parser.add_argument("output", help="저장할 JSON 파일 경로")
+    sqlite_export_parser.add_argument(
+        "--compact", action="store_true", help="들여쓰기 없이 레코드마다 한 줄로 저장"
+    )
+
+    shard_parser = subparsers.add_parser(
+        "shard-json", help="가장 최근 JSON 파일과 저널을 이미지별 파일로 나누어 저장"
+    )
+    shard_parser.add_argument("folder", help="Dataset 폴더 경로")
+    shard_parser.add_argument("--workers", type=int, default=None)
+
+    unshard_parser = subparsers.add_parser(
+        "unshard-json", help="이미지별 파일을 하나의 JSON 파일로 합침"
+    )
+    unshard_parser.add_argument("folder", help="Dataset 폴더 경로")
+    unshard_parser.add_argument("output", help="저장할 JSON 파일 경로")
+    unshard_parser.add_argument("--workers", type=int, default=None)
+    unshard_parser.add_argument(
+        "--compact", action="store_true", help="들여쓰기 없이 레코드마다 한 줄로 저장"
+    )
+
+    validate_parser = subparsers.add_parser(
+        "validate", help="가장 최근 JSON 파일의 레코드 검사 (문제가 있으면 종료 코드 1)"
+    )
+    validate_parser.add_argument("folder", help="Dataset 폴더 경로")
+    validate_parser.add_argument(
+        "--workers", type=int, default=None, help="프로세스 개수 (기본값: CPU 개수)"
+    )
+
+    lookup_parser = subparsers.add_parser(
+        "benchmark-lookup", help="데이터셋 크기별 이미지 이름 -> 레코드 검색 속도 측정"
+    )
+    lookup_parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="측정할 이미지 개수 (여러 개 지정 가능)",
+    )
+    lookup_parser.add_argument("--queries", type=int, default=1000)
+
+    storage_parser = subparsers.add_parser(
+        "benchmark-storage", help="JSON과 SQLite 저장 방식의 속도 비교"
+    )
+    storage_parser.add_argument("--images", type=int, default=10000)
+    storage_parser.add_argument("--triples", type=int, default=20)
+    storage_parser.add_argument("--edits", type=int, default=100)
+
+    args = parser.parse_args()
+
+    if args.command == "benchmark-hit-test":
+        benchmark_hit_test(args.triples, args.objects, args.queries)
+        return
+    if args.command == "prewarm-previews":
+        prewarm_preview_cache(args.folder, args.workers)
+        return
+    if args.command == "render-overlays":
+        render_overlays(
+            args.folder,
+            args.output,
+            predicates=args.predicates,
+            classes=args.classes,
+            workers=args.workers,
+            overwrite=args.overwrite,
+            seed=args.seed,
+        )
+        return
+    if args.command == "sqlite-import":
+        import_sqlite(args.folder)
+        return
+    if args.command == "sqlite-export":
+        export_sqlite(args.folder, args.output, args.compact)
+        return
+    if args.command == "shard-json":
+        shard_json(args.folder, args.workers)
+        return
+    if args.command == "unshard-json":
+        unshard_json(args.folder, args.output, args.workers, args.compact)
+        return
+    if args.command == "validate":
+        if not print_validation_report(args.folder, args.workers):
+            sys.exit(1)
+        return
+    if args.command == "benchmark-lookup":
+        benchmark_lookup(args.sizes, args.queries)
+        return
+    if args.command == "benchmark-storage":
+        benchmark_storage(args.images, args.triples, args.edits)
+        return
 
-if __name__ == "__main__":
     root = ThemedTk(theme="adapta")
     app = ImageLabelingApp(root)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()